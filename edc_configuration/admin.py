@@ -5,7 +5,7 @@ from .models import GlobalConfiguration
 
 
 class GlobalConfigurationAdmin(admin.ModelAdmin):
-    list_display = ('category', 'attribute', 'value', 'convert')
-    list_filter = ('category', )
+    list_display = ('namespace', 'category', 'attribute', 'value', 'convert', 'value_type')
+    list_filter = ('namespace', 'category', )
     search_fields = ('attribute', 'category', 'attribute', 'value')
 admin.site.register(GlobalConfiguration, GlobalConfigurationAdmin)
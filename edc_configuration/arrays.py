@@ -0,0 +1,61 @@
+"""NumPy versions of the :class:`scheduling.SchedulingPolicy` date helpers for bulk jobs,
+e.g. rescheduling the appointments of thousands of subjects in one call.
+
+Dates are numpy datetime64[D] arrays. Import this module only where NumPy is installed."""
+from datetime import date, timedelta
+
+import numpy as np
+
+from .holidays import HolidayCalendar, to_date
+
+
+def to_dates(values):
+    """Returns a datetime64[D] array of a datetime64 array or a list of dates, datetimes or ISO date strings."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+        return values.astype('datetime64[D]')
+    return np.array([to_date(value) for value in values], dtype='datetime64[D]')
+
+
+def holiday_dates(holidays=None):
+    """Returns a datetime64[D] array of the holidays of a :class:`HolidayCalendar` or a list of dates."""
+    if holidays is None:
+        return np.array([], dtype='datetime64[D]')
+    if isinstance(holidays, HolidayCalendar):
+        holidays = [date.fromordinal(ordinal) for ordinal in holidays.ordinals()[1]]
+    return to_dates(list(holidays))
+
+
+def business_calendar(policy, holidays=None):
+    """Returns a numpy.busdaycalendar of the allowed weekdays of `policy` less the holidays."""
+    return np.busdaycalendar(weekmask=policy.weekmask, holidays=holiday_dates(holidays))
+
+
+def to_day(value):
+    """Returns a datetime64[D] of a date, datetime, datetime64 or ISO date string."""
+    return np.datetime64(to_date(value), 'D')
+
+
+def valid_dates(policy, start, end=None, holidays=None):
+    """Returns a datetime64[D] array of the dates from `start` to `end` (default: the end
+    of the window), inclusive, on an allowed weekday and not a holiday."""
+    start = to_day(start)
+    end = start + np.timedelta64(policy.days_forward, 'D') if end is None else to_day(end)
+    days = np.arange(start, end + 1, dtype='datetime64[D]')
+    return days[np.is_busday(days, busdaycal=business_calendar(policy, holidays))]
+
+
+def next_valid_dates(policy, values, holidays=None):
+    """Returns, for each date in `values`, the date itself if it is on an allowed weekday
+    and not a holiday, otherwise the first date after it that is."""
+    return np.busday_offset(to_dates(values), 0, roll='forward', busdaycal=business_calendar(policy, holidays))
+
+
+def window_ends(policy, values):
+    """Returns, for each date in `values`, the last date of its scheduling window."""
+    return to_dates(values) + np.timedelta64(policy.days_forward, 'D')
+
+
+def as_dates(values):
+    """Returns a list of datetime.date from a datetime64[D] array."""
+    epoch = date(1970, 1, 1)
+    return [epoch + timedelta(days=int(days)) for days in np.asarray(values, dtype='datetime64[D]').astype(np.int64)]
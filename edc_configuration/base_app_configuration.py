@@ -1,32 +1,47 @@
-from copy import deepcopy
+import logging
+import os
+import sys
+import threading
 
-from django.core.exceptions import MultipleObjectsReturned
-from django.conf import settings
-
-from edc_appointment.models import Holiday
-from edc_consent.consent_type import ConsentType
-from edc_content_type_map.models import ContentTypeMapHelper
-from edc_export.helpers import ExportHelper
-from edc_lab.lab_clinic_api.models import AliquotType, Panel
-from edc_lab.lab_packing.models import Destination
-from edc_lab.lab_profile.classes import site_lab_profiles
-from edc_meta_data.models import RequisitionPanel
-from edc_notification.models import NotificationHelper
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from multiprocessing.pool import ThreadPool
 
-from lis.labeling.models import LabelPrinter, ZplTemplate, Client
+from django.conf import settings
+from django.db import connection, transaction
 
-from .convert import Convert, localize
+from .bulk import BulkUpdateOrCreate, fetch_by, sync_many_to_many
+from .cache import configuration_cache, GLOBAL_NAMESPACE
+from .compiled import get_compiled_configuration, NO_DEFAULTS
+from .convert import localize
 from .defaults import default_global_configuration
-from .exceptions import AppConfigurationError
-from .models import GlobalConfiguration
+from .exceptions import AppConfigurationError, PrepareError
+from .fingerprint import fingerprint
+from .holidays import holiday_calendar
+from .loader import load_configuration
+from .lock import configuration_lock
+from .models import ConfigurationFingerprint, GlobalConfiguration, GlobalConfigurationChange
+from .report import PrepareReport, SectionReport
+from .sections import site_sections
+from .signals import configuration_prepared, section_prepared
 
 # from django.utils.timezone import make_aware
 
+logger = logging.getLogger('edc_configuration')
+
+APPLIED = 'applied'
+FAILED = 'failed'
+ROLLED_BACK = 'rolled back'
+SKIPPED = 'skipped'
+
 
 class BaseAppConfiguration(object):
 
     aliquot_type_model = None
     appointment_configuration = None
+    configuration_file = None
     consent_type_setup = None
     export_plan_setup = {}
     global_configuration = {}
@@ -34,15 +49,38 @@ class BaseAppConfiguration(object):
     lab_clinic_api_setup = None
     lab_setup = None
     labeling_setup = {}
+    # the GlobalConfiguration namespace written by update_global, e.g. the study, or
+    # GLOBAL_NAMESPACE for values that apply to all namespaces
+    namespace = GLOBAL_NAMESPACE
     notification_plan_setup = {}
     panel_model = None
     profile_item_model = None
     profile_model = None
+    # delete holidays that are no longer in holidays_setup
+    prune_holidays = False
+    # names of the sections applied by prepare() or None for all registered sections;
+    # leave out a section to skip it and its imports
+    section_names = None
+    section_registry = site_sections
 
     def __init__(self, lab_profiles=None, use_site_lab_profiles=None):
+        self._local = threading.local()
+        if self.configuration_file:
+            self.load_configuration_file()
         self.confirm_site_code_in_settings = True
         self.confirm_community_in_settings = True
+        if self.applies_section('lab'):
+            self.set_lab_models(lab_profiles, use_site_lab_profiles)
+
+    @classmethod
+    def applies_section(cls, name):
+        """Returns True if prepare() applies the section `name`."""
+        return name in cls.section_registry and (cls.section_names is None or name in cls.section_names)
+
+    def set_lab_models(self, lab_profiles=None, use_site_lab_profiles=None):
+        """Sets the lab model classes from `lab_profiles` (site_lab_profiles by default)."""
         if True if use_site_lab_profiles is None else use_site_lab_profiles:
+            from edc_lab.lab_profile.classes import site_lab_profiles
             lab_profiles = site_lab_profiles
         try:
             self.aliquot_type_model = lab_profiles.group_models.get('aliquot_type')
@@ -60,46 +98,245 @@ class BaseAppConfiguration(object):
                 'in the configuration. Either pass \'lab_profiles=site_lab_profiles\' or '
                 'explicitly declare the models on the class. Got {}.'.format(model_classes))
 
-    def prepare(self):
+    def load_configuration_file(self):
+        """Sets the sections found in `configuration_file` on the instance.
+
+        `configuration_file` is a .json, .yaml or .toml file with any of the sections
+        global_configuration, holidays_setup, lab_setup and labeling_setup; a relative
+        path is relative to the module of the class. Sections in the file replace the
+        class attributes. See :func:`loader.load_configuration`."""
+        path = self.configuration_file
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(sys.modules[self.__class__.__module__].__file__), path)
+        for section, setup in load_configuration(path).items():
+            setattr(self, section, setup)
+
+    def prepare(self, force=None, sections=None, dry_run=None, workers=None, keep_going=None,
+                lock_timeout=None, profile=None):
         """Updates content type maps then runs each configuration method
         with the corresponding class attribute.
 
-        Configuration methods update default data in supporting tables."""
+        Configuration methods update default data in supporting tables. A section
+        is skipped if its configuration has not changed since it was last applied
+        unless `force` is True. If `sections` is a list of section names only those
+        sections are prepared.
+
+        All sections are applied in one transaction with a savepoint for each section.
+        If a section fails it is rolled back to its savepoint, marked FAILED and a
+        :class:`PrepareError` naming the section is raised, rolling back the other
+        sections as well; the sections applied before it are marked ROLLED_BACK in the
+        report of the error. If `keep_going` is True the remaining sections are still
+        applied and committed instead; check the report for FAILED sections.
+
+        If `dry_run` is True the transaction is rolled back; the report lists the rows
+        that would be created or updated (see :func:`PrepareReport.diff_lines`). Only rows
+        written by :class:`BulkUpdateOrCreate` are listed.
+
+        If `workers` is greater than 1, sections run on a thread pool, each with its own
+        database connection, as soon as the sections they depend on are done, so the time
+        taken follows the longest chain of dependent sections. Each section is then
+        committed on its own; there is no transaction around all sections. Sections run
+        one after another on SQLite, inside a transaction and when `dry_run` is True.
+
+        Only one process prepares at a time: prepare() holds :func:`lock.configuration_lock`
+        (an advisory lock on PostgreSQL, GET_LOCK() on MySQL, a file lock otherwise) and
+        reads the fingerprints once it has the lock, so processes that start together wait
+        and then skip the sections already applied. If `lock_timeout` (seconds) passes
+        first, ConfigurationLockError is raised.
+
+        GlobalConfiguration changes older than settings.EDC_CONFIGURATION_CHANGE_RETENTION
+        are then deleted, see :func:`ChangeManager.expire`.
+
+        Returns a :class:`PrepareReport` with the status (APPLIED, SKIPPED, FAILED or ROLLED_BACK),
+        wall time, number of queries and rows created, updated and unchanged for each section.
+        The `section_prepared` signal is sent with the report of each section once its
+        transaction has committed or rolled back, then `configuration_prepared` with the
+        report. Each section is logged to the 'edc_configuration' logger. Queries
+        are only counted if `profile` is True, the logger is enabled for INFO or DEBUG
+        is on, see :func:`SectionReport.measure`."""
+        report = PrepareReport()
+        report.dry_run = bool(dry_run)
+        report.profile = bool(profile)
+        sections = self.select_sections(sections)
+        for section, _, _ in sections:
+            report[section] = SectionReport(section)
+        with configuration_lock(timeout=lock_timeout):
+            # read after the lock is acquired so sections applied by the process
+            # that held the lock are skipped
+            fingerprints = dict(ConfigurationFingerprint.objects.values_list('section', 'fingerprint'))
+            if (workers or 1) > 1 and not dry_run and not (
+                    connection.vendor == 'sqlite' or connection.in_atomic_block):
+                self.prepare_concurrently(sections, report, fingerprints, force, workers, keep_going)
+            else:
+                try:
+                    with configuration_cache.atomic():
+                        for section in sections:
+                            self.prepare_section(section, report, fingerprints, force, keep_going)
+                        if dry_run:
+                            transaction.set_rollback(True)
+                except Exception:
+                    for section_report in report.values():
+                        if section_report.status == APPLIED:
+                            section_report.status = ROLLED_BACK
+                    raise
+                finally:
+                    # other processes may have loaded the old values before the commit
+                    configuration_cache.invalidate_on_commit(namespace=self.namespace)
+                    for section_report in report.values():
+                        if section_report.status:
+                            section_prepared.send(sender=self.__class__, section_report=section_report)
+            if not dry_run:
+                GlobalConfigurationChange.objects.expire()
+        configuration_prepared.send(sender=self.__class__, report=report)
+        return report
+
+    def select_sections(self, section_names=None):
+        """Returns the sections named in `section_names`, in the order applied, or all sections."""
+        if not section_names:
+            return self.sections
+        sections = self.sections
+        unknown = set(section_names) - set(section[0] for section in sections)
+        if unknown:
+            raise AppConfigurationError(
+                'Unknown configuration section(s) {}. Expected one of {}.'.format(
+                    sorted(unknown), [section[0] for section in sections]))
+        return [section for section in sections if section[0] in section_names]
+
+    def prepare_concurrently(self, sections, report, fingerprints, force, workers, keep_going=None):
+        """Prepares the sections on a thread pool, each as soon as the sections it depends on are done."""
+        names = set(section[0] for section in sections)
+        dependencies = dict(
+            (name, set(self.section_registry[name].depends_on if name in self.section_registry else ()) & names)
+            for name in names)
+        done = queue.Queue()
+
+        def run(section):
+            error = None
+            try:
+                self.prepare_section(section, report, fingerprints, force, keep_going)
+            except Exception as e:
+                error = e
+            finally:
+                # each section is committed or rolled back on its own
+                section_prepared.send(sender=self.__class__, section_report=report[section[0]])
+                # each thread has its own connection
+                connection.close()
+            done.put((section[0], error))
+
+        pending = list(sections)
+        completed = set()
+        running = 0
+        error = None
+        pool = ThreadPool(workers)
+        try:
+            while pending or running:
+                if error is None:
+                    for section in [section for section in pending if dependencies[section[0]] <= completed]:
+                        pending.remove(section)
+                        pool.apply_async(run, (section, ))
+                        running += 1
+                if not running:
+                    break
+                name, section_error = done.get()
+                running -= 1
+                completed.add(name)
+                error = error or section_error
+        finally:
+            pool.close()
+            pool.join()
+            configuration_cache.invalidate_on_commit(namespace=self.namespace)
+        if error is not None:
+            raise error
+
+    def prepare_section(self, section, report, fingerprints, force, keep_going=None):
+        """Applies one section inside a savepoint (or transaction) unless skipped.
+
+        The caller sends `section_prepared` once the transaction has ended."""
+        section, setup, update = section
+        section_report = report[section]
+        section_fingerprint = fingerprint(setup)
+        error = None
+        if not force and fingerprints.get(self.fingerprint_section(section)) == section_fingerprint:
+            section_report.status = SKIPPED
+        else:
+            self._local.section_report = section_report
+            try:
+                with section_report.measure(count_queries=report.profile or logger.isEnabledFor(logging.INFO)):
+                    with configuration_cache.atomic():
+                        update()
+                        ConfigurationFingerprint.objects.update_or_create(
+                            section=self.fingerprint_section(section),
+                            defaults={'fingerprint': section_fingerprint})
+                section_report.status = APPLIED
+            except Exception as e:
+                section_report.status = FAILED
+                section_report.error = error = e
+                logger.exception('prepare {} failed and was rolled back. Got {}'.format(section, e))
+            finally:
+                self._local.section_report = None
+        if not error and logger.isEnabledFor(logging.INFO):
+            logger.info(
+                'prepare {section} {status} in {seconds:.3f}s, {queries} queries, '
+                '{created} created, {updated} updated, {unchanged} unchanged, {deleted} deleted'.format(
+                    **section_report.as_dict()))
+        if error and not keep_going:
+            raise PrepareError(
+                'Configuration section \'{}\' failed and was rolled back. Got {}'.format(section, error),
+                section=section, report=report)
+
+    def fingerprint_section(self, section):
+        """Returns the name the fingerprint of a section is saved under, qualified by the
+        namespace so that each namespace is applied and skipped on its own."""
+        return '{}.{}'.format(section, self.namespace) if self.namespace else section
+
+    @property
+    def section_report(self):
+        """Returns the report of the section being applied in this thread, if any."""
+        return getattr(self._local, 'section_report', None)
+
+    def record(self, result):
+        """Adds the counts of a BulkResult to the report of the section being applied."""
+        if self.section_report is not None:
+            self.section_report.add(result)
+        return result
+
+    @property
+    def sections(self):
+        """Returns a list of (section name, configuration, update method) of the sections
+        in `section_names`, each after the sections it depends on.
+
+        Sections are registered with `section_registry`, see :class:`SectionRegistry`.
+        The configuration of a section is what its update method reads and is
+        fingerprinted to decide if the section needs to be applied. Each update method
+        imports the apps it writes to, so a section left out of `section_names`
+        never imports them."""
+        return [(section.name, section.get_configuration(self), section.get_apply(self))
+                for section in self.section_registry.ordered(self.section_names)]
+
+    def update_content_type_map(self):
+        from edc_content_type_map.models import ContentTypeMapHelper
         ContentTypeMapHelper().populate()
         ContentTypeMapHelper().sync()
-        self.update_global()
-        #self.update_or_create_consent_type()
-        self.update_or_create_lab_clinic_api()
-        self.update_or_create_lab()
-        self.update_or_create_labeling()
-        self.update_export_plan_setup()
-        self.update_notification_plan_setup()
-        self.update_holidays_setup()
 
     def update_or_create_lab_clinic_api(self):
-        """Configure lab clinic api list models."""
-        for item in self.lab_clinic_api_setup.get('aliquot_type'):
-            try:
-                aliquot_type = AliquotType.objects.get(name=item.name)
-                aliquot_type.alpha_code = item.alpha_code
-                aliquot_type.numeric_code = item.numeric_code
-                aliquot_type.save()
-            except AliquotType.DoesNotExist:
-                AliquotType.objects.create(
-                    name=item.name,
-                    alpha_code=item.alpha_code,
-                    numeric_code=item.numeric_code)
+        """Configure lab clinic api list models.
+
+        Aliquot types are added to panels; links that are not declared are kept."""
+        from edc_lab.lab_clinic_api.models import AliquotType, Panel
+        self.record(BulkUpdateOrCreate(AliquotType, ('name', ), ('alpha_code', 'numeric_code')).update_or_create([
+            dict(name=item.name, alpha_code=item.alpha_code, numeric_code=item.numeric_code)
+            for item in self.lab_clinic_api_setup.get('aliquot_type')]))
         # update / create panels
-        for item in self.lab_clinic_api_setup.get('panel'):
-            try:
-                panel = Panel.objects.get(name=item.name)
-                panel.panel_type = item.panel_type
-                panel.save()
-            except Panel.DoesNotExist:
-                panel = Panel.objects.create(name=item.name, panel_type=item.panel_type)
-            # add aliquots to panel
-            aliquot_type = AliquotType.objects.get(alpha_code=item.aliquot_type_alpha_code)
-            panel.aliquot_type.add(aliquot_type)
+        items = self.lab_clinic_api_setup.get('panel')
+        self.record(BulkUpdateOrCreate(Panel, ('name', ), ('panel_type', )).update_or_create([
+            dict(name=item.name, panel_type=item.panel_type) for item in items]))
+        panels = fetch_by(Panel, 'name', [item.name for item in items])
+        aliquot_types = fetch_by(AliquotType, 'alpha_code', [item.aliquot_type_alpha_code for item in items])
+        # add aliquots to panel
+        links = {}
+        for item in items:
+            links.setdefault(panels[item.name].pk, set()).add(aliquot_types[item.aliquot_type_alpha_code].pk)
+        sync_many_to_many(Panel, 'aliquot_type', links, remove=False)
 
     def update_or_create_lab(self):
         """Updates profiles and supporting list tables for site
@@ -112,132 +349,96 @@ class BaseAppConfiguration(object):
             self.update_or_create_lab_profiles(setup_items)
 
     def update_or_create_lab_destinations(self, setup_items):
-        """Updates / creates destination (shipping destination)."""
-        for item in setup_items.get('destination', []):
-            try:
-                destination = Destination.objects.get(code=item.code)
-                destination.name = item.name
-                destination.address = item.address
-                destination.tel = item.tel
-                destination.email = item.email
-                destination.save(update_fields=['name', 'address', 'tel', 'email'])
-            except Destination.DoesNotExist:
-                Destination.objects.create(
-                    code=item.code,
-                    name=item.name,
-                    address=item.address,
-                    tel=item.tel,
-                    email=item.email)
-            except MultipleObjectsReturned:
-                Destination.objects.filter(code=item.code).delete()
-                Destination.objects.create(
-                    code=item.code,
-                    name=item.name,
-                    address=item.address,
-                    tel=item.tel,
-                    email=item.email)
+        """Updates / creates destination (shipping destination).
+
+        If there is more than one destination for a code the one with the lowest pk
+        is kept and updated and the others are deleted."""
+        from edc_lab.lab_packing.models import Destination
+        self.record(BulkUpdateOrCreate(
+            Destination, ('code', ), ('name', 'address', 'tel', 'email'), delete_duplicates=True
+        ).update_or_create([
+            dict(code=item.code, name=item.name, address=item.address, tel=item.tel, email=item.email)
+            for item in setup_items.get('destination', [])]))
 
     def update_or_create_lab_aliquot_types(self, setup_items):
         """Updates / creates aliquot_types."""
-        for item in setup_items.get('aliquot_type'):
-            try:
-                aliquot_type = self.aliquot_type_model.objects.get(name=item.name)
-                aliquot_type.alpha_code = item.alpha_code
-                aliquot_type.numeric_code = item.numeric_code
-                aliquot_type.save(update_fields=['alpha_code', 'numeric_code'])
-            except self.aliquot_type_model.DoesNotExist:
-                self.aliquot_type_model.objects.create(
-                    name=item.name,
-                    alpha_code=item.alpha_code,
-                    numeric_code=item.numeric_code)
+        self.record(BulkUpdateOrCreate(
+            self.aliquot_type_model, ('name', ), ('alpha_code', 'numeric_code')
+        ).update_or_create([
+            dict(name=item.name, alpha_code=item.alpha_code, numeric_code=item.numeric_code)
+            for item in setup_items.get('aliquot_type')]))
 
     def update_or_create_lab_panels(self, setup_items):
-        """Updates / creates panels and links them to aliquot_types."""
-        for item in setup_items.get('panel'):
-            try:
-                panel = self.panel_model.objects.get(name=item.name)
-                panel.panel_type = item.panel_type
-                panel.save(update_fields=['panel_type'])
-            except self.panel_model.DoesNotExist:
-                panel = self.panel_model.objects.create(
-                    name=item.name,
-                    panel_type=item.panel_type)
-            # add aliquots to panel
-            panel.aliquot_type.clear()
-            aliquot_type = self.aliquot_type_model.objects.get(alpha_code=item.aliquot_type_alpha_code)
-            panel.aliquot_type.add(aliquot_type)
-            # create lab entry requisition panels based on this panel info
-            try:
-                requisition_panel = RequisitionPanel.objects.get(name=item.name)
-                requisition_panel.aliquot_type_alpha_code = item.aliquot_type_alpha_code
-                requisition_panel.save(update_fields=['aliquot_type_alpha_code'])
-            except RequisitionPanel.DoesNotExist:
-                requisition_panel = RequisitionPanel.objects.create(
-                    name=item.name, aliquot_type_alpha_code=item.aliquot_type_alpha_code)
+        """Updates / creates panels and links them to aliquot_types.
+
+        Each panel is linked to the one aliquot type of its `aliquot_type_alpha_code`;
+        links are only changed for panels where they differ."""
+        from edc_meta_data.models import RequisitionPanel
+        items = setup_items.get('panel')
+        self.record(BulkUpdateOrCreate(self.panel_model, ('name', ), ('panel_type', )).update_or_create([
+            dict(name=item.name, panel_type=item.panel_type) for item in items]))
+        panels = fetch_by(self.panel_model, 'name', [item.name for item in items])
+        aliquot_types = fetch_by(
+            self.aliquot_type_model, 'alpha_code', [item.aliquot_type_alpha_code for item in items])
+        # add aliquots to panel
+        sync_many_to_many(self.panel_model, 'aliquot_type', dict(
+            (panels[item.name].pk, set([aliquot_types[item.aliquot_type_alpha_code].pk])) for item in items))
+        # create lab entry requisition panels based on this panel info
+        self.record(BulkUpdateOrCreate(
+            RequisitionPanel, ('name', ), ('aliquot_type_alpha_code', )
+        ).update_or_create([
+            dict(name=item.name, aliquot_type_alpha_code=item.aliquot_type_alpha_code) for item in items]))
 
     def update_or_create_lab_profiles(self, setup_items):
-        """ Updates / creates profiles."""
-        for item in setup_items.get('profile'):
-            aliquot_type = self.aliquot_type_model.objects.get(alpha_code=item.alpha_code)
-            try:
-                profile = self.profile_model.objects.get(name=item.profile_name)
-                profile.aliquot_type = aliquot_type
-                profile.save(update_fields=['aliquot_type'])
-            except self.profile_model.DoesNotExist:
-                self.profile_model.objects.create(name=item.profile_name, aliquot_type=aliquot_type)
+        """ Updates / creates profiles and profile items."""
+        profile_items = setup_items.get('profile_item')
+        aliquot_types = fetch_by(
+            self.aliquot_type_model, 'alpha_code',
+            [item.alpha_code for item in setup_items.get('profile')] + [item.alpha_code for item in profile_items])
+        self.record(BulkUpdateOrCreate(self.profile_model, ('name', ), ('aliquot_type_id', )).update_or_create([
+            dict(name=item.profile_name, aliquot_type_id=aliquot_types[item.alpha_code].pk)
+            for item in setup_items.get('profile')]))
         # add profile items
-        for item in setup_items.get('profile_item'):
-            profile = self.profile_model.objects.get(name=item.profile_name)
-            aliquot_type = self.aliquot_type_model.objects.get(alpha_code=item.alpha_code)
-            try:
-                profile_item = self.profile_item_model.objects.get(profile=profile, aliquot_type=aliquot_type)
-                profile_item.volume = item.volume
-                profile_item.count = item.count
-                profile_item.save(update_fields=['volume', 'count'])
-            except self.profile_item_model.DoesNotExist:
-                self.profile_item_model.objects.create(
-                    profile=profile, aliquot_type=aliquot_type, volume=item.volume, count=item.count)
+        profiles = fetch_by(self.profile_model, 'name', [item.profile_name for item in profile_items])
+        self.record(BulkUpdateOrCreate(
+            self.profile_item_model, ('profile_id', 'aliquot_type_id'), ('volume', 'count')
+        ).update_or_create([
+            dict(profile_id=profiles[item.profile_name].pk, aliquot_type_id=aliquot_types[item.alpha_code].pk,
+                 volume=item.volume, count=item.count)
+            for item in profile_items]))
 
     def update_or_create_labeling(self):
         """Updates configuration in the :mod:`labeling` module."""
-
-        for printer_setup in self.labeling_setup.get('label_printer', []):
-            try:
-                label_printer = LabelPrinter.objects.get(cups_printer_name=printer_setup.cups_printer_name,
-                                                         cups_server_hostname=printer_setup.cups_server_hostname)
-                label_printer.cups_server_ip = printer_setup.cups_server_ip
-                label_printer.default = printer_setup.default
-                label_printer.save(update_fields=['cups_server_ip', 'default'])
-            except LabelPrinter.DoesNotExist:
-                LabelPrinter.objects.create(
-                    cups_printer_name=printer_setup.cups_printer_name,
-                    cups_server_hostname=printer_setup.cups_server_hostname,
-                    cups_server_ip=printer_setup.cups_server_ip,
-                    default=printer_setup.default)
-        for client_setup in self.labeling_setup.get('client', []):
-            try:
-                client = Client.objects.get(name=client_setup.hostname)
-                client.label_printer = LabelPrinter.objects.get(
-                    cups_printer_name=client_setup.printer_name,
-                    cups_server_hostname=client_setup.cups_hostname)
-                client.save(update_fields=['label_printer'])
-            except Client.DoesNotExist:
-                Client.objects.create(
-                    name=client_setup.hostname,
-                    label_printer=LabelPrinter.objects.get(
-                        cups_printer_name=client_setup.printer_name,
-                        cups_server_hostname=client_setup.cups_hostname))
-        for zpl_template_setup in self.labeling_setup.get('zpl_template', []):
-            try:
-                zpl_template = ZplTemplate.objects.get(name=zpl_template_setup.name)
-                zpl_template.template = zpl_template_setup.template
-                zpl_template.default = zpl_template_setup.default
-                zpl_template.save(update_fields=['template', 'default'])
-            except ZplTemplate.DoesNotExist:
-                ZplTemplate.objects.create(
-                    name=zpl_template_setup.name,
-                    template=zpl_template_setup.template,
-                    default=zpl_template_setup.default)
+        from lis.labeling.models import LabelPrinter, ZplTemplate, Client
+        self.record(BulkUpdateOrCreate(
+            LabelPrinter, ('cups_printer_name', 'cups_server_hostname'), ('cups_server_ip', 'default')
+        ).update_or_create([
+            dict(cups_printer_name=printer_setup.cups_printer_name,
+                 cups_server_hostname=printer_setup.cups_server_hostname,
+                 cups_server_ip=printer_setup.cups_server_ip,
+                 default=printer_setup.default)
+            for printer_setup in self.labeling_setup.get('label_printer', [])]))
+        client_setups = self.labeling_setup.get('client', [])
+        if client_setups:
+            label_printers = dict(
+                ((label_printer.cups_printer_name, label_printer.cups_server_hostname), label_printer)
+                for label_printer in LabelPrinter.objects.filter(
+                    cups_printer_name__in=[client_setup.printer_name for client_setup in client_setups]))
+            clients = []
+            for client_setup in client_setups:
+                try:
+                    label_printer = label_printers[(client_setup.printer_name, client_setup.cups_hostname)]
+                except KeyError:
+                    raise LabelPrinter.DoesNotExist(
+                        'LabelPrinter matching query does not exist. Got {}@{}.'.format(
+                            client_setup.printer_name, client_setup.cups_hostname))
+                clients.append(dict(name=client_setup.hostname, label_printer_id=label_printer.pk))
+            self.record(BulkUpdateOrCreate(Client, ('name', ), ('label_printer_id', )).update_or_create(clients))
+        self.record(BulkUpdateOrCreate(ZplTemplate, ('name', ), ('template', 'default')).update_or_create([
+            dict(name=zpl_template_setup.name,
+                 template=zpl_template_setup.template,
+                 default=zpl_template_setup.default)
+            for zpl_template_setup in self.labeling_setup.get('zpl_template', [])]))
 
     def update_global(self):
         """Creates or updates global configuration options in app_configuration.
@@ -259,59 +460,53 @@ class BaseAppConfiguration(object):
             ...
 
         """
-        for category_name, category_configuration in self.configurations.items():
-            for attr, value in category_configuration.items():
-                try:
-                    value, convert = value
-                except (ValueError, TypeError):
-                    value, convert = value, True
-                convert = Convert(value, convert)
-                string_value = convert.to_string()
-                try:
-                    global_configuration = GlobalConfiguration.objects.get(attribute=attr)
-                    global_configuration.value = string_value
-                    global_configuration.convert = convert.convert
-                    global_configuration.save()
-                except GlobalConfiguration.DoesNotExist:
-                    GlobalConfiguration.objects.create(
-                        category=category_name, attribute=attr, value=string_value, convert=convert.convert)
+        rows = [dict(row, namespace=self.namespace) for row in self.configurations.rows]
+        result = self.record(BulkUpdateOrCreate(
+            GlobalConfiguration, ('namespace', 'attribute'), ('value', 'convert', 'value_type')
+        ).update_or_create(rows))
+        # bulk writes do not send post_save
+        GlobalConfigurationChange.objects.record_changed(rows, result)
+        configuration_cache.invalidate_on_commit(namespace=self.namespace)
 
     @property
     def configurations(self):
-        """Returns a dictionary of configurations to be used to update GlobalConfiguration model.
+        """Returns a :class:`CompiledConfiguration`, a read-only dictionary of configurations
+        to be used to update GlobalConfiguration model.
 
         Starts with the default_global_configuration and updates or adds any items changed
-        by global_configurations."""
-
-        configuration = deepcopy(default_global_configuration)
-        for category, config in self.global_configuration.items():
-            if configuration.get(category):
-                for key, value in config.items():
-                    configuration[category].update({key: value})
-            else:
-                configuration[category] = config
-        return configuration
+        by global_configuration. In a namespace only global_configuration is used; the defaults
+        are read from the global namespace. The result is validated and compiled once and
+        reused until `global_configuration` is replaced, see :func:`get_compiled_configuration`."""
+        return get_compiled_configuration(
+            self.global_configuration, NO_DEFAULTS if self.namespace else default_global_configuration)
 
     def update_export_plan_setup(self):
         if self.export_plan_setup:
+            from edc_export.helpers import ExportHelper
             ExportHelper.update_plan(self.export_plan_setup)
 
     def update_notification_plan_setup(self):
         if self.notification_plan_setup:
+            from edc_notification.models import NotificationHelper
             notification_helper = NotificationHelper()
             notification_helper.update_plan(self.notification_plan_setup)
 
     def update_holidays_setup(self):
-        """Updates holiday configurations in appointment__holiday module."""
-        for holiday in self.holidays_setup:
-            if not Holiday.objects.filter(holiday_name=holiday).exists():
-                Holiday.objects.create(holiday_name=holiday, holiday_date=self.holidays_setup.get(holiday))
-            else:
-                updated_holiday = Holiday.objects.get(holiday_name=holiday)
-                updated_holiday.holiday_date = self.holidays_setup.get(holiday)
-                updated_holiday.save()
+        """Updates holiday configurations in appointment__holiday module.
+
+        If `prune_holidays` is True holidays that are not in holidays_setup are deleted.
+        See :class:`holidays.HolidayCalendar` for date lookups without queries."""
+        from edc_appointment.models import Holiday
+        self.record(BulkUpdateOrCreate(
+            Holiday, ('holiday_name', ), ('holiday_date', ), prune=self.prune_holidays
+        ).update_or_create([
+            dict(holiday_name=holiday, holiday_date=holiday_date)
+            for holiday, holiday_date in self.holidays_setup.items()]))
+        # bulk writes do not send post_save
+        holiday_calendar.invalidate()
 
     def update_or_create_consent_type(self):
+        from edc_consent.consent_type import ConsentType
         for item in self.consent_type_setup:
             if settings.USE_TZ:
                 item['start_datetime'] = localize(item.get('start_datetime'))
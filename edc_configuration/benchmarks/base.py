@@ -0,0 +1,20 @@
+import time
+
+from collections import OrderedDict
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def measure(func, number=None):
+    """Calls `func` `number` times and returns an OrderedDict of the mean
+    seconds and mean number of queries per call."""
+    number = number or 1
+    with CaptureQueriesContext(connection) as context:
+        start = time.time()
+        for _ in range(0, number):
+            func()
+        seconds = time.time() - start
+    return OrderedDict([
+        ('seconds', seconds / number),
+        ('queries', len(context.captured_queries) / float(number))])
@@ -0,0 +1,32 @@
+import json
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=None):
+    """Returns a list of (name, baseline, result, message) for each regression.
+
+    A regression is more queries than the baseline or more than `tolerance` times
+    the baseline seconds (default 1.25)."""
+    tolerance = tolerance or 1.25
+    regressions = []
+    for name, result in results.items():
+        try:
+            previous = baseline[name]
+        except KeyError:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append((name, previous, result, 'queries {queries} > {previous}'.format(
+                queries=result['queries'], previous=previous['queries'])))
+        elif result['seconds'] > previous['seconds'] * tolerance:
+            regressions.append((name, previous, result, 'seconds {:.6f} > {:.6f} x {}'.format(
+                result['seconds'], previous['seconds'], tolerance)))
+    return regressions
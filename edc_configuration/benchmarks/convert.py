@@ -0,0 +1,89 @@
+"""Micro-benchmark of Convert.to_value() for each detected type.
+
+Compares the exception driven cascade that was replaced with the single-pass
+classifier (Convert.convert_value) and the memoized Convert.to_value::
+
+    python -m edc_configuration.benchmarks.convert
+"""
+import timeit
+
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from ..convert import Convert, ConvertError, convert_cache
+
+SAMPLES = OrderedDict([
+    ('time', '11:00'),
+    ('boolean', 'True'),
+    ('decimal', '12345.0'),
+    ('int', '1234567'),
+    ('datetime', '2016-01-05 09:35'),
+    ('str', 'default'),
+])
+
+VALUES = OrderedDict([
+    ('boolean', True),
+    ('decimal', Decimal('12345.0')),
+    ('int', 1234567),
+    ('date', date(2016, 1, 5)),
+    ('datetime', datetime(2016, 1, 5, 9, 35)),
+    ('str', 'default'),
+])
+
+
+def cascade_to_value(value):
+    """Reference implementation of the original Convert.to_value()."""
+    convert = Convert(value)
+    string_value = value.strip(' "')
+    for converter in (convert.to_time, convert.to_boolean, convert.to_decimal, convert.to_int):
+        try:
+            return converter(string_value)
+        except ConvertError:
+            pass
+    try:
+        with override_settings(USE_TZ=True):
+            return convert.to_datetime(string_value)
+    except ConvertError:
+        pass
+    return string_value
+
+
+def benchmark_convert(number=None):
+    """Returns an OrderedDict of type to (cascade, classifier, memoized) seconds for `number` calls."""
+    number = number or 10000
+    results = OrderedDict()
+    convert_cache.clear()
+    for value_type, value in SAMPLES.items():
+        cascade = min(timeit.repeat(lambda: cascade_to_value(value), number=number, repeat=3))
+        classifier = min(timeit.repeat(lambda: Convert(value).convert_value(), number=number, repeat=3))
+        memoized = min(timeit.repeat(lambda: Convert(value).to_value(), number=number, repeat=3))
+        results[value_type] = (cascade, classifier, memoized)
+    return results
+
+
+def benchmark_to_string(number=None):
+    """Returns an OrderedDict of type to seconds for `number` calls to Convert.to_string()."""
+    number = number or 10000
+    results = OrderedDict()
+    for value_type, value in VALUES.items():
+        results[value_type] = min(timeit.repeat(lambda: Convert(value).to_string(), number=number, repeat=3))
+    return results
+
+
+def main(number=None):
+    number = number or 10000
+    print('{:<10}{:>14}{:>14}{:>10}{:>14}{:>10}'.format(
+        'type', 'cascade (s)', 'classify (s)', 'speedup', 'memoized (s)', 'speedup'))
+    for value_type, (cascade, classifier, memoized) in benchmark_convert(number).items():
+        print('{:<10}{:>14.4f}{:>14.4f}{:>9.1f}x{:>14.4f}{:>9.1f}x'.format(
+            value_type, cascade, classifier, cascade / classifier, memoized, cascade / memoized))
+    print(convert_cache.info())
+
+if __name__ == '__main__':
+    if not settings.configured:
+        settings.configure(USE_TZ=True, TIME_ZONE='UTC')
+    main()
@@ -0,0 +1,76 @@
+"""Benchmarks of module import time measured with `python -X importtime` (Python 3.7+)
+in a fresh interpreter for each run.
+
+Run from a project directory with DJANGO_SETTINGS_MODULE set::
+
+    python -m edc_configuration.benchmarks.imports
+"""
+import os
+import re
+import subprocess
+import sys
+
+from collections import OrderedDict
+
+MODULES = (
+    'edc_configuration.models',
+    'edc_configuration.config',
+    'edc_configuration.base_app_configuration')
+
+IMPORT_TIME = re.compile(r'^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s+)(?P<module>\S+)$')
+
+
+def parse_importtime(output):
+    """Returns a list of (module, depth, self microseconds, cumulative microseconds)
+    from the stderr of `python -X importtime`."""
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            imports.append((
+                match.group('module'), (len(match.group('indent')) - 1) // 2,
+                int(match.group('self')), int(match.group('cumulative'))))
+    return imports
+
+
+def import_time(module):
+    """Returns the output of `python -X importtime` parsed by :func:`parse_importtime` for
+    importing `module` after django.setup().
+
+    Only modules not already imported by django.setup() are listed."""
+    if sys.version_info < (3, 7):
+        raise RuntimeError('python -X importtime needs Python 3.7 or later.')
+    code = ('import django, sys; django.setup(); sys.stderr.write("--setup--\\n"); sys.stderr.flush(); '
+            'import {}'.format(module))
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=dict(os.environ), universal_newlines=True)
+    _, stderr = process.communicate()
+    if process.returncode:
+        raise RuntimeError('Importing {} failed. Got {}'.format(module, stderr.strip().splitlines()[-1:]))
+    return parse_importtime(stderr.split('--setup--', 1)[-1])
+
+
+def benchmark_imports(modules=None, number=None):
+    """Returns an OrderedDict of module name to the median cumulative import time in
+    seconds over `number` fresh interpreters, and the slowest modules it imports."""
+    results = OrderedDict()
+    for module in modules or MODULES:
+        runs = [import_time(module) for _ in range(0, number or 5)]
+        cumulative = sorted(
+            sum(item[3] for item in imports if item[1] == 0) for imports in runs)[len(runs) // 2]
+        slowest = sorted(runs[-1], key=lambda item: -item[2])[:5]
+        results[module] = OrderedDict([
+            ('seconds', cumulative / 1000000.0),
+            ('slowest', [(name, self_us / 1000000.0) for name, _, self_us, _ in slowest])])
+    return results
+
+
+def main(number=None):
+    for module, result in benchmark_imports(number=number).items():
+        print('{:<45}{:>10.4f} s'.format(module, result['seconds']))
+        for name, seconds in result['slowest']:
+            print('    {:<41}{:>10.4f} s'.format(name, seconds))
+
+if __name__ == '__main__':
+    main()
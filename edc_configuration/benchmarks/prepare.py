@@ -0,0 +1,56 @@
+"""Benchmarks of BaseAppConfiguration.prepare() with synthetic lab setups."""
+from collections import OrderedDict
+
+from django.db import transaction
+
+from ..base_app_configuration import BaseAppConfiguration
+from .base import measure
+
+
+def synthetic_lab_setup(size):
+    """Returns a lab_setup with `size` aliquot types, panels and profile items."""
+    from edc_lab.lab_profile.classes import ProfileItemTuple, ProfileTuple
+    from lis.specimen.lab_aliquot_list.classes import AliquotTypeTuple
+    from lis.specimen.lab_panel.classes import PanelTuple
+
+    profile_count = max(1, size // 10)
+    alpha_codes = ['A{}'.format(index) for index in range(0, size)]
+    return {'benchmark': {
+        'aliquot_type': [AliquotTypeTuple('Aliquot type {}'.format(index), alpha_code, '{:02d}'.format(index % 100))
+                         for index, alpha_code in enumerate(alpha_codes)],
+        'panel': [PanelTuple('Panel {}'.format(index), 'TEST', alpha_code)
+                  for index, alpha_code in enumerate(alpha_codes)],
+        'profile': [ProfileTuple('Profile {}'.format(index), alpha_codes[index])
+                    for index in range(0, profile_count)],
+        'profile_item': [ProfileItemTuple('Profile {}'.format(index % profile_count), alpha_code, 1.0, 1)
+                         for index, alpha_code in enumerate(alpha_codes)]}}
+
+
+def synthetic_configuration(size):
+    """Returns a BaseAppConfiguration class for a synthetic lab setup of `size`."""
+    from edc_testing.models import TestAliquotType, TestPanel, TestProfile, TestProfileItem
+
+    return type(str('SyntheticAppConfiguration{}'.format(size)), (BaseAppConfiguration, ), dict(
+        aliquot_type_model=TestAliquotType,
+        panel_model=TestPanel,
+        profile_model=TestProfile,
+        profile_item_model=TestProfileItem,
+        lab_clinic_api_setup={'aliquot_type': [], 'panel': []},
+        lab_setup=synthetic_lab_setup(size)))
+
+
+def benchmark_prepare(sizes=None):
+    """Returns an OrderedDict of name to measurement, see :func:`measure`, for each size.
+
+    For each size prepare() is measured on empty tables (cold), again with nothing
+    changed (unchanged) and again with force=True (forced). Changes are rolled back."""
+    sizes = sizes or [10, 1000, 10000]
+    results = OrderedDict()
+    for size in sizes:
+        app_configuration = synthetic_configuration(size)(use_site_lab_profiles=False)
+        with transaction.atomic():
+            results['prepare.{}.cold'.format(size)] = measure(app_configuration.prepare)
+            results['prepare.{}.unchanged'.format(size)] = measure(app_configuration.prepare)
+            results['prepare.{}.forced'.format(size)] = measure(lambda: app_configuration.prepare(force=True))
+            transaction.set_rollback(True)
+    return results
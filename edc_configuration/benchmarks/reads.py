@@ -0,0 +1,27 @@
+"""Benchmarks of reading GlobalConfiguration values cold (cache invalidated
+before each read) and warm (served from the configuration cache)."""
+from collections import OrderedDict
+
+from ..cache import configuration_cache
+from ..defaults import default_global_configuration
+from ..models import GlobalConfiguration
+from .base import measure
+
+
+def benchmark_reads(number=None):
+    """Returns an OrderedDict of name to measurement, see :func:`measure`."""
+    number = number or 1000
+    for category, configuration in default_global_configuration.items():
+        for attribute, value in configuration.items():
+            GlobalConfiguration.objects.set_attr(attribute, value)
+    results = OrderedDict()
+
+    def cold():
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.get_attr_value('appointments_per_day_max')
+    results['get_attr_value.cold'] = measure(cold, number)
+    GlobalConfiguration.objects.get_attr_value('appointments_per_day_max')
+    results['get_attr_value.warm'] = measure(
+        lambda: GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), number)
+    results['snapshot'] = measure(lambda: GlobalConfiguration.objects.snapshot(), number)
+    return results
@@ -0,0 +1,208 @@
+from collections import namedtuple, OrderedDict
+
+from django.core.exceptions import MultipleObjectsReturned
+
+from .diff import CREATE, DELETE, NOOP, UPDATE, diff
+
+
+class BulkResult(namedtuple('BulkResult', 'created updated unchanged')):
+    """Counts of rows created, updated and unchanged.
+
+    :class:`BulkUpdateOrCreate` also sets `model`, `deleted`, the number of rows
+    deleted, `changes`, a list of (action, key, {field: (old value, new value)}) for
+    each row created, updated or deleted, and `changeset`, the :class:`diff.Changeset`."""
+
+    model = None
+    deleted = 0
+    changes = ()
+    changeset = None
+
+
+def chunked(values, size):
+    """Yields lists of at most `size` values (keeps `__in` lookups under the SQLite variable limit)."""
+    values = list(values)
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+def fetch_by(model, field, values, batch_size=500):
+    """Returns a dictionary of `field` value to instance of `model` using one query per batch.
+
+    Raises model.DoesNotExist if a value is not found."""
+    values = set(values)
+    instances = {}
+    for batch in chunked(values, batch_size):
+        for obj in model.objects.filter(**{'{}__in'.format(field): batch}):
+            instances[getattr(obj, field)] = obj
+    missing = values - set(instances)
+    if missing:
+        raise model.DoesNotExist(
+            '{} matching query does not exist. Got {}={}.'.format(
+                model._meta.object_name, field, sorted(missing)))
+    return instances
+
+
+def fetch_by_key(model, fields, keys, batch_size=500):
+    """Returns a dictionary of key (a tuple of values of `fields`) to instance of `model`
+    using one query per batch.
+
+    Raises model.DoesNotExist if a key is not found."""
+    fields = tuple(fields)
+    keys = set(tuple(key) for key in keys)
+    instances = {}
+    for batch in chunked(set(key[0] for key in keys), batch_size):
+        for obj in model.objects.filter(**{'{}__in'.format(fields[0]): batch}):
+            key = tuple(getattr(obj, field) for field in fields)
+            if key in keys:
+                instances[key] = obj
+    missing = keys - set(instances)
+    if missing:
+        raise model.DoesNotExist(
+            '{} matching query does not exist. Got {}={}.'.format(
+                model._meta.object_name, fields, sorted(missing)))
+    return instances
+
+
+def sync_many_to_many(model, field_name, links, batch_size=500, remove=True):
+    """Sets the targets of the many to many field `field_name` of each instance in `links`,
+    a dictionary of instance pk to a set of target pks, and returns the number of instances
+    changed.
+
+    Current links are read from the through table in one query per batch and only the
+    links of instances where they differ are deleted and bulk created. If `remove` is
+    False missing links are added and other links are kept."""
+    field = model._meta.get_field(field_name)
+    through = getattr(model, field_name).through
+    source_attname = '{}_id'.format(field.m2m_field_name())
+    target_attname = '{}_id'.format(field.m2m_reverse_field_name())
+    current = dict((pk, set()) for pk in links)
+    for batch in chunked(links, batch_size):
+        for source_pk, target_pk in through.objects.filter(
+                **{'{}__in'.format(source_attname): batch}).values_list(source_attname, target_attname):
+            current[source_pk].add(target_pk)
+    if remove:
+        changed = [pk for pk, target_pks in links.items() if current[pk] != set(target_pks)]
+        for batch in chunked(changed, batch_size):
+            through.objects.filter(**{'{}__in'.format(source_attname): batch}).delete()
+        added = dict((pk, links[pk]) for pk in changed)
+    else:
+        added = dict((pk, set(target_pks) - current[pk]) for pk, target_pks in links.items())
+        added = dict((pk, target_pks) for pk, target_pks in added.items() if target_pks)
+    through.objects.bulk_create([
+        through(**{source_attname: pk, target_attname: target_pk})
+        for pk, target_pks in added.items() for target_pk in target_pks], batch_size=batch_size)
+    return len(added)
+
+
+class BulkUpdateOrCreate(object):
+    """Updates or creates instances of `model` from a list of dictionaries in a few queries.
+
+    Existing rows are fetched with one `filter(<lookup>__in=...)` query and compared in
+    memory (see :func:`diff.diff`). New rows are inserted with one `bulk_create` and
+    changed rows are updated with one `update()` per distinct set of values. Unchanged
+    rows are not written.
+
+    `lookup` is a tuple of field attnames that identify a row, `update_fields` are the
+    attnames compared and updated on existing rows. Any other keys in an item are only
+    used when creating. Use attnames for foreign keys, e.g. 'aliquot_type_id'.
+
+    If `prune` is True all rows are fetched with one query and rows that are not in the
+    items are deleted. Otherwise rows are never deleted.
+
+    If more than one row has the same key MultipleObjectsReturned is raised or, if
+    `delete_duplicates` is True, the row with the lowest pk is kept and the others are
+    deleted as DELETE changes of the changeset.
+
+    Note: `bulk_create` and `update()` do not call `save()` or send model signals.
+
+    Usage::
+        BulkUpdateOrCreate(Destination, ('code', ), ('name', 'address')).update_or_create(
+            [{'code': '01', 'name': 'Lab', 'address': 'Gaborone'}])
+    """
+
+    batch_size = 500
+
+    def __init__(self, model, lookup, update_fields, delete_duplicates=None, prune=None):
+        self.model = model
+        self.lookup = tuple(lookup)
+        self.update_fields = tuple(update_fields)
+        self.delete_duplicates = delete_duplicates
+        self.prune = prune
+
+    def key(self, item):
+        return tuple(item[field] for field in self.lookup)
+
+    def querysets(self, items):
+        """Yields the querysets of the existing rows, one per batch, or all rows if pruning."""
+        if self.prune:
+            yield self.model.objects.all()
+        else:
+            values = set(item[self.lookup[0]] for item in items)
+            for batch in chunked(values, self.batch_size):
+                yield self.model.objects.filter(**{'{}__in'.format(self.lookup[0]): batch})
+
+    def fetch(self, items):
+        """Returns a dictionary of existing instances by key and a list of the duplicate
+        instances to delete, using one query per batch."""
+        existing = {}
+        duplicates = {}
+        for queryset in self.querysets(items):
+            for obj in queryset.order_by('pk'):
+                key = tuple(getattr(obj, field) for field in self.lookup)
+                if key in existing:
+                    duplicates.setdefault(key, []).append(obj)
+                else:
+                    existing[key] = obj
+        if duplicates:
+            if not self.delete_duplicates:
+                raise MultipleObjectsReturned(
+                    'Found more than one {} for {}. Got {}.'.format(
+                        self.model._meta.object_name, self.lookup, sorted(duplicates)))
+        # keep one row, the same in every process, so references to it stay valid
+        return existing, [obj for objs in duplicates.values() for obj in objs]
+
+    def diff(self, items):
+        """Returns the :class:`diff.Changeset` of the items compared with the stored rows.
+
+        If an item key is repeated the last item wins."""
+        items = OrderedDict((self.key(item), item) for item in items)
+        existing, duplicates = self.fetch(list(items.values())) if items or self.prune else ({}, [])
+        return diff(self.model, self.lookup, self.update_fields, items, existing, prune=self.prune,
+                    duplicates=duplicates)
+
+    def apply(self, changeset):
+        """Writes the changes of a changeset, nothing if it is empty."""
+        if not changeset:
+            return
+        new_objs = [change.instance for change in changeset.creates]
+        if new_objs:
+            self.model.objects.bulk_create(new_objs, batch_size=self.batch_size)
+        changed = OrderedDict()
+        for change in changeset.updates:
+            values = tuple(change.fields[field][1] if field in change.fields else getattr(change.instance, field)
+                           for field in self.update_fields)
+            changed.setdefault(values, []).append(change.instance.pk)
+        for values, pks in changed.items():
+            for batch in chunked(pks, self.batch_size):
+                self.model.objects.filter(pk__in=batch).update(**dict(zip(self.update_fields, values)))
+        for batch in chunked([change.instance.pk for change in changeset.deletes], self.batch_size):
+            self.model.objects.filter(pk__in=batch).delete()
+
+    def update_or_create(self, items):
+        """Updates or creates a row for each item, deletes rows not in the items if pruning,
+        and returns a BulkResult of counts.
+
+        If an item key is repeated the last item wins."""
+        changeset = self.diff(items)
+        self.apply(changeset)
+        return self.result(changeset)
+
+    def result(self, changeset):
+        counts = changeset.counts()
+        result = BulkResult(counts[CREATE], counts[UPDATE], counts[NOOP])
+        result.model = self.model
+        result.deleted = counts[DELETE]
+        result.changes = [
+            (change.action, change.key, change.fields) for change in changeset.changes if change.action != NOOP]
+        result.changeset = changeset
+        return result
@@ -0,0 +1,272 @@
+import gzip
+import io
+import json
+
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .bulk import BulkResult, BulkUpdateOrCreate, fetch_by_key, sync_many_to_many
+from .cache import configuration_cache
+from .exceptions import AppConfigurationError
+from .holidays import holiday_calendar
+from .models import GlobalConfiguration, GlobalConfigurationChange
+
+BUNDLE = 'edc_configuration'
+BUNDLE_VERSION = 2
+
+
+class BundleType(object):
+    """The rows of one model in a configuration bundle.
+
+    `lookup` names the fields that identify a row and `fields` the other fields
+    exported and updated. A foreign key in `lookup` or `fields` is written as the list
+    of values of the fields of the related row named in `foreign_keys`, e.g.
+    {'aliquot_type': ('alpha_code', )}. A many to many field in `many_to_many` is
+    written as a list of the values of one field of each related row."""
+
+    def __init__(self, name, model, lookup, fields, foreign_keys=None, many_to_many=None, after=None):
+        self.name = name
+        self.model = model
+        self.lookup = tuple(lookup)
+        self.fields = tuple(fields)
+        self.foreign_keys = foreign_keys or {}
+        self.many_to_many = many_to_many or {}
+        # called with the rows and the BulkResult of each batch imported
+        self.after = after
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.name)
+
+    def attname(self, field_name):
+        return self.model._meta.get_field(field_name).attname
+
+    def paths(self):
+        """Returns the values_list() paths of the exported fields, foreign keys expanded."""
+        paths = []
+        for field_name in self.lookup + self.fields:
+            if field_name in self.foreign_keys:
+                paths.extend('{}__{}'.format(field_name, key) for key in self.foreign_keys[field_name])
+            else:
+                paths.append(field_name)
+        return paths
+
+    def records(self, batch_size=500):
+        """Yields a dictionary of field name to JSON value for each row, reading
+        `batch_size` rows at a time."""
+        rows = self.model.objects.order_by('pk').values_list('pk', *self.paths()).iterator()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                for record in self.batch_records(batch):
+                    yield record
+                batch = []
+        for record in self.batch_records(batch):
+            yield record
+
+    def batch_records(self, rows):
+        links = dict((field_name, self.read_links(field_name, [row[0] for row in rows]))
+                     for field_name in self.many_to_many)
+        for row in rows:
+            values = iter(row[1:])
+            record = OrderedDict()
+            for field_name in self.lookup + self.fields:
+                if field_name in self.foreign_keys:
+                    record[field_name] = [next(values) for _ in self.foreign_keys[field_name]]
+                else:
+                    record[field_name] = next(values)
+            for field_name in self.many_to_many:
+                record[field_name] = sorted(links[field_name].get(row[0], []))
+            yield record
+
+    def read_links(self, field_name, pks):
+        """Returns a dictionary of pk to the list of natural keys of the rows linked by `field_name`."""
+        field = self.model._meta.get_field(field_name)
+        through = getattr(self.model, field_name).through
+        source_attname = '{}_id'.format(field.m2m_field_name())
+        links = {}
+        if pks:
+            for pk, key in through.objects.filter(**{'{}__in'.format(source_attname): pks}).values_list(
+                    source_attname, '{}__{}'.format(field.m2m_reverse_field_name(), self.many_to_many[field_name])):
+                links.setdefault(pk, []).append(key)
+        return links
+
+    def related_model(self, field_name):
+        field = self.model._meta.get_field(field_name)
+        return field.rel.to if hasattr(field, 'rel') and field.rel else field.remote_field.model
+
+    def apply(self, records):
+        """Updates or creates the rows of a batch of records and returns a BulkResult."""
+        expected = set(self.lookup + self.fields + tuple(self.many_to_many))
+        for record in records:
+            if set(record) != expected:
+                raise AppConfigurationError(
+                    'Invalid {} in configuration bundle. Expected fields {}. Got {}.'.format(
+                        self.name, sorted(expected), sorted(record)))
+        instances = {}
+        for field_name, key_fields in self.foreign_keys.items():
+            instances[field_name] = fetch_by_key(
+                self.related_model(field_name), key_fields, [record[field_name] for record in records])
+        rows = []
+        for record in records:
+            row = {}
+            for field_name in self.lookup + self.fields:
+                if field_name in self.foreign_keys:
+                    row[self.attname(field_name)] = instances[field_name][tuple(record[field_name])].pk
+                else:
+                    row[field_name] = self.model._meta.get_field(field_name).to_python(record[field_name])
+            rows.append(row)
+        lookup = tuple(self.attname(field_name) for field_name in self.lookup)
+        result = BulkUpdateOrCreate(
+            self.model, lookup, tuple(self.attname(field_name) for field_name in self.fields)
+        ).update_or_create(rows)
+        if self.many_to_many:
+            pks = dict((key, obj.pk) for key, obj in fetch_by_key(
+                self.model, lookup, [tuple(row[field] for field in lookup) for row in rows]).items())
+            for field_name, key_field in self.many_to_many.items():
+                targets = fetch_by_key(
+                    self.related_model(field_name), (key_field, ),
+                    [(key, ) for record in records for key in record[field_name]])
+                sync_many_to_many(self.model, field_name, dict(
+                    (pks[tuple(row[field] for field in lookup)],
+                     set(targets[(key, )].pk for key in record[field_name]))
+                    for row, record in zip(rows, records)))
+        if self.after:
+            self.after(rows, result)
+        return result
+
+
+def bundle_types(app_configuration):
+    """Returns the :class:`BundleType` of each model written by the sections that
+    `app_configuration` applies, with each after the types it refers to."""
+    types = []
+    if app_configuration.applies_section('global'):
+        types.append(BundleType(
+            'global_configuration', GlobalConfiguration, ('namespace', 'attribute'),
+            ('category', 'value', 'convert', 'value_type'), after=GlobalConfigurationChange.objects.record_changed))
+    if app_configuration.applies_section('lab'):
+        from edc_lab.lab_packing.models import Destination
+        from edc_meta_data.models import RequisitionPanel
+        types.extend([
+            BundleType('destination', Destination, ('code', ), ('name', 'address', 'tel', 'email')),
+            BundleType('aliquot_type', app_configuration.aliquot_type_model, ('name', ),
+                       ('alpha_code', 'numeric_code')),
+            BundleType('panel', app_configuration.panel_model, ('name', ), ('panel_type', ),
+                       many_to_many={'aliquot_type': 'alpha_code'}),
+            BundleType('requisition_panel', RequisitionPanel, ('name', ), ('aliquot_type_alpha_code', )),
+            BundleType('profile', app_configuration.profile_model, ('name', ), ('aliquot_type', ),
+                       foreign_keys={'aliquot_type': ('alpha_code', )}),
+            BundleType('profile_item', app_configuration.profile_item_model, ('profile', 'aliquot_type'),
+                       ('volume', 'count'), foreign_keys={'profile': ('name', ), 'aliquot_type': ('alpha_code', )})])
+    if app_configuration.applies_section('labeling'):
+        from lis.labeling.models import LabelPrinter, ZplTemplate, Client
+        types.extend([
+            BundleType('label_printer', LabelPrinter, ('cups_printer_name', 'cups_server_hostname'),
+                       ('cups_server_ip', 'default')),
+            BundleType('client', Client, ('name', ), ('label_printer', ),
+                       foreign_keys={'label_printer': ('cups_printer_name', 'cups_server_hostname')}),
+            BundleType('zpl_template', ZplTemplate, ('name', ), ('template', 'default'))])
+    if app_configuration.applies_section('holidays'):
+        from edc_appointment.models import Holiday
+        types.append(BundleType('holiday', Holiday, ('holiday_name', ), ('holiday_date', )))
+    return types
+
+
+def dumps(record):
+    line = json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':'))
+    # text streams on python 2 need unicode
+    return line if isinstance(line, type(u'')) else line.decode('ascii')
+
+
+def open_bundle(path, mode='r'):
+    """Returns a text stream of the bundle at `path`, compressed if it ends with .gz."""
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+def export_bundle(app_configuration, stream, batch_size=500):
+    """Writes the configuration rows of `app_configuration` to the text stream as JSON lines
+    and returns the number of rows written.
+
+    The first line is a header with the bundle version and the last a trailer with the
+    number of rows; each line in between is {"type": ..., "fields": {...}}. Rows are read
+    `batch_size` at a time so memory use does not grow with the number of rows."""
+    types = bundle_types(app_configuration)
+    stream.write(dumps(OrderedDict([
+        ('bundle', BUNDLE), ('version', BUNDLE_VERSION), ('created', datetime.now()),
+        ('types', [bundle_type.name for bundle_type in types])])) + u'\n')
+    count = 0
+    for bundle_type in types:
+        for record in bundle_type.records(batch_size):
+            stream.write(dumps(OrderedDict([('type', bundle_type.name), ('fields', record)])) + u'\n')
+            count += 1
+    stream.write(dumps({'end': True, 'count': count}) + u'\n')
+    return count
+
+
+def read_header(line):
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('bundle') != BUNDLE:
+        raise AppConfigurationError('Not a configuration bundle. Got {!r}.'.format(line[:80]))
+    if header.get('version') != BUNDLE_VERSION:
+        raise AppConfigurationError(
+            'Unsupported configuration bundle version. Expected {}. Got {}.'.format(
+                BUNDLE_VERSION, header.get('version')))
+    return header
+
+
+def import_bundle(app_configuration, stream, batch_size=500):
+    """Updates or creates the rows in a bundle written by :func:`export_bundle` and returns
+    an OrderedDict of type name to BulkResult.
+
+    Lines are read and applied `batch_size` rows at a time with :class:`BulkUpdateOrCreate`,
+    so memory use does not grow with the size of the bundle. Rows are not deleted. All rows
+    are applied in one transaction; a bundle that is invalid or has no trailer (e.g. cut off)
+    is rolled back."""
+    types = OrderedDict((bundle_type.name, bundle_type) for bundle_type in bundle_types(app_configuration))
+    results = OrderedDict()
+    lines = iter(stream)
+    read_header(next(lines, ''))
+    try:
+        with configuration_cache.atomic():
+            count = 0
+            batch_type, batch = None, []
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('end'):
+                    if record.get('count') != count:
+                        raise AppConfigurationError(
+                            'Configuration bundle has {} rows. Expected {}.'.format(count, record.get('count')))
+                    break
+                if record.get('type') not in types:
+                    raise AppConfigurationError(
+                        'Unknown type {!r} in configuration bundle. Expected one of {}.'.format(
+                            record.get('type'), list(types)))
+                if batch and (record['type'] != batch_type or len(batch) == batch_size):
+                    apply_batch(types[batch_type], batch, results)
+                    batch = []
+                batch_type = record['type']
+                batch.append(record['fields'])
+                count += 1
+            else:
+                raise AppConfigurationError('Configuration bundle is incomplete, it has no trailer.')
+            if batch:
+                apply_batch(types[batch_type], batch, results)
+    finally:
+        configuration_cache.invalidate_on_commit()
+        holiday_calendar.invalidate()
+    return results
+
+
+def apply_batch(bundle_type, records, results):
+    result = bundle_type.apply(records)
+    total = results.get(bundle_type.name, BulkResult(0, 0, 0))
+    results[bundle_type.name] = BulkResult(*[a + b for a, b in zip(total, result)])
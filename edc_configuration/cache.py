@@ -0,0 +1,349 @@
+import threading
+import time
+
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_finished
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.utils import timezone
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+# new in Django 1.9
+on_commit = getattr(transaction, 'on_commit', None)
+
+
+class Missing(object):
+
+    def __repr__(self):
+        return '<missing>'
+
+MISSING = Missing()
+
+# the namespace of values that apply to every namespace
+GLOBAL_NAMESPACE = ''
+
+
+class NamespaceEntry(object):
+    """The snapshot of one namespace held by a :class:`ConfigurationCache`."""
+
+    def __init__(self):
+        self.snapshot = None
+        self.version = None
+        self.checked = None
+        # when the snapshot was loaded from the database, where its change feed starts
+        self.loaded = None
+        self.feed = None
+        # (global snapshot, snapshot, resolved snapshot), see ConfigurationCache.resolved
+        self.resolved = None
+
+
+class ConfigurationCache(object):
+    """A cache of converted GlobalConfiguration values held as a :class:`ConfigurationSnapshot`
+    for each namespace.
+
+    The snapshot of a namespace is loaded with one query on first access and kept in memory.
+    It is dropped by the post_save/post_delete handlers on GlobalConfiguration and by
+    :func:`ConfigurationManager.set_attr`. A change to one namespace leaves the snapshots of
+    the other namespaces alone. A value is looked up in the namespace and then in the global
+    namespace (GLOBAL_NAMESPACE), so once both snapshots are loaded reads do not query.
+
+    If settings.EDC_CONFIGURATION_CACHE_ALIAS names a Django cache, each snapshot is also
+    stored in that cache under a version key of its namespace shared by all processes.
+    Invalidating a namespace bumps its version and invalidating everything bumps the epoch
+    shared by all namespaces; other processes see the new version on their next version
+    check and load the new snapshot from the shared cache (or, if missing, from the
+    database). The versions are checked once per request by :class:`ConfigurationCacheMiddleware`.
+
+    If a timeout (seconds) is set, either here or with settings.EDC_CONFIGURATION_CACHE_TIMEOUT,
+    the version is also checked (or, without a shared cache, the snapshot refreshed) when
+    the timeout has passed since the last check, e.g. for Celery workers.
+
+    Without a shared cache the snapshot is refreshed from the GlobalConfiguration change
+    log: only the attributes changed since the last refresh are read (one query for each
+    namespace) and applied, see :class:`changes.ChangeFeed`. Call :func:`refresh` to do this
+    now, e.g. from a worker's task_prerun signal. A snapshot not refreshed for longer than
+    the changes are kept (settings.EDC_CONFIGURATION_CHANGE_RETENTION) is reloaded instead."""
+
+    epoch_key = 'edc_configuration.epoch'
+    version_key = 'edc_configuration.version.{namespace}'
+    snapshot_key = 'edc_configuration.snapshot.{namespace}.{version}'
+
+    def __init__(self, timeout=None, cache_alias=None):
+        self._timeout = timeout
+        self._cache_alias = cache_alias
+        # namespace: NamespaceEntry
+        self._entries = {}
+        self._lock = threading.RLock()
+        # namespaces to invalidate once the transaction commits, see invalidate_on_commit
+        self._pending = threading.local()
+
+    @property
+    def timeout(self):
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'EDC_CONFIGURATION_CACHE_TIMEOUT', None)
+
+    @property
+    def shared_cache(self):
+        """Returns the Django cache named by cache_alias or settings.EDC_CONFIGURATION_CACHE_ALIAS, or None."""
+        cache_alias = self._cache_alias or getattr(settings, 'EDC_CONFIGURATION_CACHE_ALIAS', None)
+        return caches[cache_alias] if cache_alias else None
+
+    def entry(self, namespace=None):
+        namespace = namespace or GLOBAL_NAMESPACE
+        entry = self._entries.get(namespace)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(namespace, NamespaceEntry())
+        return entry
+
+    def expired(self, entry):
+        timeout = self.timeout
+        return timeout is not None and (entry.checked is None or entry.checked + timeout < time.time())
+
+    def load(self, namespace=None):
+        """Returns a new snapshot of a namespace from the database."""
+        from .models import GlobalConfiguration
+        return GlobalConfiguration.objects.snapshot(namespace=namespace)
+
+    def get_versions(self, shared_cache, namespaces):
+        """Returns a dictionary of namespace to version, the epoch and the version of the
+        namespace, using one cache read."""
+        keys = dict((namespace, self.version_key.format(namespace=namespace)) for namespace in namespaces)
+        values = shared_cache.get_many([self.epoch_key] + list(keys.values()))
+        for key in [self.epoch_key] + list(keys.values()):
+            if values.get(key) is None:
+                # start from the clock so a lost key does not reuse a version held by another process
+                shared_cache.add(key, int(time.time() * 1000), None)
+                values[key] = shared_cache.get(key)
+        return dict(
+            (namespace, '{}.{}'.format(values[self.epoch_key], values[key])) for namespace, key in keys.items())
+
+    def snapshot(self, namespace=None):
+        """Returns the current snapshot of the values in `namespace` (default: the global
+        namespace), loading it if needed. See :func:`resolved`."""
+        namespace = namespace or GLOBAL_NAMESPACE
+        entry = self.entry(namespace)
+        snapshot = entry.snapshot
+        if snapshot is not None and not self.expired(entry):
+            return snapshot
+        with self._lock:
+            shared_cache = self.shared_cache
+            if shared_cache is None:
+                snapshot = self.refreshed(entry, namespace)
+                version = None
+            else:
+                version = self.get_versions(shared_cache, [namespace])[namespace]
+                if entry.snapshot is not None and version == entry.version:
+                    snapshot = entry.snapshot
+                else:
+                    key = self.snapshot_key.format(namespace=namespace, version=version)
+                    snapshot = shared_cache.get(key)
+                    if snapshot is None:
+                        snapshot = self.load(namespace)
+                        shared_cache.set(key, snapshot)
+            entry.snapshot, entry.version, entry.checked = snapshot, version, time.time()
+        return snapshot
+
+    def resolved(self, namespace=None):
+        """Returns a snapshot of the global values updated with those of `namespace`.
+
+        The merged snapshot is kept until either snapshot is reloaded or refreshed."""
+        snapshot = self.snapshot()
+        if not namespace:
+            return snapshot
+        namespace_snapshot = self.snapshot(namespace)
+        entry = self.entry(namespace)
+        resolved = entry.resolved
+        if resolved is None or resolved[0] is not snapshot or resolved[1] is not namespace_snapshot:
+            resolved = (snapshot, namespace_snapshot, snapshot.merged(namespace_snapshot))
+            entry.resolved = resolved
+        return resolved[2]
+
+    def refreshed(self, entry, namespace):
+        """Returns the snapshot of the entry with the changes since the last refresh applied
+        or, if there is no snapshot, a new snapshot from the database."""
+        from .changes import ChangeFeed, change_retention
+        from .convert import Convert
+        if entry.snapshot is None or entry.checked + change_retention() < time.time():
+            # changes made since the last refresh may have been expired
+            entry.feed, entry.loaded = None, timezone.now()
+            return self.load(namespace)
+        if entry.feed is None:
+            # the first poll reads the changes made since the load
+            entry.feed = ChangeFeed(namespace=namespace, since=entry.loaded)
+        changes = entry.feed.poll()
+        if not changes:
+            return entry.snapshot
+        return entry.snapshot.updated(
+            [change[1:] for change in changes],
+            lambda value, convert, value_type: Convert(value, convert=convert, value_type=value_type).to_value())
+
+    def refresh(self, namespace=None):
+        """Applies the changes made since the last refresh to the snapshot of `namespace`,
+        or of each namespace loaded, or, with a shared cache, checks the versions."""
+        if self.shared_cache is not None:
+            return self.check_version(namespace)
+        with self._lock:
+            for entry_namespace, entry in list(self._entries.items()):
+                if entry.snapshot is not None and namespace in (None, entry_namespace):
+                    entry.snapshot, entry.checked = self.refreshed(entry, entry_namespace), time.time()
+
+    def check_version(self, namespace=None):
+        """Drops the local snapshot of `namespace`, or of each namespace loaded, if its
+        shared version has changed (one cache read)."""
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            namespaces = list(self._entries) if namespace is None else [namespace]
+            versions = self.get_versions(shared_cache, namespaces)
+            with self._lock:
+                for namespace in namespaces:
+                    entry = self.entry(namespace)
+                    if versions[namespace] != entry.version:
+                        entry.snapshot = None
+                    entry.checked = time.time()
+
+    def get(self, attribute_name, default=MISSING, namespace=None, category=None):
+        """Returns the converted value in `namespace` or, if not there, in the global
+        namespace, or `default` if the attribute does not exist (in `category`, if given)."""
+        if namespace:
+            snapshot = self.snapshot(namespace)
+            if category is None or snapshot.in_category(attribute_name, category):
+                value = snapshot.get(attribute_name, MISSING)
+                if value is not MISSING:
+                    return value
+        snapshot = self.snapshot()
+        if category is not None and not snapshot.in_category(attribute_name, category):
+            return default
+        return snapshot.get(attribute_name, default)
+
+    def invalidate(self, attribute_name=None, namespace=None):
+        """Drops the local snapshot of `namespace` and bumps its shared version, if any,
+        or, if `namespace` is None, drops all snapshots and bumps the epoch.
+
+        `attribute_name` is accepted for readability only."""
+        with self._lock:
+            if namespace is None:
+                self._entries = {}
+                key = self.epoch_key
+            else:
+                self._entries.pop(namespace, None)
+                key = self.version_key.format(namespace=namespace)
+            shared_cache = self.shared_cache
+            if shared_cache is not None:
+                try:
+                    shared_cache.incr(key)
+                except ValueError:
+                    shared_cache.add(key, int(time.time() * 1000), None)
+
+    def invalidate_on_commit(self, namespace=None, using=None):
+        """Invalidates now and again once the current transaction, if any, commits.
+
+        Another process may load the old rows before the commit and store them under the
+        version bumped now; bumping again after the commit drops that snapshot. Without
+        transaction.on_commit (Django < 1.9) the second invalidation runs when the outermost
+        :func:`atomic` block exits or the request finishes, see :func:`invalidate_pending`."""
+        using = using or DEFAULT_DB_ALIAS
+        self.invalidate(namespace=namespace)
+        if connections[using].in_atomic_block:
+            if on_commit is not None:
+                on_commit(lambda: self.invalidate(namespace=namespace), using=using)
+            else:
+                self.pending(using).add(namespace)
+        else:
+            self.invalidate_pending(using)
+
+    def pending(self, using=None):
+        """Returns the set of namespaces left to invalidate in this thread once the transaction
+        on connection `using` commits."""
+        if not hasattr(self._pending, 'namespaces'):
+            self._pending.namespaces = {}
+        return self._pending.namespaces.setdefault(using or DEFAULT_DB_ALIAS, set())
+
+    def invalidate_pending(self, using=None):
+        """Runs the invalidations left by :func:`invalidate_on_commit` in this thread for
+        connection `using` (default: all connections) if it is not in a transaction."""
+        for alias, namespaces in list(getattr(self._pending, 'namespaces', {}).items()):
+            if (using is None or alias == using) and not connections[alias].in_atomic_block:
+                del self._pending.namespaces[alias]
+                for namespace in [None] if None in namespaces else namespaces:
+                    self.invalidate(namespace=namespace)
+
+    @contextmanager
+    def atomic(self, using=None):
+        """Returns transaction.atomic(using) that, when the outermost block exits, runs the
+        invalidations left by :func:`invalidate_on_commit` (Django < 1.9)."""
+        try:
+            with transaction.atomic(using=using):
+                yield
+        finally:
+            self.invalidate_pending(using or DEFAULT_DB_ALIAS)
+
+    def __contains__(self, attribute_name):
+        return self.get(attribute_name) is not MISSING
+
+configuration_cache = ConfigurationCache()
+
+
+@receiver(request_finished, dispatch_uid='configuration_cache_on_request_finished')
+def configuration_cache_on_request_finished(sender, **kwargs):
+    configuration_cache.invalidate_pending()
+
+
+class LRUCache(object):
+    """A bounded, thread-safe least-recently-used cache with hit/miss counters.
+
+    If `maxsize` is None it is read from the setting named `maxsize_setting`, otherwise
+    `default_maxsize` is used. A maxsize of 0 disables the cache."""
+
+    def __init__(self, maxsize=None, maxsize_setting=None, default_maxsize=None):
+        self._maxsize = maxsize
+        self.maxsize_setting = maxsize_setting
+        self.default_maxsize = 128 if default_maxsize is None else default_maxsize
+        self._values = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        if self.maxsize_setting:
+            return getattr(settings, self.maxsize_setting, self.default_maxsize)
+        return self.default_maxsize
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            try:
+                value = self._values.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._values[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        maxsize = self.maxsize
+        if not maxsize:
+            return
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = value
+            while len(self._values) > maxsize:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._values))
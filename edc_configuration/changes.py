@@ -0,0 +1,108 @@
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+
+from .cache import GLOBAL_NAMESPACE
+
+# seconds changes are kept for, see ChangeManager.expire
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+
+
+FIELDS = ('revision', 'category', 'attribute', 'deleted', 'value', 'convert', 'value_type')
+
+
+def change_retention():
+    """Returns settings.EDC_CONFIGURATION_CHANGE_RETENTION (seconds) or the default, 7 days."""
+    return getattr(settings, 'EDC_CONFIGURATION_CHANGE_RETENTION', DEFAULT_RETENTION)
+
+
+class ChangeFeed(object):
+    """Follows the GlobalConfiguration change log, returning each change to `namespace`
+    (default: the global namespace) once.
+
+    A revision is numbered when its change is inserted but only seen once its transaction
+    commits, so a lower revision may be seen after a higher one. A revision missing below
+    the highest seen is looked for again on each poll until it is `gap_timeout` seconds
+    old (a rolled back insert leaves a gap for good).
+
+    If no `revision` is given the first poll returns the changes made since `since` (a
+    datetime, less `gap_timeout` seconds) or, without `since`, the last `overlap` changes,
+    setting `window_full` if there may be earlier changes that were not returned.
+
+    Usage::
+        feed = ChangeFeed()
+        feed.poll()  # all changes not yet seen
+    """
+
+    gap_timeout = 60
+    overlap = 100
+
+    def __init__(self, revision=None, gap_timeout=None, namespace=None, since=None):
+        if gap_timeout is not None:
+            self.gap_timeout = gap_timeout
+        self.namespace = namespace or GLOBAL_NAMESPACE
+        self.since = since
+        # every revision up to here is seen or given up
+        self.revision = revision
+        self.seen = set()
+        # missing revision: time first missed
+        self.gaps = {}
+        # attribute: revision of the last change returned
+        self.attributes = {}
+        self.window_full = False
+
+    def poll(self):
+        """Returns the changes not seen before as (revision, category, attribute, deleted,
+        value, convert, value_type), in order, using one query.
+
+        A change seen late is left out if a later change to the same attribute was
+        already returned. Changes to all namespaces are read so that the revisions of
+        other namespaces are not taken for gaps."""
+        from .models import GlobalConfigurationChange
+        if self.revision is None:
+            recent = GlobalConfigurationChange.objects.order_by('-revision').values_list('namespace', *FIELDS)
+            if self.since is None:
+                recent = list(recent[:self.overlap])
+                self.window_full = len(recent) >= self.overlap
+            else:
+                recent = list(recent.filter(created__gte=self.since - timedelta(seconds=self.gap_timeout)))
+            recent.reverse()
+            if recent:
+                self.revision = recent[0][1] - 1
+            elif self.since is None:
+                self.revision = 0
+            else:
+                # nothing since `since`, look again from there on the next poll
+                return []
+        else:
+            recent = GlobalConfigurationChange.objects.filter(revision__gt=self.revision).order_by(
+                'revision').values_list('namespace', *FIELDS)
+        changes = []
+        for change in recent:
+            namespace, change = change[0], change[1:]
+            revision, attribute = change[0], change[2]
+            if revision in self.seen:
+                continue
+            self.seen.add(revision)
+            if namespace == self.namespace and revision > self.attributes.get(attribute, 0):
+                self.attributes[attribute] = revision
+                changes.append(change)
+        self.advance()
+        return changes
+
+    def advance(self):
+        """Moves `revision` up to the first gap that is still looked for."""
+        now = time.time()
+        highest = max(self.seen) if self.seen else self.revision
+        for revision in range(self.revision + 1, highest):
+            if revision not in self.seen:
+                self.gaps.setdefault(revision, now)
+        for revision, missed in list(self.gaps.items()):
+            if revision in self.seen or missed + self.gap_timeout < now:
+                del self.gaps[revision]
+        self.revision = min(self.gaps) - 1 if self.gaps else highest
+        self.seen = set(revision for revision in self.seen if revision > self.revision)
+        self.attributes = dict(
+            (attribute, revision) for attribute, revision in self.attributes.items() if revision > self.revision)
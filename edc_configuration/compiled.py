@@ -0,0 +1,134 @@
+import re
+
+from .cache import LRUCache, MISSING
+from .convert import Convert, python_value_type, STRING_TYPES
+from .exceptions import AppConfigurationError
+from .models import GlobalConfiguration
+
+ATTRIBUTE_PATTERN = re.compile(r'^[a-z0-9_]+$')
+
+# memo of (id(global_configuration), id(default_configuration)) to
+# (global_configuration, default_configuration, CompiledConfiguration)
+compiled_configurations = LRUCache(maxsize=128)
+
+
+class FrozenDict(dict):
+    """A dict that cannot be changed once created."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('{} is read-only.'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self), ))
+
+
+# the defaults of a namespace, one object so the compiled configuration is reused
+NO_DEFAULTS = FrozenDict()
+
+
+class CompiledConfiguration(FrozenDict):
+    """A read-only dictionary of category to a read-only dictionary of attribute to value,
+    merged from the default and app global configuration and validated.
+
+    `rows` has the category, attribute, string value, convert and value_type of each
+    attribute as saved to GlobalConfiguration."""
+
+    def __init__(self, configuration, rows=None):
+        super(CompiledConfiguration, self).__init__(
+            (category, FrozenDict(attributes)) for category, attributes in configuration.items())
+        self.rows = tuple(FrozenDict(row) for row in rows or ())
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self), self.rows))
+
+
+def merge(default_configuration, global_configuration):
+    """Returns the default configuration updated by category with the app configuration."""
+    configuration = dict((category, dict(attributes)) for category, attributes in default_configuration.items())
+    for category, attributes in global_configuration.items():
+        configuration.setdefault(category, {}).update(attributes)
+    return configuration
+
+
+def compile_row(category, attribute, value, max_lengths):
+    """Returns the GlobalConfiguration values for one attribute and a list of errors."""
+    errors = []
+    if not isinstance(attribute, STRING_TYPES) or not ATTRIBUTE_PATTERN.match(attribute):
+        errors.append('Invalid attribute name {!r}, must be lower case separated by underscore.'.format(attribute))
+    elif len(attribute) > max_lengths['attribute']:
+        errors.append('Attribute name {!r} is longer than {} characters.'.format(attribute, max_lengths['attribute']))
+    string_value, convert, value_type = to_row_value(value)
+    if len(string_value) > max_lengths['value']:
+        errors.append('{}: value {!r} is longer than {} characters.'.format(
+            attribute, string_value, max_lengths['value']))
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        value = value[0]
+    if convert and python_value_type(value) is None:
+        errors.append('{}: cannot store a {} as a string. Got {!r}.'.format(
+            attribute, value.__class__.__name__, value))
+    row = dict(category=category, attribute=attribute, value=string_value,
+               convert=convert, value_type=value_type)
+    return row, errors
+
+
+def to_row_value(value):
+    """Returns the string value, convert and value_type a declared value, or a tuple of
+    (value, convert), is saved with."""
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        value, convert = value
+    else:
+        convert = True
+    convert = Convert(value, convert)
+    string_value = convert.to_string()
+    return string_value, convert.convert, convert.value_type
+
+
+def to_stored_value(value):
+    """Returns a declared value as it is read back once saved to GlobalConfiguration,
+    e.g. a naive datetime as a time zone aware datetime and a float as a Decimal."""
+    string_value, convert, value_type = to_row_value(value)
+    return Convert(string_value, convert=convert, value_type=value_type).to_value()
+
+
+def compile_configuration(global_configuration, default_configuration):
+    """Returns a :class:`CompiledConfiguration` of the merged configuration.
+
+    Raises AppConfigurationError listing every invalid attribute name, value too long
+    for GlobalConfiguration.value, value of a type that cannot be stored (see
+    :func:`convert.python_value_type`) and attribute declared in more than one category."""
+    configuration = merge(default_configuration, global_configuration)
+    max_lengths = dict(
+        (field, GlobalConfiguration._meta.get_field(field).max_length) for field in ('category', 'attribute', 'value'))
+    rows = []
+    errors = []
+    categories = {}
+    for category in sorted(configuration):
+        if len(category) > max_lengths['category']:
+            errors.append('Category {!r} is longer than {} characters.'.format(category, max_lengths['category']))
+        for attribute in sorted(configuration[category]):
+            if attribute in categories:
+                errors.append('{}: declared in categories {!r} and {!r}.'.format(
+                    attribute, categories[attribute], category))
+            categories[attribute] = category
+            row, row_errors = compile_row(category, attribute, configuration[category][attribute], max_lengths)
+            rows.append(row)
+            errors.extend(row_errors)
+    if errors:
+        raise AppConfigurationError('Invalid global configuration. {}'.format(' '.join(errors)))
+    return CompiledConfiguration(configuration, rows)
+
+
+def get_compiled_configuration(global_configuration, default_configuration):
+    """Returns the compiled configuration, compiling it only if either dictionary is
+    a different object than at the last call.
+
+    Changes made to the dictionaries in place are not seen; assign a new dictionary."""
+    key = (id(global_configuration), id(default_configuration))
+    cached = compiled_configurations.get(key)
+    if cached is not MISSING and cached[0] is global_configuration and cached[1] is default_configuration:
+        return cached[2]
+    compiled = compile_configuration(global_configuration, default_configuration)
+    compiled_configurations.set(key, (global_configuration, default_configuration, compiled))
+    return compiled
@@ -0,0 +1,68 @@
+from .cache import configuration_cache, MISSING
+from .defaults import default_global_configuration
+
+
+class CategoryConfiguration(object):
+    """Attribute access to the GlobalConfiguration values of one category.
+
+    Values come from the configuration cache, see :class:`ConfigurationCache`. A value is
+    read from the category in `namespace`, if any, then in the global namespace and, if no
+    row exists, from the category in `default_global_configuration`, converted as if it had
+    been saved. An attribute of another category raises AttributeError."""
+
+    def __init__(self, category_name, cache=None, namespace=None):
+        self._category_name = category_name
+        self._cache = cache or configuration_cache
+        self._namespace = namespace
+
+    def __getattr__(self, attribute_name):
+        if attribute_name.startswith('_'):
+            raise AttributeError(attribute_name)
+        value = self._cache.get(attribute_name, namespace=self._namespace, category=self._category_name)
+        if value is MISSING:
+            from .compiled import to_stored_value
+            try:
+                value = default_global_configuration[self._category_name][attribute_name]
+            except KeyError:
+                raise AttributeError(
+                    'Configuration attribute \'{}.{}\' does not exist and has no default.'.format(
+                        self._category_name, attribute_name))
+            # the type it is read back as once prepare() has saved it
+            value = to_stored_value(value)
+        return value
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._category_name)
+
+
+class Configuration(object):
+    """A lazy accessor for GlobalConfiguration values by category and attribute.
+
+    Nothing is read from the database until a value is accessed, so it is safe
+    to import at module level and during migrations.
+
+    Usage::
+        from edc_configuration.config import config
+
+        config.appointment.appointments_per_day_max
+
+        bcpp_config = Configuration(namespace='bcpp')
+        bcpp_config.appointment.appointments_per_day_max
+    """
+
+    def __init__(self, cache=None, namespace=None):
+        self._cache = cache
+        self._namespace = namespace
+        self._categories = {}
+
+    def __getattr__(self, category_name):
+        if category_name.startswith('_'):
+            raise AttributeError(category_name)
+        try:
+            return self._categories[category_name]
+        except KeyError:
+            category = CategoryConfiguration(category_name, cache=self._cache, namespace=self._namespace)
+            self._categories[category_name] = category
+            return category
+
+config = Configuration()
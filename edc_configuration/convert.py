@@ -1,18 +1,96 @@
+import numbers
 import pytz
 import re
 
+from datetime import date, datetime
 from dateutil import parser
 from decimal import Decimal, InvalidOperation
 
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.encoding import force_text
 from django.utils import timezone
-from django.test.utils import override_settings
+
+from .cache import LRUCache, MISSING
+
+TIME = 'time'
+BOOLEAN = 'boolean'
+DECIMAL = 'decimal'
+INTEGER = 'int'
+DATETIME = 'datetime'
+STRING = 'str'
+UNKNOWN = None
+
+VALUE_TYPES = (
+    (BOOLEAN, 'Boolean or None'),
+    (DATETIME, 'Datetime'),
+    (DECIMAL, 'Decimal'),
+    (INTEGER, 'Integer'),
+    (STRING, 'String'),
+    (TIME, 'Time (as string)'),
+)
+
+BOOLEANS = {'true': True, 'false': False, 'none': None}
+
+CLASSIFIER = re.compile(
+    r'^(?:'
+    r'(?P<time>[0-9]{1,2}:[0-9]{2})'
+    r'|(?P<int>-?(?:0|[1-9][0-9]*))'
+    r'|(?P<decimal>-?[0-9]+\.[0-9]+)'
+    r'|(?P<datetime>(?P<year>[0-9]{4})-(?P<month>[0-9]{2})-(?P<day>[0-9]{2})'
+    r'(?:[T ](?P<hour>[0-9]{2}):(?P<minute>[0-9]{2})'
+    r'(?::(?P<second>[0-9]{2})(?:\.(?P<microsecond>[0-9]{1,6}))?)?)?)'
+    r')\Z')
+
+HAS_DIGIT = re.compile('[0-9]')
+
+try:
+    STRING_TYPES = (basestring, )  # noqa
+except NameError:
+    STRING_TYPES = (str, )
+
+
+# memo of (class, string value, convert, value_type) to converted value, see Convert.to_value()
+convert_cache = LRUCache(maxsize_setting='EDC_CONFIGURATION_CONVERT_CACHE_SIZE', default_maxsize=1024)
 
 
 class ConvertError(Exception):
     pass
 
 
+def classify(string_value):
+    """Returns the type of a stripped string value from a single regex match.
+
+    Returns UNKNOWN for strings with digits that are not in a recognized format,
+    such as dates not in ISO format, which still need the full parser."""
+    if string_value.lower() in BOOLEANS:
+        return BOOLEAN
+    match = CLASSIFIER.match(string_value)
+    if match:
+        return match.lastgroup
+    if HAS_DIGIT.search(string_value):
+        return UNKNOWN
+    return STRING
+
+
+def python_value_type(value):
+    """Returns the value type of a Python value, e.g. 30 or '30', as passed to
+    :func:`Convert.to_string`, or None if it has no value type.
+
+    The type is taken from the Python type only; a string is a STRING whatever it looks like."""
+    if value is None or isinstance(value, bool):
+        return BOOLEAN
+    elif isinstance(value, (Decimal, float)):
+        return DECIMAL
+    elif isinstance(value, numbers.Integral):
+        return INTEGER
+    elif isinstance(value, (datetime, date)):
+        return DATETIME
+    elif isinstance(value, STRING_TYPES):
+        return STRING
+    return None
+
+
 def localize(datetime_obj):
     try:
         default_timezone = timezone.get_default_timezone_name()
@@ -26,41 +104,85 @@ def localize(datetime_obj):
 
 class Convert(object):
 
-    def __init__(self, value, convert=None, time_format=None):
+    # converters to try, in order, for each type returned by classify()
+    converters = {
+        DECIMAL: ('to_decimal', 'to_int', 'to_datetime'),
+        INTEGER: ('to_int', 'to_datetime'),
+        DATETIME: ('to_iso_datetime', 'to_datetime'),
+        UNKNOWN: ('to_decimal', 'to_int', 'to_datetime'),
+    }
+
+    def __init__(self, value, convert=None, time_format=None, value_type=None):
         self.value = value
         self.convert = False if convert is False else True
         self.time_format = time_format or '%H:%M'
+        self.value_type = value_type or None
 
     def to_value(self):
         """Converts a string representation of a value into its original datatype.
 
-        For dates and datetimes always returns a time zone aware datetime."""
+        For dates and datetimes always returns a time zone aware datetime.
+
+        Results are immutable so they are memoized in `convert_cache`, a bounded LRU
+        cache sized by settings.EDC_CONFIGURATION_CONVERT_CACHE_SIZE (default 1024).
+        Use `convert_cache.info()` for hits and misses."""
+        key = (self.__class__, self.value, self.convert, self.value_type)
+        value = convert_cache.get(key)
+        if value is MISSING:
+            value = self.convert_value()
+            convert_cache.set(key, value)
+        return value
+
+    def convert_value(self):
+        """Converts a string representation of a value into its original datatype without
+        using the memo.
+
+        If `value_type` is known, e.g. stored with the value by :func:`to_string`, the string
+        is decoded directly. Otherwise the type is picked by :func:`classify` and only the
+        matching converter is called. If that converter rejects the value the remaining
+        converters are tried in the original order: Time, Boolean, Decimal, Integer,
+        Datetime otherwise String."""
         string_value = self.value.strip(' "')
         if self.convert:
+            if self.value_type:
+                try:
+                    return self.decode(string_value, self.value_type)
+                except (ConvertError, ValueError, InvalidOperation, KeyError):
+                    pass
+            value_type = classify(string_value)
+            if value_type == TIME or value_type == STRING:
+                return string_value
+            elif value_type == BOOLEAN:
+                return BOOLEANS[string_value.lower()]
+            for converter in self.converters[value_type]:
+                try:
+                    return getattr(self, converter)(string_value)
+                except ConvertError:
+                    pass
+            # raise ConvertError('Cannot convert string to value. Got \'{}\''.format(self.value))
+        return string_value
+
+    def decode(self, string_value, value_type):
+        """Returns the string value converted to the given value type."""
+        if value_type == STRING or value_type == TIME:
+            return string_value
+        elif value_type == BOOLEAN:
+            return BOOLEANS[string_value.lower()]
+        elif value_type == DECIMAL:
+            return Decimal(string_value)
+        elif value_type == INTEGER:
+            return int(string_value)
+        elif value_type == DATETIME:
             try:
-                return self.to_time(string_value)
-            except ConvertError:
-                pass
-            try:
-                return self.to_boolean(string_value)
-            except ConvertError:
-                pass
-            try:
-                return self.to_decimal(string_value)
-            except ConvertError:
-                pass
-            try:
-                return self.to_int(string_value)
+                return self.to_iso_datetime(string_value)
             except ConvertError:
-                pass
-            try:
                 return self.to_datetime(string_value)
-            except ConvertError:
-                pass
-            # raise ConvertError('Cannot convert string to value. Got \'{}\''.format(self.value))
-        return string_value
+        raise ConvertError('Unknown value type. Got \'{}\''.format(value_type))
 
     def to_string(self):
+        """Returns the value as a string and sets `value_type`, if not given, from the
+        Python type of the value (see :func:`python_value_type`) so :func:`to_value` returns
+        the same type, e.g. 30 is read back as 30 and '30' as '30'."""
         try:
             string_value = self.value.isoformat()
             try:
@@ -70,7 +192,12 @@ class Convert(object):
                 pass
         except AttributeError:
             string_value = str(self.value)
-        return string_value or force_text(self.value)
+        string_value = string_value or force_text(self.value)
+        if self.convert:
+            self.value_type = self.value_type or python_value_type(self.value) or STRING
+        else:
+            self.value_type = STRING
+        return string_value
 
     def to_time(self, string_value):
         if re.match('^[0-9]{1,2}\:[0-9]{2}$', string_value):
@@ -79,9 +206,9 @@ class Convert(object):
             raise ConvertError()
 
     def to_boolean(self, string_value):
-        if string_value.lower() in ['true', 'false', 'none']:
-            return eval(string_value)
-        else:
+        try:
+            return BOOLEANS[string_value.lower()]
+        except KeyError:
             raise ConvertError()
 
     def to_decimal(self, string_value):
@@ -105,7 +232,21 @@ class Convert(object):
             pass
         raise ConvertError()
 
-    @override_settings(USE_TZ=True)
+    def to_iso_datetime(self, string_value):
+        """Returns a timezone aware datetime for an ISO 8601 string without
+        a UTC offset, e.g. 2016-01-05, 2016-01-05 09:35 or 2016-01-05T09:35:00."""
+        match = CLASSIFIER.match(string_value)
+        if not match or not match.group(DATETIME):
+            raise ConvertError()
+        try:
+            value = datetime(*[int(match.group(name) or 0) for name in (
+                'year', 'month', 'day', 'hour', 'minute', 'second')])
+        except ValueError:
+            raise ConvertError()
+        if match.group('microsecond'):
+            value = value.replace(microsecond=int(match.group('microsecond').ljust(6, '0')))
+        return localize(value)
+
     def to_datetime(self, string_value):
         """Returns a timezone aware date.
 
@@ -119,3 +260,10 @@ class Convert(object):
         except TypeError:
             pass
         raise ConvertError()
+
+
+@receiver(setting_changed, dispatch_uid='convert_cache_on_setting_changed')
+def convert_cache_on_setting_changed(sender, setting, **kwargs):
+    """Clears the memo since converted datetimes depend on TIME_ZONE."""
+    if setting in ['TIME_ZONE', 'USE_TZ', 'EDC_CONFIGURATION_CONVERT_CACHE_SIZE']:
+        convert_cache.clear()
@@ -0,0 +1,115 @@
+from collections import namedtuple, OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.db import models
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+NOOP = 'noop'
+
+ACTIONS = (CREATE, UPDATE, DELETE, NOOP)
+
+
+class Change(namedtuple('Change', 'action key fields instance')):
+    """One row of a :class:`Changeset`.
+
+    `fields` is a dictionary of field to (stored value, declared value): every declared
+    value for CREATE, the fields that differ for UPDATE, the stored values for DELETE
+    and nothing for NOOP. `instance` is the stored instance or, for CREATE, a new unsaved
+    instance."""
+
+
+class Changeset(object):
+    """The changes that make the stored rows of `model` match the declared rows.
+
+    A changeset is true if it has anything to write, i.e. a change other than NOOP."""
+
+    def __init__(self, model, changes=None):
+        self.model = model
+        self.changes = list(changes or [])
+
+    def __repr__(self):
+        return '{}({}, {})'.format(self.__class__.__name__, self.model._meta.object_name, dict(self.counts()))
+
+    def __bool__(self):
+        return any(change.action != NOOP for change in self.changes)
+
+    __nonzero__ = __bool__
+
+    def of(self, action):
+        return [change for change in self.changes if change.action == action]
+
+    @property
+    def creates(self):
+        return self.of(CREATE)
+
+    @property
+    def updates(self):
+        return self.of(UPDATE)
+
+    @property
+    def deletes(self):
+        return self.of(DELETE)
+
+    @property
+    def noops(self):
+        return self.of(NOOP)
+
+    def counts(self):
+        """Returns an OrderedDict of action to number of changes."""
+        counts = OrderedDict((action, 0) for action in ACTIONS)
+        for change in self.changes:
+            counts[change.action] += 1
+        return counts
+
+
+def normalizer(field):
+    """Returns a function that converts a stored or declared value of `field` for comparison.
+
+    Values are converted with the field's to_python(). For a DecimalField a float is first
+    converted from its shortest repr, 1.2 to Decimal('1.2') not Decimal('1.19999...'), and
+    the result is quantized to the field's decimal places as the database stores it."""
+    if not isinstance(field, models.DecimalField):
+        return field.to_python
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+
+    def normalize(value):
+        if isinstance(value, float):
+            value = Decimal(repr(value))
+        value = field.to_python(value)
+        try:
+            return value.quantize(exponent)
+        except (AttributeError, InvalidOperation):
+            return value
+    return normalize
+
+
+def diff(model, lookup, update_fields, items, existing, prune=None, duplicates=None):
+    """Returns a :class:`Changeset` comparing `items`, a dictionary of key to dictionary
+    of declared values, with `existing`, a dictionary of key to stored instance.
+
+    A key is a tuple of the values of the `lookup` fields. Only `update_fields` are
+    compared, after converting both values with :func:`normalizer` so that, for example,
+    a declared 1.2 equals a stored Decimal('1.20'); other declared values are only
+    used to create. If `prune` is True stored rows without a declared row are deleted,
+    otherwise they are left alone. `duplicates` are stored instances with the same key
+    as an instance in `existing`; they are deleted."""
+    to_python = dict((field, normalizer(model._meta.get_field(field))) for field in update_fields)
+    changes = []
+    for key, item in items.items():
+        obj = existing.get(key)
+        if obj is None:
+            changes.append(Change(
+                CREATE, key, dict((field, (None, value)) for field, value in item.items()), model(**item)))
+            continue
+        fields = dict(
+            (field, (getattr(obj, field), item[field])) for field in update_fields
+            if to_python[field](getattr(obj, field)) != to_python[field](item[field]))
+        changes.append(Change(UPDATE if fields else NOOP, key, fields, obj))
+    deleted = [obj for key, obj in existing.items() if key not in items] if prune else []
+    for obj in deleted + list(duplicates or []):
+        changes.append(Change(
+            DELETE, tuple(getattr(obj, field) for field in lookup),
+            dict((field, (getattr(obj, field), None)) for field in update_fields), obj))
+    return Changeset(model, changes)
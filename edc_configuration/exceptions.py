@@ -2,3 +2,19 @@
 
 class AppConfigurationError(Exception):
     pass
+
+
+class PrepareError(AppConfigurationError):
+    """Raised by :func:`BaseAppConfiguration.prepare` if a section fails.
+
+    `section` is the name of the section that failed and `report` the :class:`PrepareReport`."""
+
+    def __init__(self, message, section=None, report=None):
+        super(PrepareError, self).__init__(message)
+        self.section = section
+        self.report = report
+
+
+class ConfigurationLockError(AppConfigurationError):
+    """Raised if the configuration lock is not acquired within the timeout."""
+    pass
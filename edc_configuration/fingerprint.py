@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+from datetime import date, datetime, time
+from decimal import Decimal
+
+
+def normalize(value):
+    """Returns `value` as a structure of JSON types that is stable across processes.
+
+    Dictionaries are sorted by key, namedtuples keep their type and field names and
+    dates, numbers and classes/functions (by dotted name) are tagged so that, for example,
+    '1' and 1 differ."""
+    if isinstance(value, dict):
+        return [[normalize(key), normalize(item)] for key, item in sorted(value.items(), key=lambda x: repr(x[0]))]
+    if hasattr(value, '_asdict'):
+        return [value.__class__.__name__, normalize(dict(value._asdict()))]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [normalize(item) for item in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return ['{}'.format(value.__class__.__name__), value.isoformat()]
+    if isinstance(value, (int, float, Decimal)):
+        return [value.__class__.__name__, str(value)]
+    if isinstance(value, type) or callable(value) and hasattr(value, '__name__'):
+        return ['callable', '{}.{}'.format(getattr(value, '__module__', ''), value.__name__)]
+    return ['{}'.format(value.__class__.__name__), '{}'.format(value)]
+
+
+def fingerprint(value):
+    """Returns a sha1 hex digest of the normalized value."""
+    normalized = json.dumps(normalize(value), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
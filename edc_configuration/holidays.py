@@ -0,0 +1,131 @@
+import threading
+import time
+
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+ALL_ISO_WEEKDAYS = frozenset(range(1, 8))
+
+
+def to_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def iso_weekdays(allowed_iso_weekdays=None):
+    """Returns a frozenset of ISO weekdays (1=Monday) from a string such as '12345'
+    (the format of `allowed_iso_weekdays` in global_configuration) or a list of integers."""
+    if allowed_iso_weekdays is None:
+        return ALL_ISO_WEEKDAYS
+    weekdays = frozenset(int(weekday) for weekday in allowed_iso_weekdays)
+    if not weekdays or not weekdays <= ALL_ISO_WEEKDAYS:
+        raise ValueError(
+            'Expected ISO weekdays between 1 and 7. Got {!r}.'.format(allowed_iso_weekdays))
+    return weekdays
+
+
+class HolidayCalendar(object):
+    """An in-memory index of the dates in edc_appointment.Holiday.
+
+    Dates are loaded with one query on first use and held as day ordinals in a set
+    and a sorted tuple, so lookups do not query the database. The index is dropped
+    when a Holiday is saved or deleted and by :func:`BaseAppConfiguration.update_holidays_setup`.
+    If a timeout (seconds) is set, either here or with settings.EDC_CONFIGURATION_CACHE_TIMEOUT,
+    it is also reloaded when the timeout has passed, e.g. for holidays changed by another process.
+
+    Usage::
+        from edc_configuration.holidays import holiday_calendar
+
+        holiday_calendar.is_holiday(appt_datetime)
+        holiday_calendar.next_business_day(appt_datetime, allowed_iso_weekdays='12345')
+    """
+
+    def __init__(self, model=None, timeout=None):
+        self._model = model
+        self._timeout = timeout
+        self._ordinals = None
+        self._sorted_ordinals = None
+        self._loaded = None
+        self._connected = False
+        self._lock = threading.RLock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            from edc_appointment.models import Holiday
+            self._model = Holiday
+        return self._model
+
+    @property
+    def timeout(self):
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'EDC_CONFIGURATION_CACHE_TIMEOUT', None)
+
+    def connect(self):
+        """Connects the signals that invalidate the index when a Holiday changes."""
+        if not self._connected:
+            dispatch_uid = 'holiday_calendar_{}'.format(id(self))
+            post_save.connect(self.on_change, sender=self.model, weak=False, dispatch_uid=dispatch_uid)
+            post_delete.connect(self.on_change, sender=self.model, weak=False, dispatch_uid=dispatch_uid)
+            self._connected = True
+
+    def on_change(self, sender, **kwargs):
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._ordinals = None
+            self._sorted_ordinals = None
+
+    def expired(self):
+        timeout = self.timeout
+        return timeout is not None and (self._loaded is None or self._loaded + timeout < time.time())
+
+    def ordinals(self):
+        """Returns (set, sorted tuple) of the day ordinals of the holidays, loading them if needed."""
+        ordinals, sorted_ordinals = self._ordinals, self._sorted_ordinals
+        if ordinals is not None and not self.expired():
+            return ordinals, sorted_ordinals
+        with self._lock:
+            self.connect()
+            sorted_ordinals = tuple(sorted(set(
+                to_date(holiday_date).toordinal()
+                for holiday_date in self.model.objects.values_list('holiday_date', flat=True))))
+            ordinals = frozenset(sorted_ordinals)
+            self._ordinals, self._sorted_ordinals, self._loaded = ordinals, sorted_ordinals, time.time()
+        return ordinals, sorted_ordinals
+
+    def is_holiday(self, value):
+        """Returns True if the date (or date of the datetime) is a holiday."""
+        return to_date(value).toordinal() in self.ordinals()[0]
+
+    def holidays_between(self, start, end):
+        """Returns the holiday dates from `start` to `end`, inclusive, in order."""
+        sorted_ordinals = self.ordinals()[1]
+        index = bisect_left(sorted_ordinals, to_date(start).toordinal())
+        end = to_date(end).toordinal()
+        holidays = []
+        while index < len(sorted_ordinals) and sorted_ordinals[index] <= end:
+            holidays.append(date.fromordinal(sorted_ordinals[index]))
+            index += 1
+        return holidays
+
+    def next_business_day(self, value, allowed_iso_weekdays=None):
+        """Returns `value` if it falls on an allowed ISO weekday and is not a holiday,
+        otherwise the first day after it that does, as a date or, for a datetime, the
+        datetime moved forward by whole days.
+
+        `allowed_iso_weekdays` is a string such as '12345' or a list of integers; default all."""
+        weekdays = iso_weekdays(allowed_iso_weekdays)
+        ordinals = self.ordinals()[0]
+        start = to_date(value).toordinal()
+        ordinal = start
+        # isoweekday() of the ordinal is (ordinal - 1) % 7 + 1
+        while (ordinal - 1) % 7 + 1 not in weekdays or ordinal in ordinals:
+            ordinal += 1
+        return value + timedelta(days=ordinal - start)
+
+holiday_calendar = HolidayCalendar()
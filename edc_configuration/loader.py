@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from collections import namedtuple
+from datetime import date, datetime
+from importlib import import_module
+
+from .exceptions import AppConfigurationError
+
+# bump if the schema or the normalized result changes so old cache files are ignored
+CACHE_VERSION = 1
+
+SECTIONS = ('global_configuration', 'holidays_setup', 'lab_setup', 'labeling_setup')
+
+# same names and fields as the tuples in edc_lab and lis
+AliquotTypeTuple = namedtuple('AliquotTypeTuple', 'name alpha_code numeric_code')
+ClientTuple = namedtuple('ClientTuple', 'hostname printer_name cups_hostname')
+DestinationTuple = namedtuple('DestinationTuple', 'code name address tel email')
+LabelPrinterTuple = namedtuple('LabelPrinterTuple', 'cups_printer_name cups_server_hostname cups_server_ip default')
+PanelTuple = namedtuple('PanelTuple', 'name panel_type aliquot_type_alpha_code')
+ProfileItemTuple = namedtuple('ProfileItemTuple', 'profile_name alpha_code volume count')
+ProfileTuple = namedtuple('ProfileTuple', 'profile_name alpha_code')
+ZplTemplateTuple = namedtuple('ZplTemplateTuple', 'name template default')
+
+LAB_SETUP_TUPLES = {
+    'aliquot_type': AliquotTypeTuple,
+    'destination': DestinationTuple,
+    'panel': PanelTuple,
+    'profile': ProfileTuple,
+    'profile_item': ProfileItemTuple}
+
+LABELING_SETUP_TUPLES = {
+    'client': ClientTuple,
+    'label_printer': LabelPrinterTuple,
+    'zpl_template': ZplTemplateTuple}
+
+FIELD_TYPES = {
+    'count': (int, ),
+    'default': (bool, ),
+    'volume': (int, float)}
+
+FIELD_DEFAULTS = {
+    'address': '',
+    'default': False,
+    'email': '',
+    'tel': ''}
+
+try:
+    STRING_TYPES = (basestring, )  # noqa
+except NameError:
+    STRING_TYPES = (str, )
+
+
+def read(path):
+    """Returns the parsed contents of a .json, .yaml/.yml or .toml file."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'rb') as f:
+        data = f.read()
+    if extension == '.json':
+        return json.loads(data.decode('utf-8'))
+    if extension in ['.yaml', '.yml']:
+        try:
+            import yaml
+        except ImportError:
+            raise AppConfigurationError('Cannot read {}. PyYAML is not installed.'.format(path))
+        return yaml.safe_load(data)
+    if extension == '.toml':
+        for name in ['tomllib', 'tomli', 'toml']:
+            try:
+                toml = import_module(name)
+                break
+            except ImportError:
+                toml = None
+        if toml is None:
+            raise AppConfigurationError('Cannot read {}. Install tomli or toml.'.format(path))
+        return toml.loads(data.decode('utf-8'))
+    raise AppConfigurationError(
+        'Unknown configuration file type {}. Expected .json, .yaml, .yml or .toml'.format(path))
+
+
+def to_date(value, path):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, STRING_TYPES):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    raise AppConfigurationError('{}: expected a date as YYYY-MM-DD. Got {!r}'.format(path, value))
+
+
+def to_tuple(tuple_class, item, path):
+    """Returns `item`, a dictionary, as an instance of `tuple_class`."""
+    if not isinstance(item, dict):
+        raise AppConfigurationError('{}: expected a mapping. Got {!r}'.format(path, item))
+    unknown = set(item) - set(tuple_class._fields)
+    if unknown:
+        raise AppConfigurationError('{}: unknown field(s) {}'.format(path, sorted(unknown)))
+    values = []
+    for field in tuple_class._fields:
+        try:
+            value = item[field]
+        except KeyError:
+            if field not in FIELD_DEFAULTS:
+                raise AppConfigurationError('{}: missing field \'{}\''.format(path, field))
+            value = FIELD_DEFAULTS[field]
+        types = FIELD_TYPES.get(field, STRING_TYPES)
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise AppConfigurationError('{}.{}: expected {}. Got {!r}'.format(
+                path, field, ' or '.join(t.__name__ for t in types), value))
+        values.append(value)
+    return tuple_class(*values)
+
+
+def to_mapping(value, path):
+    if not isinstance(value, dict):
+        raise AppConfigurationError('{}: expected a mapping. Got {!r}'.format(path, value))
+    return value
+
+
+def validate_lists(setup, tuples, path):
+    """Returns a dictionary of list name to a list of tuples. Missing lists are empty."""
+    unknown = set(to_mapping(setup, path)) - set(tuples)
+    if unknown:
+        raise AppConfigurationError('{}: unknown list(s) {}'.format(path, sorted(unknown)))
+    validated = dict((name, []) for name in tuples)
+    for name, items in setup.items():
+        if not isinstance(items, list):
+            raise AppConfigurationError('{}.{}: expected a list. Got {!r}'.format(path, name, items))
+        validated[name] = [
+            to_tuple(tuples[name], item, '{}.{}[{}]'.format(path, name, index)) for index, item in enumerate(items)]
+    return validated
+
+
+def validate(data):
+    """Validates the parsed file and returns a dictionary of section name to
+    configuration in the form expected by :class:`BaseAppConfiguration`.
+
+    Raises AppConfigurationError with the location of the first invalid value."""
+    unknown = set(to_mapping(data, 'configuration')) - set(SECTIONS)
+    if unknown:
+        raise AppConfigurationError('configuration: unknown section(s) {}. Expected {}'.format(
+            sorted(unknown), list(SECTIONS)))
+    sections = {}
+    if 'global_configuration' in data:
+        sections['global_configuration'] = global_configuration = {}
+        for category, attributes in to_mapping(data['global_configuration'], 'global_configuration').items():
+            global_configuration[category] = {}
+            for attribute, value in to_mapping(attributes, 'global_configuration.{}'.format(category)).items():
+                # [value, convert] as in the class attribute
+                if isinstance(value, list):
+                    if len(value) != 2 or not isinstance(value[1], bool):
+                        raise AppConfigurationError(
+                            'global_configuration.{}.{}: expected a value or [value, convert]. Got {!r}'.format(
+                                category, attribute, value))
+                    value = tuple(value)
+                global_configuration[category][attribute] = value
+    if 'holidays_setup' in data:
+        sections['holidays_setup'] = dict(
+            (name, to_date(value, 'holidays_setup.{}'.format(name)))
+            for name, value in to_mapping(data['holidays_setup'], 'holidays_setup').items())
+    if 'lab_setup' in data:
+        sections['lab_setup'] = dict(
+            (lab_name, validate_lists(setup, LAB_SETUP_TUPLES, 'lab_setup.{}'.format(lab_name)))
+            for lab_name, setup in to_mapping(data['lab_setup'], 'lab_setup').items())
+    if 'labeling_setup' in data:
+        sections['labeling_setup'] = validate_lists(data['labeling_setup'], LABELING_SETUP_TUPLES, 'labeling_setup')
+    return sections
+
+
+def cache_path_for(path):
+    """Returns the path of the cache file, next to the source file."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, '.{}.pickle'.format(filename))
+
+
+def read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (IOError, OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+        return None
+    if not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION:
+        return None
+    return cached
+
+
+def write_cache(cache_path, cached):
+    """Writes the cache file atomically; does nothing if the directory is not writable."""
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), prefix='.tmp')
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cached, f, protocol=2)
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def load_configuration(path, use_cache=None):
+    """Returns the validated sections of a configuration file.
+
+    The result is cached in a pickle file next to the source file. The cache is used
+    if the source file's mtime and size are unchanged, or if its sha1 is unchanged,
+    so parsing and validation are skipped on the next start. Pass use_cache=False
+    to always parse the file."""
+    use_cache = True if use_cache is None else use_cache
+    cache_path = cache_path_for(path)
+    stat = os.stat(path)
+    cached = read_cache(cache_path) if use_cache else None
+    if cached and cached['mtime'] == stat.st_mtime and cached['size'] == stat.st_size:
+        return cached['sections']
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    if not cached or cached['sha1'] != digest:
+        try:
+            sections = validate(read(path))
+        except AppConfigurationError as e:
+            raise AppConfigurationError('Invalid configuration file {}. {}'.format(path, e))
+        cached = {'version': CACHE_VERSION, 'sha1': digest, 'sections': sections}
+    cached.update(mtime=stat.st_mtime, size=stat.st_size)
+    if use_cache:
+        write_cache(cache_path, cached)
+    return cached['sections']
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from .exceptions import ConfigurationLockError
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+PREPARE_LOCK = 'edc_configuration.prepare'
+
+# seconds between attempts while waiting for a lock with a timeout
+POLL_INTERVAL = 0.1
+
+
+def lock_key(name):
+    """Returns a signed 64-bit integer for `name` for pg_advisory_lock."""
+    key = int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:16], 16)
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def lock_path(name, database):
+    """Returns the lock file for `name` and the database, in settings.EDC_CONFIGURATION_LOCK_DIR
+    or the temp directory."""
+    directory = getattr(settings, 'EDC_CONFIGURATION_LOCK_DIR', None) or tempfile.gettempdir()
+    identity = '{}:{}'.format(name, os.path.abspath(str(database)) if database else '')
+    return os.path.join(directory, 'edc_configuration.{}.lock'.format(
+        hashlib.sha1(identity.encode('utf-8')).hexdigest()[:12]))
+
+
+def wait_for(acquire, name, timeout=None):
+    """Calls `acquire` until it returns True or `timeout` seconds have passed.
+
+    Raises ConfigurationLockError on timeout."""
+    started = time.time()
+    while not acquire():
+        if timeout is not None and time.time() - started >= timeout:
+            raise ConfigurationLockError(
+                'Timed out waiting {}s for lock \'{}\'.'.format(timeout, name))
+        time.sleep(POLL_INTERVAL)
+
+
+@contextmanager
+def postgresql_lock(connection, name, timeout=None):
+    key = lock_key(name)
+    with connection.cursor() as cursor:
+        if timeout is None:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [key])
+        else:
+            def acquire():
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+                return cursor.fetchone()[0]
+            wait_for(acquire, name, timeout)
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+
+
+@contextmanager
+def mysql_lock(connection, name, timeout=None):
+    # lock names are limited to 64 characters and shared by all databases on the server
+    lock_name = '{}.{}'.format(connection.settings_dict['NAME'], name)[-64:]
+    with connection.cursor() as cursor:
+        # a negative timeout waits forever
+        cursor.execute('SELECT GET_LOCK(%s, %s)', [lock_name, -1 if timeout is None else timeout])
+        if cursor.fetchone()[0] != 1:
+            raise ConfigurationLockError(
+                'Timed out waiting {}s for lock \'{}\'.'.format(timeout, name))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', [lock_name])
+
+
+@contextmanager
+def file_lock(connection, name, timeout=None):
+    """Locks a file next to the database, for SQLite and other backends without named locks.
+
+    Only processes on the same host are excluded."""
+    fd = os.open(lock_path(name, connection.settings_dict['NAME']), os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl:
+            if timeout is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                def acquire():
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except (IOError, OSError):
+                        return False
+                    return True
+                wait_for(acquire, name, timeout)
+        else:
+            def acquire():
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                except (IOError, OSError):
+                    return False
+                return True
+            wait_for(acquire, name, timeout)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+lock_backends = {
+    'postgresql': postgresql_lock,
+    'mysql': mysql_lock,
+}
+
+
+@contextmanager
+def configuration_lock(name=PREPARE_LOCK, timeout=None, using=None):
+    """Holds a lock named `name` shared by all processes using the database.
+
+    Uses a session advisory lock on PostgreSQL, GET_LOCK() on MySQL and otherwise
+    (e.g. SQLite) a file lock. Waits for the lock, or at most `timeout` seconds
+    (default: settings.EDC_CONFIGURATION_LOCK_TIMEOUT) before raising
+    ConfigurationLockError.
+
+    Usage::
+        with configuration_lock():
+            ...
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if timeout is None:
+        timeout = getattr(settings, 'EDC_CONFIGURATION_LOCK_TIMEOUT', None)
+    with lock_backends.get(connection.vendor, file_lock)(connection, name, timeout):
+        yield
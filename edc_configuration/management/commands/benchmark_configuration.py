@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+
+    help = ('Benchmarks configuration reads, Convert round-trips and prepare() '
+            'in a test database (in memory for SQLite).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10,1000,10000',
+            help='Comma separated sizes of the synthetic lab setups for prepare(). Default: 10,1000,10000')
+        parser.add_argument(
+            '--number', type=int, default=1000,
+            help='Number of calls per read and convert measurement. Default: 1000')
+        parser.add_argument(
+            '--imports', action='store_true', default=False,
+            help='Also measure import time with python -X importtime (Python 3.7+).')
+        parser.add_argument('--save', help='Save the results as JSON to this path.')
+        parser.add_argument('--compare', help='Compare the results to a JSON baseline at this path.')
+        parser.add_argument(
+            '--tolerance', type=float, default=1.25,
+            help='Report a regression if seconds exceed the baseline by this factor. Default: 1.25')
+
+    def handle(self, *args, **options):
+        from edc_configuration.benchmarks.baseline import compare, load_baseline, save_baseline
+        from edc_configuration.benchmarks.prepare import benchmark_prepare
+        from edc_configuration.benchmarks.reads import benchmark_reads
+
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+        except ValueError:
+            raise CommandError('Invalid --sizes. Expected comma separated integers. Got {}'.format(
+                options['sizes']))
+        number = options['number']
+        results = self.convert_results(number)
+        if options['imports']:
+            results.update(self.import_results())
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            for name, result in benchmark_reads(number).items():
+                results['reads.{}'.format(name)] = result
+            results.update(benchmark_prepare(sizes))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        for name, result in results.items():
+            self.stdout.write('{:<40}{:>14.6f} s{:>10.1f} queries'.format(name, result['seconds'], result['queries']))
+        if options['save']:
+            save_baseline(results, options['save'])
+            self.stdout.write('Saved baseline to {}'.format(options['save']))
+        if options['compare']:
+            regressions = compare(results, load_baseline(options['compare']), options['tolerance'])
+            for name, _, _, message in regressions:
+                self.stderr.write('Regression {}: {}'.format(name, message))
+            if regressions:
+                raise CommandError('{} regressions against {}'.format(len(regressions), options['compare']))
+            self.stdout.write('No regressions against {}'.format(options['compare']))
+
+    def convert_results(self, number):
+        from edc_configuration.benchmarks.convert import benchmark_convert, benchmark_to_string
+
+        results = OrderedDict()
+        for value_type, (cascade, classifier, memoized) in benchmark_convert(number).items():
+            results['convert.to_value.{}'.format(value_type)] = OrderedDict(
+                [('seconds', memoized / number), ('queries', 0)])
+            results['convert.convert_value.{}'.format(value_type)] = OrderedDict(
+                [('seconds', classifier / number), ('queries', 0)])
+        for value_type, seconds in benchmark_to_string(number).items():
+            results['convert.to_string.{}'.format(value_type)] = OrderedDict(
+                [('seconds', seconds / number), ('queries', 0)])
+        return results
+
+    def import_results(self):
+        from edc_configuration.benchmarks.imports import benchmark_imports
+
+        results = OrderedDict()
+        try:
+            for module, result in benchmark_imports().items():
+                results['imports.{}'.format(module)] = OrderedDict([('seconds', result['seconds']), ('queries', 0)])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        return results
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from edc_configuration.bundle import export_bundle, open_bundle
+
+
+class Command(BaseCommand):
+
+    help = ('Writes the configuration rows of a BaseAppConfiguration subclass to a JSON lines bundle '
+            'for import_configuration.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_configuration', help='Dotted path to a BaseAppConfiguration subclass.')
+        parser.add_argument('path', help='Bundle file to write, compressed if it ends with .gz, or - for stdout.')
+        parser.add_argument(
+            '--no-site-lab-profiles', action='store_false', dest='use_site_lab_profiles', default=True,
+            help='Use the lab models declared on the class instead of site_lab_profiles.')
+
+    def handle(self, *args, **options):
+        try:
+            app_configuration_class = import_string(options['app_configuration'])
+        except ImportError as e:
+            raise CommandError('Cannot import {}. Got {}'.format(options['app_configuration'], e))
+        if options['use_site_lab_profiles'] and app_configuration_class.applies_section('lab'):
+            from edc_lab.lab_profile.classes import site_lab_profiles
+            site_lab_profiles.autodiscover()
+        app_configuration = app_configuration_class(use_site_lab_profiles=options['use_site_lab_profiles'])
+        if options['path'] == '-':
+            export_bundle(app_configuration, self.stdout)
+        else:
+            with open_bundle(options['path'], 'w') as stream:
+                count = export_bundle(app_configuration, stream)
+            self.stderr.write('Wrote {} rows to {}.'.format(count, options['path']))
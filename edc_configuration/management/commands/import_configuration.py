@@ -0,0 +1,40 @@
+import sys
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from edc_configuration.bundle import import_bundle, open_bundle
+from edc_configuration.exceptions import AppConfigurationError
+
+
+class Command(BaseCommand):
+
+    help = 'Updates or creates the configuration rows in a bundle written by export_configuration.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_configuration', help='Dotted path to a BaseAppConfiguration subclass.')
+        parser.add_argument('path', help='Bundle file to read, compressed if it ends with .gz, or - for stdin.')
+        parser.add_argument(
+            '--no-site-lab-profiles', action='store_false', dest='use_site_lab_profiles', default=True,
+            help='Use the lab models declared on the class instead of site_lab_profiles.')
+
+    def handle(self, *args, **options):
+        try:
+            app_configuration_class = import_string(options['app_configuration'])
+        except ImportError as e:
+            raise CommandError('Cannot import {}. Got {}'.format(options['app_configuration'], e))
+        if options['use_site_lab_profiles'] and app_configuration_class.applies_section('lab'):
+            from edc_lab.lab_profile.classes import site_lab_profiles
+            site_lab_profiles.autodiscover()
+        app_configuration = app_configuration_class(use_site_lab_profiles=options['use_site_lab_profiles'])
+        try:
+            if options['path'] == '-':
+                results = import_bundle(app_configuration, sys.stdin)
+            else:
+                with open_bundle(options['path']) as stream:
+                    results = import_bundle(app_configuration, stream)
+        except (AppConfigurationError, ObjectDoesNotExist, IOError, OSError, ValueError) as e:
+            raise CommandError(str(e))
+        for name, result in results.items():
+            self.stdout.write('{} {} created, {} updated, {} unchanged'.format(name, *result))
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from edc_configuration.exceptions import AppConfigurationError
+
+
+class Command(BaseCommand):
+
+    help = 'Runs prepare() of a BaseAppConfiguration subclass, e.g. myapp.app_configuration.AppConfiguration.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_configuration', help='Dotted path to a BaseAppConfiguration subclass.')
+        parser.add_argument(
+            '--force', action='store_true', default=False,
+            help='Apply every section even if unchanged since last applied.')
+        parser.add_argument(
+            '--profile', action='store_true', default=False,
+            help='Print wall time, queries and rows created, updated and unchanged for each section.')
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='Print the rows that would be created or updated and roll back.')
+        parser.add_argument(
+            '--sections', default=None,
+            help='Comma separated section names to prepare, e.g. lab,labeling,global. Default: all.')
+        parser.add_argument(
+            '--keep-going', action='store_true', default=False,
+            help='Roll back a failing section and continue with the others instead of rolling back all.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Run sections on this many threads, each after the sections it depends on. '
+                 'Ignored on SQLite and with --dry-run.')
+        parser.add_argument(
+            '--lock-timeout', type=float, default=None,
+            help='Seconds to wait for another process preparing the configuration. Default: wait.')
+        parser.add_argument(
+            '--no-site-lab-profiles', action='store_false', dest='use_site_lab_profiles', default=True,
+            help='Use the lab models declared on the class instead of site_lab_profiles.')
+
+    def handle(self, *args, **options):
+        try:
+            app_configuration_class = import_string(options['app_configuration'])
+        except ImportError as e:
+            raise CommandError('Cannot import {}. Got {}'.format(options['app_configuration'], e))
+        if options['use_site_lab_profiles'] and app_configuration_class.applies_section('lab'):
+            from edc_lab.lab_profile.classes import site_lab_profiles
+            site_lab_profiles.autodiscover()
+        sections = None
+        if options['sections']:
+            sections = [section.strip() for section in options['sections'].split(',') if section.strip()]
+        try:
+            report = app_configuration_class(
+                use_site_lab_profiles=options['use_site_lab_profiles']).prepare(
+                    force=options['force'], sections=sections, dry_run=options['dry_run'],
+                    workers=options['workers'], keep_going=options['keep_going'],
+                    lock_timeout=options['lock_timeout'], profile=options['profile'])
+        except AppConfigurationError as e:
+            raise CommandError(str(e))
+        self.write_report(report, options['profile'])
+
+    def write_report(self, report, profile=None):
+        if report.dry_run:
+            for line in report.diff_lines():
+                self.stdout.write(line)
+            self.stdout.write('Dry run, nothing was saved.')
+        if profile:
+            for line in report.as_table():
+                self.stdout.write(line)
+        else:
+            for section, section_report in report.items():
+                self.stdout.write('{} {}'.format(section, section_report.status))
+        failed = [section for section, section_report in report.items() if section_report.error]
+        if failed:
+            raise CommandError('Failed to prepare section(s) {}.'.format(', '.join(failed)))
@@ -0,0 +1,13 @@
+from .cache import configuration_cache
+
+
+class ConfigurationCacheMiddleware(object):
+    """Checks the shared configuration cache version once per request so values
+    changed by another process are reloaded.
+
+    Add 'edc_configuration.middleware.ConfigurationCacheMiddleware' to MIDDLEWARE_CLASSES
+    and set EDC_CONFIGURATION_CACHE_ALIAS."""
+
+    def process_request(self, request):
+        configuration_cache.check_version()
+        return None
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import uuid
+import django.core.validators
+import django_extensions.db.fields
+import edc_base.model.fields.hostname_modification_field
+import django_revision.revision_field
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalConfiguration',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(verbose_name='created', auto_now_add=True)),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(verbose_name='modified', auto_now=True)),
+                ('user_created', models.CharField(verbose_name='user created', max_length=50, db_index=True, default='', editable=False, help_text='System field. (updated by admin)')),
+                ('user_modified', models.CharField(verbose_name='user modified', max_length=50, db_index=True, default='', editable=False, help_text='System field. (updated by admin)')),
+                ('hostname_created', models.CharField(max_length=50, db_index=True, default='vm', editable=False, help_text='System field. (modified on create only)')),
+                ('hostname_modified', edc_base.model.fields.hostname_modification_field.HostnameModificationField(max_length=50, db_index=True, default='vm', editable=False, help_text='System field. (modified on every save)')),
+                ('revision', django_revision.revision_field.RevisionField(verbose_name='Revision', max_length=75, blank=True, null=True, editable=False, help_text='System field. Git repository tag:branch:commit.')),
+                ('id', models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, serialize=False, help_text='System field. UUID primary key.')),
+                ('category', models.CharField(max_length=50)),
+                ('attribute', models.CharField(max_length=50, unique=True, validators=[django.core.validators.RegexValidator('[a-z0-9_]', 'Invalid attribute name, must be lower case separated by underscore.')])),
+                ('value', models.CharField(max_length=50, help_text='any string value or string representation of a value')),
+                ('convert', models.BooleanField(default=True, help_text='If True, automatically convert string value to its datatype. Type is autodetected in this order: Boolean, None, Decimal, Integer, Date, Datetime otherwise String')),
+                ('comment', models.CharField(max_length=100)),
+            ],
+        ),
+    ]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from dateutil import parser
+from django.db import migrations, models
+
+# a copy of the rules edc_configuration.convert used to detect the type of a string
+# value when this migration was written; do not import them, they may change
+BOOLEANS = ('true', 'false', 'none')
+
+CLASSIFIER = re.compile(
+    r'^(?:'
+    r'(?P<time>[0-9]{1,2}:[0-9]{2})'
+    r'|(?P<int>-?(?:0|[1-9][0-9]*))'
+    r'|(?P<decimal>-?[0-9]+\.[0-9]+)'
+    r'|(?P<datetime>(?P<year>[0-9]{4})-(?P<month>[0-9]{2})-(?P<day>[0-9]{2})'
+    r'(?:[T ](?P<hour>[0-9]{2}):(?P<minute>[0-9]{2})'
+    r'(?::(?P<second>[0-9]{2})(?:\.(?P<microsecond>[0-9]{1,6}))?)?)?)'
+    r')\Z')
+
+HAS_DIGIT = re.compile('[0-9]')
+
+
+def is_decimal(string_value):
+    try:
+        return '.' in string_value and str(Decimal(string_value)) == string_value
+    except (ValueError, InvalidOperation):
+        return False
+
+
+def is_int(string_value):
+    try:
+        return str(int(string_value)) == string_value
+    except ValueError:
+        return False
+
+
+def is_iso_datetime(match):
+    try:
+        datetime(*[int(match.group(name) or 0) for name in ('year', 'month', 'day', 'hour', 'minute', 'second')])
+    except ValueError:
+        return False
+    return True
+
+
+def is_datetime(string_value):
+    try:
+        parser.parse(string_value)
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return True
+
+
+def guess_value_type(value, convert):
+    """Returns the value type of a stored string value."""
+    string_value = value.strip(' "')
+    if not convert:
+        return 'str'
+    if string_value.lower() in BOOLEANS:
+        return 'boolean'
+    match = CLASSIFIER.match(string_value)
+    if match:
+        value_type = match.lastgroup
+        if value_type == 'time':
+            return 'time'
+        elif value_type == 'datetime' and is_iso_datetime(match):
+            return 'datetime'
+        elif value_type == 'decimal' and is_decimal(string_value):
+            return 'decimal'
+        elif value_type in ('int', 'decimal') and is_int(string_value):
+            return 'int'
+    elif not HAS_DIGIT.search(string_value):
+        return 'str'
+    else:
+        if is_decimal(string_value):
+            return 'decimal'
+        elif is_int(string_value):
+            return 'int'
+    return 'datetime' if is_datetime(string_value) else 'str'
+
+
+def backfill_value_type(apps, schema_editor):
+    """Sets value_type on existing rows using one update per value type."""
+    GlobalConfiguration = apps.get_model('edc_configuration', 'GlobalConfiguration')
+    pks = {}
+    for pk, value, convert in GlobalConfiguration.objects.filter(value_type='').values_list(
+            'pk', 'value', 'convert'):
+        pks.setdefault(guess_value_type(value, convert), []).append(pk)
+    for value_type, value_type_pks in pks.items():
+        GlobalConfiguration.objects.filter(pk__in=value_type_pks).update(value_type=value_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_configuration', '0002_configurationfingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalconfiguration',
+            name='value_type',
+            field=models.CharField(
+                default='', editable=False, max_length=10, blank=True,
+                help_text='Datatype of the converted value. Set on save.',
+                choices=[('boolean', 'Boolean or None'), ('datetime', 'Datetime'), ('decimal', 'Decimal'),
+                         ('int', 'Integer'), ('str', 'String'), ('time', 'Time (as string)')]),
+        ),
+        migrations.RunPython(backfill_value_type, migrations.RunPython.noop),
+    ]
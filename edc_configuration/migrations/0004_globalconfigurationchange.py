@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_configuration', '0003_globalconfiguration_value_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalConfigurationChange',
+            fields=[
+                ('revision', models.AutoField(serialize=False, primary_key=True)),
+                ('category', models.CharField(max_length=50)),
+                ('attribute', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=50, blank=True)),
+                ('convert', models.BooleanField(default=True)),
+                ('value_type', models.CharField(max_length=10, blank=True)),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ('revision', ),
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.core.validators
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_configuration', '0004_globalconfigurationchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalconfiguration',
+            name='namespace',
+            field=models.CharField(
+                default='', max_length=25, blank=True,
+                help_text='Leave blank for values that apply to all namespaces',
+                validators=[django.core.validators.RegexValidator(
+                    '^[a-z0-9_]*$', 'Invalid namespace, must be lower case separated by underscore.')]),
+        ),
+        migrations.AlterField(
+            model_name='globalconfiguration',
+            name='attribute',
+            field=models.CharField(
+                max_length=50,
+                validators=[django.core.validators.RegexValidator(
+                    '[a-z0-9_]', 'Invalid attribute name, must be lower case separated by underscore.')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='globalconfiguration',
+            unique_together=set([('namespace', 'attribute')]),
+        ),
+        migrations.AddField(
+            model_name='globalconfigurationchange',
+            name='namespace',
+            field=models.CharField(default='', max_length=25, blank=True),
+        ),
+    ]
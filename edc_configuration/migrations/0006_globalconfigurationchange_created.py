@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.utils.timezone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_configuration', '0005_globalconfiguration_namespace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalconfigurationchange',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, db_index=True),
+        ),
+    ]
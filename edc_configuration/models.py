@@ -1,31 +1,82 @@
+from datetime import timedelta
+
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 from edc_base.model.models import BaseUuidModel
 
-from .convert import Convert
+from .cache import configuration_cache, GLOBAL_NAMESPACE, MISSING
+from .changes import change_retention
+from .convert import Convert, STRING_TYPES, VALUE_TYPES
+from .defaults import default_global_configuration
+from .snapshot import ConfigurationSnapshot
 
 
 class ConfigurationManager(models.Manager):
 
-    def get_attr_value(self, attribute_name):
-        """Returns the attribute value in its original datatype assuming it can be converted."""
-        try:
-            obj = self.get(attribute=attribute_name)
-            return Convert(obj.value, convert=obj.convert).to_value()
-        except self.model.DoesNotExist:
-            return ''
-
-    def set_attr(self, attribute_name, value, convert=None):
-        """Sets the attribute value."""
+    def get_attr_value(self, attribute_name, namespace=None):
+        """Returns the attribute value in its original datatype assuming it can be converted.
+
+        If `namespace` is given its value is returned or, if it has none, the global value.
+        Converted values are served from the configuration cache, see :class:`ConfigurationCache`."""
+        value = configuration_cache.get(attribute_name, namespace=namespace)
+        return '' if value is MISSING else value
+
+    def snapshot(self, category=None, namespace=None):
+        """Returns a read-only :class:`ConfigurationSnapshot` of converted values for
+        all attributes of `namespace` (default: the global namespace), or for those in
+        `category`, using a single query."""
+        rows = self.filter(namespace=namespace or GLOBAL_NAMESPACE)
+        if category:
+            rows = rows.filter(category=category)
+        return ConfigurationSnapshot.from_rows(
+            rows.values_list('category', 'attribute', 'value', 'convert', 'value_type'),
+            lambda value, convert, value_type: Convert(
+                value, convert=convert, value_type=value_type).to_value())
+
+    def revision(self):
+        """Returns the revision of the last change recorded in the change log, or 0."""
+        return GlobalConfigurationChange.objects.aggregate(revision=Max('revision'))['revision'] or 0
+
+    def changes_since(self, revision, namespace=None):
+        """Returns a list of (revision, category, attribute, deleted, value, convert, value_type)
+        for each change recorded after `revision`, in order, using one query on the revision.
+
+        If `namespace` is given only its changes are returned. See :class:`GlobalConfigurationChange`
+        and :class:`changes.ChangeFeed`."""
+        changes = GlobalConfigurationChange.objects.filter(revision__gt=revision)
+        if namespace is not None:
+            changes = changes.filter(namespace=namespace)
+        return list(changes.order_by('revision').values_list(
+            'revision', 'category', 'attribute', 'deleted', 'value', 'convert', 'value_type'))
+
+    def set_attr(self, attribute_name, value, convert=None, namespace=None, category=None):
+        """Sets the attribute value in `namespace` (default: the global namespace).
+
+        The value is read back with the Python type of `value`, e.g. 30 as 30 and '30'
+        as '30', see :func:`convert.python_value_type`. A new attribute is added to
+        `category` or, if not given, to its category in default_global_configuration."""
         convert = True if convert is None else convert
+        namespace = namespace or GLOBAL_NAMESPACE
+        configuration_cache.invalidate(attribute_name, namespace=namespace)
         try:
-            obj = self.get(attribute=attribute_name)
+            obj = self.get(namespace=namespace, attribute=attribute_name)
             obj.value = value
             obj.convert = convert
+            # the value type of the new value, not the one saved with the old value
+            obj.value_type = ''
             obj.save()
         except self.model.DoesNotExist:
+            if category is None:
+                category = next((name for name, attributes in default_global_configuration.items()
+                                 if attribute_name in attributes), '')
             self.create(
+                namespace=namespace,
+                category=category,
                 attribute=attribute_name,
                 value=value,
                 convert=convert)
@@ -35,21 +86,33 @@ class GlobalConfiguration(BaseUuidModel):
     """A model to store any configurations values for reference in the edc and other models.
 
     The manager method :func:`get_attr_value` will convert the stored string value to it's
-    original datatype unless told not to (convert=False).
+    original datatype unless told not to (convert=False). The datatype is that of the Python
+    value saved, e.g. 30 or '30', and is stored in `value_type` so reads do not detect it.
+
+    An attribute is unique within its `namespace`, e.g. a study or protocol sharing the
+    database. A value in a namespace overrides the value in the global namespace (blank).
 
     Usage::
         GlobalConfiguration.objects.create(category=category_name,
             attribute=attribute_name, value=string_value)
         value = GlobalConfiguration.objects.get_attr_value(attribute_name)
+        value = GlobalConfiguration.objects.get_attr_value(attribute_name, namespace='bcpp')
 
     ..seealso:: func:`base_app_configuration.update_global`
 
     """
+    namespace = models.CharField(
+        max_length=25,
+        default=GLOBAL_NAMESPACE,
+        blank=True,
+        validators=[RegexValidator('^[a-z0-9_]*$',
+                                   'Invalid namespace, must be lower case separated by underscore.'), ],
+        help_text='Leave blank for values that apply to all namespaces')
+
     category = models.CharField(max_length=50)
 
     attribute = models.CharField(
         max_length=50,
-        unique=True,
         validators=[RegexValidator('[a-z0-9_]',
                                    'Invalid attribute name, must be lower case separated by underscore.'), ])
     value = models.CharField(
@@ -62,9 +125,126 @@ class GlobalConfiguration(BaseUuidModel):
                    'Type is autodetected in this order: Boolean, None, Decimal, Integer, '
                    'Date, Datetime otherwise String'))
 
+    value_type = models.CharField(
+        max_length=10,
+        choices=VALUE_TYPES,
+        default='',
+        blank=True,
+        editable=False,
+        help_text='Datatype of the converted value. Set on save.')
+
     comment = models.CharField(max_length=100)
 
     objects = ConfigurationManager()
 
+    def save(self, *args, **kwargs):
+        # a string keeps the value type it was saved with, e.g. when saved again after a read
+        value_type = self.value_type if isinstance(self.value, STRING_TYPES) else None
+        convert = Convert(self.value, convert=self.convert, value_type=value_type)
+        self.value = convert.to_string()
+        self.value_type = convert.value_type
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'value_type' not in update_fields:
+            kwargs.update({'update_fields': list(update_fields) + ['value_type']})
+        super(GlobalConfiguration, self).save(*args, **kwargs)
+
+    class Meta:
+        app_label = 'edc_configuration'
+        unique_together = (('namespace', 'attribute'), )
+
+
+class ConfigurationFingerprint(BaseUuidModel):
+    """A model to store a hash of each configuration section last applied by
+    :func:`BaseAppConfiguration.prepare`.
+
+    A section whose hash has not changed is skipped on the next call to prepare()."""
+
+    section = models.CharField(max_length=50, unique=True)
+
+    fingerprint = models.CharField(max_length=40)
+
+    class Meta:
+        app_label = 'edc_configuration'
+
+
+class ChangeManager(models.Manager):
+
+    def record(self, rows, deleted=None):
+        """Adds a change for each dictionary of GlobalConfiguration values using one insert."""
+        self.bulk_create([
+            self.model(namespace=row.get('namespace', GLOBAL_NAMESPACE), category=row['category'],
+                       attribute=row['attribute'], value=row['value'], convert=row['convert'],
+                       value_type=row['value_type'], deleted=bool(deleted))
+            for row in rows])
+
+    def record_changed(self, rows, result):
+        """Adds a change for each row created or updated according to the BulkResult of
+        a :class:`BulkUpdateOrCreate` by namespace and attribute."""
+        changed = set(key for _, key, _ in result.changes)
+        self.record(row for row in rows if (row['namespace'], row['attribute']) in changed)
+
+    def prune(self, revision):
+        """Deletes the changes up to and including `revision`."""
+        self.filter(revision__lte=revision).delete()
+
+    def expire(self, retention=None):
+        """Deletes the changes older than `retention` seconds (default:
+        settings.EDC_CONFIGURATION_CHANGE_RETENTION, 7 days).
+
+        Called by :func:`BaseAppConfiguration.prepare`. A cache not refreshed for longer
+        than the retention reloads its snapshot instead of reading the changes."""
+        retention = change_retention() if retention is None else retention
+        self.filter(created__lt=timezone.now() - timedelta(seconds=retention)).delete()
+
+
+class GlobalConfigurationChange(models.Model):
+    """A log of changes to GlobalConfiguration numbered by an auto-incrementing revision.
+
+    A change is added for each save and delete and by :func:`BaseAppConfiguration.update_global`.
+    Queryset `update()` and `delete()` are not logged. Long-running processes read the changes
+    since the last revision they applied instead of reloading every value, see
+    :func:`ConfigurationManager.changes_since`. Changes are kept for
+    settings.EDC_CONFIGURATION_CHANGE_RETENTION, see :func:`ChangeManager.expire`."""
+
+    revision = models.AutoField(primary_key=True)
+
+    namespace = models.CharField(max_length=25, default=GLOBAL_NAMESPACE, blank=True)
+
+    category = models.CharField(max_length=50)
+
+    attribute = models.CharField(max_length=50)
+
+    value = models.CharField(max_length=50, blank=True)
+
+    convert = models.BooleanField(default=True)
+
+    value_type = models.CharField(max_length=10, blank=True)
+
+    deleted = models.BooleanField(default=False)
+
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = ChangeManager()
+
     class Meta:
         app_label = 'edc_configuration'
+        ordering = ('revision', )
+
+
+def change_row(instance):
+    return dict(namespace=instance.namespace, category=instance.category, attribute=instance.attribute,
+                value=instance.value, convert=instance.convert, value_type=instance.value_type)
+
+
+@receiver(post_save, sender=GlobalConfiguration, dispatch_uid='global_configuration_on_post_save')
+def global_configuration_on_post_save(sender, instance, raw, **kwargs):
+    """Logs the change and invalidates the configuration cache of the namespace (in all
+    processes if a shared cache is configured), now and after the commit."""
+    GlobalConfigurationChange.objects.record([change_row(instance)])
+    configuration_cache.invalidate_on_commit(namespace=instance.namespace, using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=GlobalConfiguration, dispatch_uid='global_configuration_on_post_delete')
+def global_configuration_on_post_delete(sender, instance, **kwargs):
+    GlobalConfigurationChange.objects.record([change_row(instance)], deleted=True)
+    configuration_cache.invalidate_on_commit(namespace=instance.namespace, using=kwargs.get('using'))
@@ -0,0 +1,137 @@
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .diff import CREATE, DELETE
+
+
+class SectionReport(object):
+    """Timing, query count and row counts for one section of
+    :func:`BaseAppConfiguration.prepare`.
+
+    `queries` is None if queries were not counted, see :func:`measure`."""
+
+    def __init__(self, section, status=None):
+        self.section = section
+        self.status = status
+        self.seconds = 0.0
+        self.queries = None
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.changes = []
+        self.error = None
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(self.__class__.__name__, self.section, self.status)
+
+    def add(self, result):
+        """Adds the counts and changes of a BulkResult."""
+        self.created += result.created
+        self.updated += result.updated
+        self.unchanged += result.unchanged
+        self.deleted += result.deleted
+        if result.changes:
+            model_label = '{}.{}'.format(result.model._meta.app_label, result.model._meta.model_name)
+            self.changes.extend((model_label, ) + change for change in result.changes)
+
+    def diff_lines(self):
+        """Returns the rows created (+), updated (~) or deleted (-) as lines of text."""
+        lines = []
+        for model_label, action, key, fields in self.changes:
+            if action == CREATE:
+                values = ', '.join('{}={!r}'.format(field, fields[field][1]) for field in sorted(fields))
+                lines.append('+ {} {} {}'.format(model_label, key, values))
+            elif action == DELETE:
+                values = ', '.join('{}={!r}'.format(field, fields[field][0]) for field in sorted(fields))
+                lines.append('- {} {} {}'.format(model_label, key, values))
+            else:
+                values = ', '.join(
+                    '{}: {!r} -> {!r}'.format(field, fields[field][0], fields[field][1]) for field in sorted(fields))
+                lines.append('~ {} {} {}'.format(model_label, key, values))
+        return lines
+
+    @contextmanager
+    def measure(self, count_queries=None):
+        """Adds the wall time of the block to the report and the number of queries
+        if `count_queries` is True or the connection already logs queries (DEBUG).
+
+        Counting turns on the connection's debug cursor for the block. The count is
+        limited by the size of the connection's query log."""
+        start = time.time()
+        count_queries = count_queries or connection.queries_logged
+        if count_queries:
+            force_debug_cursor, connection.force_debug_cursor = connection.force_debug_cursor, True
+            start_queries = len(connection.queries_log)
+        try:
+            yield self
+        finally:
+            self.seconds += time.time() - start
+            if count_queries:
+                self.queries = (self.queries or 0) + len(connection.queries_log) - start_queries
+                connection.force_debug_cursor = force_debug_cursor
+
+    def as_dict(self):
+        return OrderedDict([
+            ('section', self.section),
+            ('status', self.status),
+            ('seconds', self.seconds),
+            ('queries', self.queries),
+            ('created', self.created),
+            ('updated', self.updated),
+            ('unchanged', self.unchanged),
+            ('deleted', self.deleted)])
+
+
+class PrepareReport(OrderedDict):
+    """An ordered dictionary of section name to :class:`SectionReport`.
+
+    `dry_run` is True if the changes were rolled back and `profile` is True if
+    the queries of each section were counted."""
+
+    dry_run = False
+    profile = False
+
+    @property
+    def seconds(self):
+        return sum(section_report.seconds for section_report in self.values())
+
+    @property
+    def queries(self):
+        """Returns the number of queries of the sections that counted them or None."""
+        queries = [section_report.queries for section_report in self.values()
+                   if section_report.queries is not None]
+        return sum(queries) if queries else None
+
+    def diff_lines(self):
+        """Returns the changes of each section as lines of text."""
+        lines = []
+        for section, section_report in self.items():
+            diff_lines = section_report.diff_lines()
+            if diff_lines:
+                lines.append(section)
+                lines.extend('  {}'.format(line) for line in diff_lines)
+        return lines
+
+    def as_table(self):
+        """Returns the report as lines of text."""
+        template = ('{section:<20}{status:<12}{seconds:>10}{queries:>10}'
+                    '{created:>10}{updated:>10}{unchanged:>10}{deleted:>10}')
+        lines = [template.format(
+            section='section', status='status', seconds='seconds', queries='queries',
+            created='created', updated='updated', unchanged='unchanged', deleted='deleted')]
+        for section_report in self.values():
+            values = section_report.as_dict()
+            values.update(
+                status=values['status'] or '', seconds='{:.3f}'.format(values['seconds']),
+                queries='' if values['queries'] is None else values['queries'])
+            lines.append(template.format(**values))
+        lines.append(template.format(
+            section='total', status='', seconds='{:.3f}'.format(self.seconds),
+            queries='' if self.queries is None else self.queries,
+            created='', updated='', unchanged='', deleted=''))
+        return lines
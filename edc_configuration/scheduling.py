@@ -0,0 +1,88 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from .cache import configuration_cache, LRUCache, MISSING
+from .defaults import default_global_configuration
+from .holidays import iso_weekdays, to_date
+
+
+def weekday_mask(allowed_iso_weekdays=None):
+    """Returns a bitmask of ISO weekdays, bit 0 for Monday, e.g. 0b0011111 for '12345'."""
+    mask = 0
+    for weekday in iso_weekdays(allowed_iso_weekdays):
+        mask |= 1 << (weekday - 1)
+    return mask
+
+
+class SchedulingPolicy(namedtuple('SchedulingPolicy', 'weekday_mask days_forward per_day_max use_same_weekday')):
+    """The appointment settings of the 'appointment' category of global_configuration.
+
+    `weekday_mask` is the bitmask of `allowed_iso_weekdays`, `days_forward` is
+    `appointments_days_forward` and `per_day_max` is `appointments_per_day_max`.
+    See :func:`scheduling_policy` for the policy of the current configuration and
+    :mod:`edc_configuration.arrays` for NumPy versions of the date helpers.
+
+    Usage::
+        policy = scheduling_policy()
+        policy.allows(appt_date)
+        policy.valid_dates(appt_date, holidays=holiday_calendar)
+    """
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Returns the policy for a dictionary of the appointment attributes; missing
+        attributes are taken from default_global_configuration."""
+        defaults = default_global_configuration['appointment']
+
+        def get(attribute):
+            value = configuration.get(attribute, MISSING)
+            return defaults[attribute] if value is MISSING else value
+        return cls(
+            weekday_mask=weekday_mask(str(get('allowed_iso_weekdays'))),
+            days_forward=int(get('appointments_days_forward')),
+            per_day_max=int(get('appointments_per_day_max')),
+            use_same_weekday=get('use_same_weekday'))
+
+    @property
+    def iso_weekdays(self):
+        return tuple(weekday for weekday in range(1, 8) if self.weekday_mask & (1 << (weekday - 1)))
+
+    @property
+    def weekmask(self):
+        """Returns the weekdays as seven '1' or '0' characters starting on Monday, as for numpy.busdaycalendar."""
+        return ''.join('1' if self.weekday_mask & (1 << day) else '0' for day in range(7))
+
+    def allows(self, value):
+        """Returns True if the date (or date of the datetime) falls on an allowed weekday."""
+        return bool(self.weekday_mask & (1 << to_date(value).weekday()))
+
+    def window(self, value):
+        """Returns the first and last date appointments may be scheduled from `value`."""
+        value = to_date(value)
+        return value, value + timedelta(days=self.days_forward)
+
+    def valid_dates(self, start, end=None, holidays=None):
+        """Returns the dates from `start` to `end` (default: the end of the window), inclusive,
+        that fall on an allowed weekday and, if `holidays` is a :class:`HolidayCalendar`,
+        are not holidays."""
+        start, last = self.window(start)
+        end = last if end is None else to_date(end)
+        excluded = holidays.ordinals()[0] if holidays is not None else ()
+        dates = (start + timedelta(days=day) for day in range((end - start).days + 1))
+        return [value for value in dates if self.allows(value) and value.toordinal() not in excluded]
+
+# memo of id(snapshot) to (snapshot, SchedulingPolicy)
+compiled_policies = LRUCache(maxsize=4)
+
+
+def scheduling_policy(cache=None, namespace=None):
+    """Returns the :class:`SchedulingPolicy` of the configuration snapshot of `namespace`
+    resolved with the global values, building it only when a snapshot has been reloaded
+    or refreshed since the last call."""
+    snapshot = (cache or configuration_cache).resolved(namespace)
+    cached = compiled_policies.get(id(snapshot))
+    if cached is not MISSING and cached[0] is snapshot:
+        return cached[1]
+    policy = SchedulingPolicy.from_configuration(snapshot.category('appointment'))
+    compiled_policies.set(id(snapshot), (snapshot, policy))
+    return policy
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from functools import partial
+
+from django.apps import apps
+
+from .exceptions import AppConfigurationError
+
+
+class Section(object):
+    """A configuration section applied by :func:`BaseAppConfiguration.prepare`.
+
+    `configuration` and `apply` are either the name of an attribute / method of the
+    app configuration or a callable that takes the app configuration. The configuration
+    is fingerprinted to decide if the section needs to be applied. `depends_on` names
+    the sections that must be applied first and `models` lists the models the section
+    writes to as 'app_label.model_name'.
+
+    Usage::
+        site_sections.register(Section(
+            'visit_schedule',
+            configuration=lambda app_configuration: app_configuration.visit_schedule_setup,
+            apply=update_visit_schedules,
+            depends_on=['content_type_map'],
+            models=['edc_visit_schedule.visitdefinition']))
+    """
+
+    def __init__(self, name, configuration, apply, depends_on=None, models=None):
+        self.name = name
+        self.configuration = configuration
+        self.apply = apply
+        self.depends_on = tuple(depends_on or ())
+        self.models = tuple(models or ())
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.name)
+
+    def get_configuration(self, app_configuration):
+        if callable(self.configuration):
+            return self.configuration(app_configuration)
+        return getattr(app_configuration, self.configuration)
+
+    def get_apply(self, app_configuration):
+        """Returns a function without arguments that applies the section."""
+        if callable(self.apply):
+            return partial(self.apply, app_configuration)
+        return getattr(app_configuration, self.apply)
+
+
+class SectionRegistry(object):
+    """A registry of :class:`Section` by name in the order registered."""
+
+    def __init__(self):
+        self.registry = OrderedDict()
+
+    def __contains__(self, name):
+        return name in self.registry
+
+    def __getitem__(self, name):
+        return self.registry[name]
+
+    def register(self, section, replace=None):
+        if section.name in self.registry and not replace:
+            raise AppConfigurationError(
+                'Configuration section \'{}\' is already registered.'.format(section.name))
+        self.registry[section.name] = section
+
+    def unregister(self, name):
+        self.registry.pop(name, None)
+
+    def ordered(self, names=None):
+        """Returns the sections in `names` (default: all) with each section after
+        the sections it depends on, otherwise in the order registered.
+
+        Dependencies that are not in `names` are ignored."""
+        names = list(self.registry) if names is None else list(names)
+        unknown = [name for name in names if name not in self.registry]
+        if unknown:
+            raise AppConfigurationError(
+                'Unknown configuration section(s) {}. Expected any of {}.'.format(unknown, list(self.registry)))
+        for name in names:
+            missing = [dependency for dependency in self.registry[name].depends_on if dependency not in self.registry]
+            if missing:
+                raise AppConfigurationError(
+                    'Configuration section \'{}\' depends on unknown section(s) {}.'.format(name, missing))
+        selected = [name for name in self.registry if name in names]
+        ordered = []
+        while selected:
+            for name in selected:
+                if not set(self.registry[name].depends_on).intersection(selected):
+                    break
+            else:
+                raise AppConfigurationError(
+                    'Configuration sections {} have circular dependencies.'.format(selected))
+            ordered.append(name)
+            selected.remove(name)
+        return [self.registry[name] for name in ordered]
+
+
+def content_type_map_configuration(app_configuration):
+    return sorted(model._meta.db_table for model in apps.get_models())
+
+
+def lab_configuration(app_configuration):
+    return [app_configuration.lab_setup, app_configuration.aliquot_type_model, app_configuration.panel_model,
+            app_configuration.profile_model, app_configuration.profile_item_model]
+
+
+default_sections = [
+    Section('content_type_map', content_type_map_configuration, 'update_content_type_map',
+            models=['edc_content_type_map.contenttypemap']),
+    Section('global', 'configurations', 'update_global',
+            models=['edc_configuration.globalconfiguration']),
+    Section('lab_clinic_api', 'lab_clinic_api_setup', 'update_or_create_lab_clinic_api',
+            models=['lab_clinic_api.aliquottype', 'lab_clinic_api.panel']),
+    # within the section destinations and aliquot types are applied before panels and profiles
+    Section('lab', lab_configuration, 'update_or_create_lab', depends_on=['lab_clinic_api'],
+            models=['lab_packing.destination', 'edc_meta_data.requisitionpanel']),
+    Section('labeling', 'labeling_setup', 'update_or_create_labeling',
+            models=['labeling.labelprinter', 'labeling.client', 'labeling.zpltemplate']),
+    Section('export_plan', 'export_plan_setup', 'update_export_plan_setup',
+            models=['edc_export.exportplan']),
+    Section('notification_plan', 'notification_plan_setup', 'update_notification_plan_setup',
+            models=['edc_notification.notificationplan']),
+    Section('holidays', 'holidays_setup', 'update_holidays_setup',
+            models=['edc_appointment.holiday'])]
+
+site_sections = SectionRegistry()
+for default_section in default_sections:
+    site_sections.register(default_section)
@@ -53,7 +53,7 @@ INSTALLED_APPS = [
     'edc_configuration',
 ]
 
-if 'test' in sys.argv:
+if 'test' in sys.argv or 'benchmark_configuration' in sys.argv:
     INSTALLED_APPS = INSTALLED_APPS + [
         'edc_consent',
         'edc_export',
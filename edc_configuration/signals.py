@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# sent by BaseAppConfiguration.prepare() for each section once its transaction has ended
+section_prepared = Signal(providing_args=['section_report'])
+
+# sent by BaseAppConfiguration.prepare() when all sections are done
+configuration_prepared = Signal(providing_args=['report'])
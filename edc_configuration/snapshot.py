@@ -0,0 +1,116 @@
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+class ConfigurationSnapshot(Mapping):
+    """A read-only mapping of attribute to converted value loaded from GlobalConfiguration.
+
+    Values are available by key or as attributes and are grouped by category. The snapshot
+    holds only plain dicts and tuples so it is cheap to pass around and to pickle.
+
+    Usage::
+        snapshot = GlobalConfiguration.objects.snapshot()
+        snapshot['appointments_per_day_max']
+        snapshot.appointments_per_day_max
+        snapshot.category('appointment').get('default_appt_type')
+    """
+
+    __slots__ = ('_values', '_categories')
+
+    def __init__(self, values=None, categories=None):
+        object.__setattr__(self, '_values', dict(values or {}))
+        object.__setattr__(self, '_categories', dict(
+            (category, tuple(attributes)) for category, attributes in (categories or {}).items()))
+
+    @classmethod
+    def from_rows(cls, rows, converter):
+        """Returns a snapshot from rows of (category, attribute, value, ...).
+
+        `converter` is called with the remaining items of each row, e.g.
+        converter(value, convert, value_type)."""
+        values = {}
+        categories = {}
+        for row in rows:
+            category, attribute = row[0], row[1]
+            values[attribute] = converter(*row[2:])
+            categories.setdefault(category, []).append(attribute)
+        return cls(values, categories)
+
+    def updated(self, rows, converter):
+        """Returns a new snapshot with rows of (category, attribute, deleted, value, ...) applied in order.
+
+        A deleted attribute is removed, otherwise `converter` is called with the remaining
+        items of the row as for :func:`from_rows`."""
+        values = dict(self._values)
+        categories = dict((category, list(attributes)) for category, attributes in self._categories.items())
+        attribute_categories = dict(
+            (attribute, category) for category, attributes in self._categories.items() for attribute in attributes)
+        for row in rows:
+            category, attribute, deleted = row[0], row[1], row[2]
+            if attribute in attribute_categories:
+                categories[attribute_categories.pop(attribute)].remove(attribute)
+                del values[attribute]
+            if not deleted:
+                values[attribute] = converter(*row[3:])
+                categories.setdefault(category, []).append(attribute)
+                attribute_categories[attribute] = category
+        return self.__class__(values, dict(
+            (category, attributes) for category, attributes in categories.items() if attributes))
+
+    def merged(self, snapshot):
+        """Returns a new snapshot of these values updated with those of `snapshot`, e.g. the
+        global values updated with those of a namespace."""
+        return self.updated(
+            [(category, attribute, False, snapshot[attribute])
+             for category, attributes in snapshot._categories.items() for attribute in attributes],
+            lambda value: value)
+
+    def __getitem__(self, attribute_name):
+        return self._values[attribute_name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getattr__(self, attribute_name):
+        try:
+            return self._values[attribute_name]
+        except KeyError:
+            raise AttributeError(
+                'Configuration snapshot has no attribute \'{}\''.format(attribute_name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Configuration snapshot is read-only.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Configuration snapshot is read-only.')
+
+    def __getstate__(self):
+        return (self._values, self._categories)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '_values', state[0])
+        object.__setattr__(self, '_categories', state[1])
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self._values)
+
+    @property
+    def categories(self):
+        """Returns the category names."""
+        return tuple(self._categories)
+
+    def in_category(self, attribute_name, category_name):
+        """Returns True if the attribute is in the category."""
+        return attribute_name in self._categories.get(category_name, ())
+
+    def category(self, category_name):
+        """Returns a snapshot of the attributes in the given category."""
+        attributes = self._categories.get(category_name, ())
+        return self.__class__(
+            dict((attribute, self._values[attribute]) for attribute in attributes),
+            {category_name: attributes})
@@ -0,0 +1,34 @@
+from django.test.testcases import TestCase
+
+from edc_configuration.benchmarks.baseline import compare
+from edc_configuration.benchmarks.imports import parse_importtime
+from edc_configuration.benchmarks.reads import benchmark_reads
+from edc_configuration.cache import configuration_cache
+
+
+class TestBenchmarks(TestCase):
+
+    def setUp(self):
+        configuration_cache.invalidate()
+
+    def test_reads(self):
+        results = benchmark_reads(number=5)
+        self.assertEqual(results['get_attr_value.cold']['queries'], 1)
+        self.assertEqual(results['get_attr_value.warm']['queries'], 0)
+
+    def test_compare(self):
+        baseline = {'reads.snapshot': {'seconds': 1.0, 'queries': 1}}
+        self.assertEqual(compare({'reads.snapshot': {'seconds': 1.1, 'queries': 1}}, baseline), [])
+        self.assertEqual(len(compare({'reads.snapshot': {'seconds': 2.0, 'queries': 1}}, baseline)), 1)
+        self.assertEqual(len(compare({'reads.snapshot': {'seconds': 0.5, 'queries': 2}}, baseline)), 1)
+        self.assertEqual(compare({'reads.new': {'seconds': 2.0, 'queries': 2}}, baseline), [])
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     edc_configuration.bulk\n'
+            'import time:       300 |        420 |   edc_configuration.base_app_configuration\n'
+            'Traceback is not an import\n')
+        self.assertEqual(parse_importtime(output), [
+            ('edc_configuration.bulk', 2, 120, 120),
+            ('edc_configuration.base_app_configuration', 1, 300, 420)])
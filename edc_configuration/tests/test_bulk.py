@@ -0,0 +1,98 @@
+from django.core.exceptions import MultipleObjectsReturned
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from edc_configuration.bulk import BulkUpdateOrCreate, CREATE, DELETE, UPDATE, fetch_by_key
+from edc_configuration.models import GlobalConfiguration
+
+
+class TestBulk(TestCase):
+
+    def items(self, **values):
+        items = [dict(category='test', attribute='attr{}'.format(index), value=str(index), convert=True)
+                 for index in range(0, 10)]
+        for item in items:
+            item.update(values)
+        return items
+
+    def test_creates(self):
+        with CaptureQueriesContext(connection) as context:
+            result = BulkUpdateOrCreate(
+                GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        self.assertEqual(result, (10, 0, 0))
+        self.assertEqual(GlobalConfiguration.objects.filter(category='test').count(), 10)
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_updates_grouped(self):
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        with CaptureQueriesContext(connection) as context:
+            result = BulkUpdateOrCreate(
+                GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(
+                    self.items(value='1'))
+        self.assertEqual(result, (0, 9, 1))
+        self.assertEqual(GlobalConfiguration.objects.filter(value='1').count(), 10)
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_changes(self):
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        result = BulkUpdateOrCreate(
+            GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(
+                self.items(value='1')[:2] + [dict(category='test', attribute='erik', value='x', convert=True)])
+        self.assertIs(result.model, GlobalConfiguration)
+        self.assertEqual(result.changes, [
+            (UPDATE, ('attr0', ), {'value': ('0', '1')}),
+            (CREATE, ('erik', ), {'category': (None, 'test'), 'attribute': (None, 'erik'),
+                                  'value': (None, 'x'), 'convert': (None, True)})])
+
+    def test_unchanged_not_written(self):
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        with CaptureQueriesContext(connection) as context:
+            result = BulkUpdateOrCreate(
+                GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        self.assertEqual(result, (0, 0, 10))
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_create_only_fields(self):
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(
+            self.items(category='changed'))
+        self.assertEqual(GlobalConfiguration.objects.filter(category='test').count(), 10)
+
+    def test_duplicates(self):
+        GlobalConfiguration.objects.create(category='test', attribute='attr_a', value='x')
+        GlobalConfiguration.objects.create(category='test', attribute='attr_b', value='x')
+        items = [dict(category='test', attribute='attr_c', value='x', convert=True)]
+        bulk = BulkUpdateOrCreate(GlobalConfiguration, ('value', ), ('category', ))
+        self.assertRaises(MultipleObjectsReturned, bulk.update_or_create, items)
+        bulk = BulkUpdateOrCreate(GlobalConfiguration, ('value', ), ('category', ), delete_duplicates=True)
+        kept = GlobalConfiguration.objects.filter(value='x').order_by('pk')[0]
+        items = [dict(category='test_updated', attribute='attr_c', value='x', convert=True)]
+        self.assertEqual(len(bulk.diff(items).deletes), 1)
+        self.assertEqual(GlobalConfiguration.objects.filter(value='x').count(), 2)
+        result = bulk.update_or_create(items)
+        self.assertEqual((result, result.deleted), ((0, 1, 0), 1))
+        self.assertEqual(
+            [(obj.pk, obj.category) for obj in GlobalConfiguration.objects.filter(value='x')],
+            [(kept.pk, 'test_updated')])
+
+    def test_fetch_by_key(self):
+        GlobalConfiguration.objects.create(category='test', attribute='attr_a', value='x')
+        GlobalConfiguration.objects.create(category='other', attribute='attr_b', value='x')
+        instances = fetch_by_key(GlobalConfiguration, ('category', 'attribute'), [('test', 'attr_a')])
+        self.assertEqual(list(instances), [('test', 'attr_a')])
+        self.assertRaises(
+            GlobalConfiguration.DoesNotExist, fetch_by_key,
+            GlobalConfiguration, ('category', 'attribute'), [('test', 'attr_b')])
+
+    def test_prune(self):
+        BulkUpdateOrCreate(GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items())
+        result = BulkUpdateOrCreate(
+            GlobalConfiguration, ('attribute', ), ('value', 'convert')).update_or_create(self.items()[:5])
+        self.assertEqual((result, result.deleted), ((0, 0, 5), 0))
+        self.assertEqual(GlobalConfiguration.objects.count(), 10)
+        result = BulkUpdateOrCreate(
+            GlobalConfiguration, ('attribute', ), ('value', 'convert'), prune=True).update_or_create(self.items()[:5])
+        self.assertEqual((result, result.deleted), ((0, 0, 5), 5))
+        self.assertEqual(result.changes[0][0], DELETE)
+        self.assertEqual(GlobalConfiguration.objects.count(), 5)
@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.testcases import TestCase
+
+from edc_configuration.base_app_configuration import BaseAppConfiguration
+from edc_configuration.bundle import BUNDLE_VERSION, export_bundle, import_bundle, open_bundle
+from edc_configuration.exceptions import AppConfigurationError
+from edc_configuration.models import GlobalConfiguration
+from edc_configuration.sections import Section, SectionRegistry
+
+from .test_app_configuration import TestAppConfiguration
+
+registry = SectionRegistry()
+registry.register(Section('global', 'configurations', 'update_global'))
+
+
+class GlobalAppConfiguration(BaseAppConfiguration):
+    section_registry = registry
+    global_configuration = {'appointment': {'appointments_per_day_max': 40}}
+
+
+class TestBundle(TestCase):
+
+    def export(self, app_configuration):
+        stream = io.StringIO()
+        export_bundle(app_configuration, stream, batch_size=2)
+        return stream.getvalue()
+
+    def test_round_trip(self):
+        GlobalAppConfiguration().prepare()
+        values = dict(GlobalConfiguration.objects.values_list('attribute', 'value'))
+        bundle = self.export(GlobalAppConfiguration())
+        lines = bundle.splitlines()
+        self.assertEqual(json.loads(lines[0])['version'], BUNDLE_VERSION)
+        self.assertEqual(json.loads(lines[-1]), {'end': True, 'count': len(values)})
+        GlobalConfiguration.objects.all().delete()
+        results = import_bundle(GlobalAppConfiguration(), io.StringIO(bundle), batch_size=2)
+        self.assertEqual(results['global_configuration'], (len(values), 0, 0))
+        self.assertEqual(dict(GlobalConfiguration.objects.values_list('attribute', 'value')), values)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 40)
+        results = import_bundle(GlobalAppConfiguration(), io.StringIO(bundle))
+        self.assertEqual(results['global_configuration'], (0, 0, len(values)))
+
+    def test_lab_round_trip(self):
+        app_configuration = TestAppConfiguration(use_site_lab_profiles=False)
+        app_configuration.prepare()
+        bundle = self.export(app_configuration)
+        self.assertIn('"type":"profile_item"', bundle)
+        self.assertIn('"type":"holiday"', bundle)
+        results = import_bundle(app_configuration, io.StringIO(bundle))
+        self.assertEqual(set(result.created + result.updated for result in results.values()), set([0]))
+
+    def test_incomplete_bundle_rolled_back(self):
+        GlobalAppConfiguration().prepare()
+        bundle = self.export(GlobalAppConfiguration())
+        GlobalConfiguration.objects.all().delete()
+        with self.assertRaises(AppConfigurationError):
+            import_bundle(GlobalAppConfiguration(), io.StringIO('\n'.join(bundle.splitlines()[:-1])))
+        self.assertEqual(GlobalConfiguration.objects.count(), 0)
+
+    def test_version(self):
+        self.assertRaises(
+            AppConfigurationError, import_bundle, GlobalAppConfiguration(),
+            io.StringIO(u'{"bundle":"edc_configuration","version":0}\n{"end":true,"count":0}\n'))
+        self.assertRaises(AppConfigurationError, import_bundle, GlobalAppConfiguration(), io.StringIO(u'[]\n'))
+
+    def test_commands(self):
+        GlobalAppConfiguration().prepare()
+        path = os.path.join(tempfile.mkdtemp(), 'configuration.jsonl.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_configuration', 'edc_configuration.tests.test_bundle.GlobalAppConfiguration', path)
+        with open_bundle(path) as stream:
+            self.assertIn('appointments_per_day_max', stream.read())
+        stdout = io.StringIO()
+        call_command('import_configuration', 'edc_configuration.tests.test_bundle.GlobalAppConfiguration',
+                     path, stdout=stdout)
+        self.assertIn('global_configuration 0 created', stdout.getvalue())
+        self.assertRaises(
+            CommandError, call_command, 'import_configuration',
+            'edc_configuration.tests.test_bundle.GlobalAppConfiguration', path + '.missing')
@@ -0,0 +1,168 @@
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.testcases import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from edc_configuration import cache as cache_module
+from edc_configuration.cache import ConfigurationCache, configuration_cache, MISSING
+from edc_configuration.middleware import ConfigurationCacheMiddleware
+from edc_configuration.models import GlobalConfiguration
+
+
+class TestCache(TestCase):
+
+    def setUp(self):
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=30)
+
+    def test_warm_read_does_not_query(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_save_invalidates(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        obj = GlobalConfiguration.objects.get(attribute='appointments_per_day_max')
+        obj.value = '40'
+        obj.save()
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 40)
+
+    def test_delete_invalidates(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.get(attribute='appointments_per_day_max').delete()
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), '')
+
+    def test_set_attr_invalidates(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 50)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 50)
+
+    def test_missing_attribute(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(GlobalConfiguration.objects.get_attr_value('erik'), '')
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertNotIn('erik', configuration_cache)
+        GlobalConfiguration.objects.create(category='test', attribute='erik', value=True)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('erik'), True)
+
+    def test_timeout(self):
+        cache = ConfigurationCache(timeout=-1)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        self.assertEqual(len(context.captured_queries), 1)
+        cache = ConfigurationCache(timeout=60)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_missing(self):
+        self.assertIs(ConfigurationCache().get('erik'), MISSING)
+
+    def test_loads_all_attributes_once(self):
+        GlobalConfiguration.objects.create(category='appointment', attribute='default_appt_type', value='clinic')
+        cache = ConfigurationCache()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.get('appointments_per_day_max'), 30)
+            self.assertEqual(cache.get('default_appt_type'), 'clinic')
+        self.assertEqual(len(context.captured_queries), 1)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'edc_configuration_tests'}},
+    EDC_CONFIGURATION_CACHE_ALIAS='default')
+class TestSharedCache(TestCase):
+    """Two ConfigurationCache instances stand in for two processes sharing one cache."""
+
+    def setUp(self):
+        caches['default'].clear()
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=30)
+
+    def test_snapshot_shared(self):
+        process1, process2 = ConfigurationCache(), ConfigurationCache()
+        self.assertEqual(process1.get('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_invalidate_bumps_version(self):
+        process1, process2 = ConfigurationCache(), ConfigurationCache()
+        self.assertEqual(process1.get('appointments_per_day_max'), 30)
+        self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.filter(attribute='appointments_per_day_max').update(value='40')
+        process1.invalidate()
+        self.assertEqual(process1.get('appointments_per_day_max'), 40)
+        # process2 serves its snapshot until it checks the version
+        self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        process2.check_version()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(process2.get('appointments_per_day_max'), 40)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_save_bumps_version(self):
+        process2 = ConfigurationCache()
+        self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 40)
+        process2.check_version()
+        self.assertEqual(process2.get('appointments_per_day_max'), 40)
+
+    def test_timeout_checks_version(self):
+        process2 = ConfigurationCache(timeout=-1)
+        self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 40)
+        self.assertEqual(process2.get('appointments_per_day_max'), 40)
+
+    def test_middleware(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.filter(attribute='appointments_per_day_max').update(value='40')
+        ConfigurationCache().invalidate()
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        ConfigurationCacheMiddleware().process_request(None)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 40)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'edc_configuration_tests'}},
+    EDC_CONFIGURATION_CACHE_ALIAS='default')
+class TestSharedCacheCommit(TransactionTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=30)
+
+    def test_snapshot_loaded_before_commit_dropped(self):
+        process2 = ConfigurationCache()
+        stale = GlobalConfiguration.objects.snapshot()
+        with configuration_cache.atomic():
+            GlobalConfiguration.objects.set_attr('appointments_per_day_max', 40)
+            # process2 reads the rows committed so far under the new version
+            process2.load = lambda namespace=None: stale
+            self.assertEqual(process2.get('appointments_per_day_max'), 30)
+        del process2.load
+        process2.check_version()
+        self.assertEqual(process2.get('appointments_per_day_max'), 40)
+
+    def test_without_on_commit(self):
+        """Assert the second invalidation runs when the outermost atomic block exits
+        without transaction.on_commit (Django < 1.9)."""
+        on_commit, cache_module.on_commit = cache_module.on_commit, None
+        try:
+            self.test_snapshot_loaded_before_commit_dropped()
+            self.assertEqual(configuration_cache.pending(), set())
+            with transaction.atomic():
+                GlobalConfiguration.objects.set_attr('appointments_per_day_max', 50)
+                self.assertEqual(configuration_cache.pending(), set(['']))
+            GlobalConfiguration.objects.set_attr('appointments_per_day_max', 60)
+            self.assertEqual(configuration_cache.pending(), set())
+        finally:
+            cache_module.on_commit = on_commit
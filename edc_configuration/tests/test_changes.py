@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from edc_configuration.base_app_configuration import BaseAppConfiguration
+from edc_configuration.cache import ConfigurationCache
+from edc_configuration.changes import ChangeFeed
+from edc_configuration.models import GlobalConfiguration, GlobalConfigurationChange
+from edc_configuration.sections import Section, SectionRegistry
+from edc_configuration.snapshot import ConfigurationSnapshot
+
+
+def add_change(attribute, value, revision=None):
+    return GlobalConfigurationChange.objects.create(
+        revision=revision, category='test', attribute=attribute, value=value, value_type='str')
+
+
+class TestChanges(TestCase):
+
+    def setUp(self):
+        self.obj = GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=30)
+
+    def test_changes_since(self):
+        revision = GlobalConfiguration.objects.revision()
+        self.assertEqual(GlobalConfiguration.objects.changes_since(revision), [])
+        self.obj.value = '40'
+        self.obj.save()
+        self.obj.delete()
+        changes = GlobalConfiguration.objects.changes_since(revision)
+        self.assertEqual(
+            [change[1:] for change in changes],
+            [('appointment', 'appointments_per_day_max', False, '40', True, 'int'),
+             ('appointment', 'appointments_per_day_max', True, '40', True, 'int')])
+        self.assertLess(revision, changes[0][0])
+        self.assertLess(changes[0][0], changes[1][0])
+        self.assertEqual(GlobalConfiguration.objects.revision(), changes[1][0])
+
+    def test_refresh_applies_changes(self):
+        cache = ConfigurationCache(timeout=60)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        with CaptureQueriesContext(connection) as context:
+            cache.refresh()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.obj.value = '40'
+        self.obj.save()
+        GlobalConfiguration.objects.create(category='test', attribute='erik', value=True)
+        with CaptureQueriesContext(connection) as context:
+            cache.refresh()
+            self.assertEqual(cache.get('appointments_per_day_max'), 40)
+            self.assertEqual(cache.get('erik'), True)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(cache.snapshot().category('test'), {'erik': True})
+        self.obj.delete()
+        cache.refresh()
+        self.assertNotIn('appointments_per_day_max', cache)
+        self.assertNotIn('appointment', cache.snapshot().categories)
+
+    def test_first_refresh_reads_changes_since_load(self):
+        for value in range(150):
+            add_change('erik', str(value))
+        cache = ConfigurationCache(timeout=60)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        # not logged, so only seen if the snapshot is reloaded
+        GlobalConfiguration.objects.filter(pk=self.obj.pk).update(value='40')
+        with CaptureQueriesContext(connection) as context:
+            cache.refresh()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+
+    @override_settings(EDC_CONFIGURATION_CHANGE_RETENTION=-1)
+    def test_refresh_after_retention_reloads(self):
+        cache = ConfigurationCache(timeout=60)
+        self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        GlobalConfiguration.objects.filter(pk=self.obj.pk).update(value='40')
+        cache.refresh()
+        self.assertEqual(cache.get('appointments_per_day_max'), 40)
+
+    def test_expire(self):
+        old = add_change('a', '1')
+        GlobalConfigurationChange.objects.filter(pk=old.pk).update(created=timezone.now() - timedelta(days=8))
+        recent = add_change('b', '2')
+        GlobalConfigurationChange.objects.expire()
+        self.assertEqual(
+            list(GlobalConfigurationChange.objects.filter(pk__in=[old.pk, recent.pk]).values_list('pk', flat=True)),
+            [recent.pk])
+        GlobalConfigurationChange.objects.expire(retention=-1)
+        self.assertFalse(GlobalConfigurationChange.objects.exists())
+
+    def test_update_global_logs_changes(self):
+        registry = SectionRegistry()
+        registry.register(Section('global', 'configurations', 'update_global'))
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+            global_configuration = {'appointment': {'appointments_per_day_max': 40}}
+
+        revision = GlobalConfiguration.objects.revision()
+        AppConfiguration().prepare()
+        changes = dict((change[2], change) for change in GlobalConfiguration.objects.changes_since(revision))
+        self.assertEqual(changes['appointments_per_day_max'][4], '40')
+        self.assertEqual(len(changes), GlobalConfiguration.objects.count())
+        revision = GlobalConfiguration.objects.revision()
+        AppConfiguration().prepare(force=True)
+        self.assertEqual(GlobalConfiguration.objects.changes_since(revision), [])
+        GlobalConfigurationChange.objects.update(created=timezone.now() - timedelta(days=8))
+        AppConfiguration().prepare()
+        self.assertFalse(GlobalConfigurationChange.objects.exists())
+
+    def test_snapshot_updated(self):
+        snapshot = ConfigurationSnapshot({'a': 1, 'b': 2}, {'one': ['a', 'b']})
+        updated = snapshot.updated(
+            [('one', 'a', True, None), ('two', 'b', False, 3), ('two', 'c', False, 4)], lambda value: value)
+        self.assertEqual(dict(updated), {'b': 3, 'c': 4})
+        self.assertEqual(updated.categories, ('two', ))
+        self.assertEqual(dict(snapshot), {'a': 1, 'b': 2})
+
+
+class TestChangeFeed(TestCase):
+
+    def test_poll(self):
+        feed = ChangeFeed()
+        self.assertEqual(feed.poll(), [])
+        add_change('a', '1')
+        add_change('b', '2')
+        self.assertEqual([change[2] for change in feed.poll()], ['a', 'b'])
+        self.assertEqual(feed.poll(), [])
+
+    def test_start_reads_recent_changes(self):
+        add_change('a', '1')
+        self.assertEqual([change[2] for change in ChangeFeed().poll()], ['a'])
+
+    def test_gap(self):
+        """Assert a change committed after a later revision is still returned."""
+        first = add_change('a', '1')
+        feed = ChangeFeed()
+        feed.poll()
+        add_change('b', '2', revision=first.revision + 2)
+        self.assertEqual([change[2] for change in feed.poll()], ['b'])
+        self.assertEqual(feed.revision, first.revision)
+        add_change('c', '3', revision=first.revision + 1)
+        self.assertEqual([change[2] for change in feed.poll()], ['c'])
+        self.assertEqual(feed.revision, first.revision + 2)
+
+    def test_late_change_to_same_attribute(self):
+        first = add_change('a', '1')
+        feed = ChangeFeed()
+        feed.poll()
+        add_change('a', '3', revision=first.revision + 2)
+        self.assertEqual([change[4] for change in feed.poll()], ['3'])
+        add_change('a', '2', revision=first.revision + 1)
+        self.assertEqual(feed.poll(), [])
+
+    def test_gap_timeout(self):
+        first = add_change('a', '1')
+        feed = ChangeFeed(gap_timeout=-1)
+        feed.poll()
+        add_change('b', '2', revision=first.revision + 2)
+        feed.poll()
+        self.assertEqual(feed.revision, first.revision + 2)
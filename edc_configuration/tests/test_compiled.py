@@ -0,0 +1,105 @@
+import pickle
+
+from copy import deepcopy
+from datetime import datetime
+from decimal import Decimal
+
+from django.test.testcases import TestCase
+
+from edc_configuration.compiled import compile_configuration, get_compiled_configuration
+from edc_configuration.convert import Convert
+from edc_configuration.defaults import default_global_configuration
+from edc_configuration.exceptions import AppConfigurationError
+from edc_configuration.fingerprint import fingerprint
+
+
+class TestCompiled(TestCase):
+
+    global_configuration = {
+        'appointment': {
+            'allowed_iso_weekdays': ('2345', False),
+            'default_appt_type': 'clinic'},
+        'protocol': {
+            'start_datetime': datetime(2013, 10, 18, 10, 30, 0),
+            'weight_max': Decimal('150.5')}}
+
+    def test_merge(self):
+        compiled = compile_configuration(self.global_configuration, default_global_configuration)
+        self.assertEqual(compiled['appointment']['default_appt_type'], 'clinic')
+        self.assertEqual(compiled['appointment']['appointments_per_day_max'], 30)
+        self.assertEqual(compiled['protocol']['weight_max'], Decimal('150.5'))
+        self.assertEqual(default_global_configuration['appointment']['default_appt_type'], 'default')
+
+    def test_rows(self):
+        compiled = compile_configuration(self.global_configuration, default_global_configuration)
+        rows = dict((row['attribute'], row) for row in compiled.rows)
+        self.assertEqual(
+            dict(rows['allowed_iso_weekdays']),
+            {'category': 'appointment', 'attribute': 'allowed_iso_weekdays', 'value': '2345',
+             'convert': False, 'value_type': 'str'})
+        self.assertEqual(rows['start_datetime']['value'], Convert(datetime(2013, 10, 18, 10, 30, 0)).to_string())
+        self.assertEqual(rows['start_datetime']['value_type'], 'datetime')
+        self.assertEqual(rows['appointments_per_day_max']['value_type'], 'int')
+
+    def test_frozen(self):
+        compiled = compile_configuration(self.global_configuration, default_global_configuration)
+        with self.assertRaises(TypeError):
+            compiled['appointment']['default_appt_type'] = 'home'
+        with self.assertRaises(TypeError):
+            compiled['erik'] = {}
+        self.assertEqual(pickle.loads(pickle.dumps(compiled)), compiled)
+        self.assertEqual(pickle.loads(pickle.dumps(compiled)).rows, compiled.rows)
+
+    def test_fingerprint_unchanged(self):
+        """Assert the fingerprint is that of the merged dictionary so sections are not re-applied."""
+        configuration = deepcopy(default_global_configuration)
+        for category, attributes in self.global_configuration.items():
+            configuration.setdefault(category, {}).update(attributes)
+        self.assertEqual(
+            fingerprint(compile_configuration(self.global_configuration, default_global_configuration)),
+            fingerprint(configuration))
+
+    def test_compiled_once(self):
+        compiled = get_compiled_configuration(self.global_configuration, default_global_configuration)
+        self.assertIs(get_compiled_configuration(self.global_configuration, default_global_configuration), compiled)
+        self.assertIsNot(
+            get_compiled_configuration(dict(self.global_configuration), default_global_configuration), compiled)
+
+    def test_invalid_attribute(self):
+        for attribute in ['Default_Appt_Type', 'default appt type', 'a' * 51]:
+            self.assertRaises(
+                AppConfigurationError, compile_configuration,
+                {'appointment': {attribute: 'clinic'}}, default_global_configuration)
+
+    def test_value_too_long(self):
+        with self.assertRaises(AppConfigurationError) as context:
+            compile_configuration({'appointment': {'default_appt_type': 'x' * 51}}, default_global_configuration)
+        self.assertIn('default_appt_type', str(context.exception))
+
+    def test_conversion(self):
+        for value in [[1, 2, 3], {'a': 1}]:
+            self.assertRaises(
+                AppConfigurationError, compile_configuration,
+                {'appointment': {'weight_max': value}}, default_global_configuration)
+        compile_configuration({'appointment': {'weight_max': ([1, 2, 3], False)}}, default_global_configuration)
+
+    def test_value_type_of_declared_value(self):
+        """Assert the value type is that of the declared value, not guessed from its string."""
+        compiled = compile_configuration(
+            {'appointment': {'weight_max': Decimal('150'), 'allowed_iso_weekdays': '2345'}},
+            default_global_configuration)
+        rows = dict((row['attribute'], row) for row in compiled.rows)
+        self.assertEqual((rows['weight_max']['value'], rows['weight_max']['value_type']), ('150', 'decimal'))
+        self.assertEqual(rows['allowed_iso_weekdays']['value_type'], 'str')
+
+    def test_duplicate_attribute(self):
+        self.assertRaises(
+            AppConfigurationError, compile_configuration,
+            {'protocol': {'default_appt_type': 'clinic'}}, default_global_configuration)
+
+    def test_all_errors(self):
+        with self.assertRaises(AppConfigurationError) as context:
+            compile_configuration(
+                {'appointment': {'Bad': 1, 'default_appt_type': 'x' * 51}}, default_global_configuration)
+        self.assertIn('Bad', str(context.exception))
+        self.assertIn('default_appt_type', str(context.exception))
@@ -0,0 +1,65 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from edc_configuration.cache import configuration_cache
+from edc_configuration.config import config
+from edc_configuration.convert import localize
+from edc_configuration.defaults import default_global_configuration
+from edc_configuration.models import GlobalConfiguration
+
+
+class TestConfig(TestCase):
+
+    def setUp(self):
+        configuration_cache.invalidate()
+
+    def test_reads_value(self):
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=20)
+        self.assertEqual(config.appointment.appointments_per_day_max, 20)
+
+    def test_warm_read_does_not_query(self):
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=20)
+        self.assertEqual(config.appointment.appointments_per_day_max, 20)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(config.appointment.appointments_per_day_max, 20)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_falls_back_to_default(self):
+        self.assertEqual(config.appointment.appointments_per_day_max, 30)
+        self.assertEqual(config.appointment.allowed_iso_weekdays, '1234567')
+
+    def test_default_read_back_type(self):
+        """Assert a default is read with the type it has once saved by prepare()."""
+        default_global_configuration['protocol'] = {
+            'start_datetime': datetime(2013, 10, 18, 10, 30), 'weight_max': 150.5}
+        try:
+            self.assertEqual(config.protocol.start_datetime, localize(datetime(2013, 10, 18, 10, 30)))
+            self.assertEqual(config.protocol.weight_max, Decimal('150.5'))
+            GlobalConfiguration.objects.set_attr('start_datetime', datetime(2013, 10, 18, 10, 30))
+            GlobalConfiguration.objects.set_attr('weight_max', 150.5)
+            self.assertEqual(config.protocol.start_datetime, localize(datetime(2013, 10, 18, 10, 30)))
+            self.assertEqual(config.protocol.weight_max, Decimal('150.5'))
+        finally:
+            del default_global_configuration['protocol']
+
+    def test_unknown_attribute(self):
+        self.assertRaises(AttributeError, getattr, config.appointment, 'erik')
+        self.assertRaises(AttributeError, getattr, config.erik, 'erik')
+
+    def test_other_category(self):
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=20)
+        self.assertRaises(AttributeError, getattr, config.dashboard, 'appointments_per_day_max')
+        self.assertRaises(AttributeError, getattr, config.dashboard, 'allowed_iso_weekdays')
+        self.assertEqual(config.appointment.appointments_per_day_max, 20)
+
+    def test_reads_changed_value(self):
+        self.assertEqual(config.appointment.appointments_per_day_max, 30)
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 10)
+        self.assertEqual(config.appointment.appointments_per_day_max, 10)
@@ -1,16 +1,32 @@
+import json
+import os
+import shutil
+import tempfile
+
 from datetime import datetime
 
 from django.test.testcases import TestCase
 
-from edc_configuration.convert import localize
-from edc_configuration.models import GlobalConfiguration
+from edc_configuration.base_app_configuration import (
+    APPLIED, FAILED, ROLLED_BACK, SKIPPED, BaseAppConfiguration)
+from edc_configuration.cache import configuration_cache
+from edc_configuration.convert import localize, STRING
+from edc_configuration.models import ConfigurationFingerprint, GlobalConfiguration
+from edc_configuration.signals import section_prepared
 from edc_configuration.defaults import default_global_configuration
+from edc_configuration.exceptions import AppConfigurationError, PrepareError
+
+from edc_meta_data.models import RequisitionPanel
+from edc_testing.models import TestPanel
 
 from .test_app_configuration import TestAppConfiguration
 
 
 class TestConfiguration(TestCase):
 
+    def setUp(self):
+        configuration_cache.invalidate()
+
     def test_reads_global_config(self):
         """Assert a value specified in the local app overwrites the default."""
         self.assertEqual(default_global_configuration.get('appointment').get('allowed_iso_weekdays'), '1234567')
@@ -34,3 +50,148 @@ class TestConfiguration(TestCase):
         self.assertEqual(
             GlobalConfiguration.objects.get_attr_value('end_datetime'),
             localize(datetime(2016, 10, 17, 16, 30, 0)))
+
+    def test_prepare_twice(self):
+        """Assert prepare can be run again without duplicating rows."""
+        TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        count = GlobalConfiguration.objects.all().count()
+        TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(GlobalConfiguration.objects.all().count(), count)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('default_appt_type'), 'clinic')
+
+    def test_prepare_skips_unchanged(self):
+        """Assert sections are skipped if unchanged since last applied."""
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(set(r.status for r in report.values()), set([APPLIED]))
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(set(r.status for r in report.values()), set([SKIPPED]))
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(force=True)
+        self.assertEqual(set(r.status for r in report.values()), set([APPLIED]))
+
+    def test_prepare_applies_changed_section(self):
+        """Assert only a changed section is applied."""
+        TestAppConfiguration(use_site_lab_profiles=False).prepare()
+
+        class ChangedAppConfiguration(TestAppConfiguration):
+            global_configuration = {'appointment': {'default_appt_type': 'home'}}
+
+        report = ChangedAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(report.pop('global').status, APPLIED)
+        self.assertEqual(set(r.status for r in report.values()), set([SKIPPED]))
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('default_appt_type'), 'home')
+
+    def test_prepare_report(self):
+        """Assert the report counts rows and is sent with the signals."""
+        section_reports = []
+
+        def receiver(sender, section_report, **kwargs):
+            section_reports.append(section_report)
+        section_prepared.connect(receiver)
+        try:
+            report = TestAppConfiguration(use_site_lab_profiles=False).prepare(profile=True)
+        finally:
+            section_prepared.disconnect(receiver)
+        self.assertEqual(list(report.values()), section_reports)
+        self.assertEqual(report['global'].created, GlobalConfiguration.objects.all().count())
+        self.assertEqual(report['lab'].created, 3 + 3 + 3 + 3 + 6)
+        self.assertGreater(report['lab'].queries, 0)
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(force=True)
+        self.assertEqual(report['global'].created, 0)
+        self.assertEqual(report['global'].unchanged, GlobalConfiguration.objects.all().count())
+
+    def test_prepare_lab_links(self):
+        """Assert panels are linked to one aliquot type and unchanged links are not rewritten."""
+        TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        for panel in TestPanel.objects.all():
+            self.assertEqual([aliquot_type.alpha_code for aliquot_type in panel.aliquot_type.all()], ['WB'])
+        self.assertEqual(RequisitionPanel.objects.filter(aliquot_type_alpha_code='WB').count(), 3)
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(force=True, profile=True)
+        self.assertEqual(report['lab'].created + report['lab'].updated, 0)
+        self.assertLess(report['lab'].queries, 20)
+
+    def test_configuration_file(self):
+        """Assert sections in the configuration file replace the class attributes."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'configuration.json')
+            with open(path, 'w') as f:
+                json.dump({'global_configuration': {'appointment': {'default_appt_type': 'home'}}}, f)
+
+            class FileAppConfiguration(TestAppConfiguration):
+                configuration_file = path
+
+            FileAppConfiguration(use_site_lab_profiles=False).prepare()
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('default_appt_type'), 'home')
+        # the default is declared as a string, so it is stored and read back as a string
+        self.assertEqual(GlobalConfiguration.objects.get(attribute='allowed_iso_weekdays').value_type, STRING)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays'), '1234567')
+        self.assertEqual(TestPanel.objects.all().count(), 3)
+
+    def test_section_names(self):
+        """Assert only the sections in section_names are prepared and lab models are not required."""
+
+        class GlobalAppConfiguration(BaseAppConfiguration):
+            section_names = ('global', )
+
+        report = GlobalAppConfiguration().prepare()
+        self.assertEqual(list(report), ['global'])
+        self.assertEqual(
+            GlobalConfiguration.objects.values_list('value', 'value_type').get(attribute='allowed_iso_weekdays'),
+            ('1234567', STRING))
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays'), '1234567')
+
+    def test_prepare_dry_run(self):
+        """Assert a dry run reports the changes but does not save them."""
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(dry_run=True)
+        self.assertTrue(report.dry_run)
+        self.assertEqual(GlobalConfiguration.objects.all().count(), 0)
+        self.assertEqual(len([change for change in report['global'].changes if change[1] == 'create']),
+                         report['global'].created)
+        self.assertIn('global', report.diff_lines())
+        self.assertEqual(report['global'].status, APPLIED)
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(report['global'].status, APPLIED)
+
+    def test_prepare_sections(self):
+        """Assert only the named sections are prepared."""
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(sections=['global', 'labeling'])
+        self.assertEqual(list(report), ['global', 'labeling'])
+        self.assertGreater(GlobalConfiguration.objects.all().count(), 0)
+        self.assertRaises(
+            AppConfigurationError, TestAppConfiguration(use_site_lab_profiles=False).prepare, sections=['erik'])
+
+    def test_prepare_workers(self):
+        """Assert sections run in order on SQLite or inside a transaction."""
+        report = TestAppConfiguration(use_site_lab_profiles=False).prepare(workers=4)
+        self.assertEqual(set(section_report.status for section_report in report.values()), set([APPLIED]))
+
+    def test_prepare_failed_section_rolls_back(self):
+        """Assert a failing section is reported and everything is rolled back."""
+
+        class FailingAppConfiguration(TestAppConfiguration):
+            def update_holidays_setup(self):
+                super(FailingAppConfiguration, self).update_holidays_setup()
+                raise ValueError('erik')
+
+        with self.assertRaises(PrepareError) as context:
+            FailingAppConfiguration(use_site_lab_profiles=False).prepare()
+        self.assertEqual(context.exception.section, 'holidays')
+        self.assertEqual(context.exception.report['holidays'].status, FAILED)
+        self.assertEqual(context.exception.report['global'].status, ROLLED_BACK)
+        self.assertEqual(GlobalConfiguration.objects.all().count(), 0)
+
+    def test_prepare_keep_going(self):
+        """Assert with keep_going only the failing section is rolled back."""
+
+        class FailingAppConfiguration(TestAppConfiguration):
+            def update_holidays_setup(self):
+                super(FailingAppConfiguration, self).update_holidays_setup()
+                raise ValueError('erik')
+
+        report = FailingAppConfiguration(use_site_lab_profiles=False).prepare(keep_going=True)
+        self.assertEqual(report['holidays'].status, FAILED)
+        self.assertIsInstance(report['holidays'].error, ValueError)
+        self.assertFalse(ConfigurationFingerprint.objects.filter(section='holidays').exists())
+        self.assertGreater(GlobalConfiguration.objects.all().count(), 0)
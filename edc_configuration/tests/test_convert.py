@@ -1,9 +1,12 @@
 from datetime import date, datetime
+from importlib import import_module
 
 from django.test.testcases import TestCase
 from django.utils import timezone
 
-from edc_configuration.convert import Convert, localize
+from edc_configuration.cache import configuration_cache, LRUCache, MISSING
+from edc_configuration.convert import (
+    Convert, convert_cache, localize, classify, BOOLEAN, DATETIME, DECIMAL, INTEGER, STRING, TIME, UNKNOWN)
 from decimal import Decimal
 from edc_configuration.models import GlobalConfiguration
 from django.test.utils import override_settings
@@ -11,6 +14,9 @@ from django.test.utils import override_settings
 
 class TestConvert(TestCase):
 
+    def setUp(self):
+        configuration_cache.invalidate()
+
     def test_string_to_string(self):
         value = '11:00'
         string_value = Convert(value).to_string()
@@ -129,3 +135,123 @@ class TestConvert(TestCase):
         GlobalConfiguration.objects.create(
             category='test', attribute='attr', value=string_value, convert=convert.convert)
         self.assertEqual(GlobalConfiguration.objects.get_attr_value('attr'), string_value)
+
+    def test_classify(self):
+        self.assertEqual(classify('11:00'), TIME)
+        self.assertEqual(classify('True'), BOOLEAN)
+        self.assertEqual(classify('none'), BOOLEAN)
+        self.assertEqual(classify('12345.0'), DECIMAL)
+        self.assertEqual(classify('12345'), INTEGER)
+        self.assertEqual(classify('2016-01-05'), DATETIME)
+        self.assertEqual(classify('2016-01-05T09:35:00'), DATETIME)
+        self.assertEqual(classify('default'), STRING)
+        self.assertEqual(classify('05/01/2016'), UNKNOWN)
+
+    def test_plain_string_not_parsed_as_date(self):
+        """Assert a string without digits is not passed to the date parser (e.g. 'may')."""
+        self.assertEqual(Convert('may').to_value(), 'may')
+        self.assertEqual(Convert('clinic').to_value(), 'clinic')
+
+    def test_lowercase_string_to_boolean(self):
+        self.assertIs(Convert('true').to_value(), True)
+        self.assertIs(Convert('false').to_value(), False)
+
+    def test_string_with_seconds_to_datetime(self):
+        string_value = '2016-01-05T09:35:10.5'
+        value = Convert(string_value).to_value()
+        self.assertEqual(value, localize(datetime(2016, 1, 5, 9, 35, 10, 500000)))
+
+    def test_invalid_iso_date_to_string(self):
+        string_value = '2016-13-45'
+        value = Convert(string_value).to_value()
+        self.assertEqual(value, '2016-13-45')
+
+    def test_non_iso_date_to_datetime(self):
+        string_value = '05 Jan 2016'
+        value = Convert(string_value).to_value()
+        self.assertEqual(value, localize(datetime(2016, 1, 5)))
+
+    def test_to_value_memoized(self):
+        convert_cache.clear()
+        value = Convert('2016-01-05 09:35').to_value()
+        self.assertEqual(convert_cache.info().misses, 1)
+        self.assertEqual(Convert('2016-01-05 09:35').to_value(), value)
+        self.assertEqual(convert_cache.info().hits, 1)
+        self.assertEqual(Convert('12345', convert=False).to_value(), '12345')
+        self.assertEqual(Convert('12345').to_value(), 12345)
+
+    def test_memo_cleared_on_time_zone_change(self):
+        Convert('2016-01-05 09:35').to_value()
+        self.assertGreater(convert_cache.info().currsize, 0)
+        with self.settings(TIME_ZONE='UTC'):
+            self.assertEqual(convert_cache.info().currsize, 0)
+            self.assertEqual(Convert('2016-01-05 09:35').to_value().tzinfo.zone, 'UTC')
+
+    @override_settings(EDC_CONFIGURATION_CONVERT_CACHE_SIZE=0)
+    def test_memo_disabled(self):
+        Convert('12345').to_value()
+        Convert('12345').to_value()
+        self.assertEqual(convert_cache.info().hits, 0)
+
+    def test_lru_cache(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.info(), (3, 1, 2, 2))
+
+    def test_to_string_sets_value_type(self):
+        for value, value_type in [(True, BOOLEAN), (None, BOOLEAN), (Decimal('1.5'), DECIMAL), (30, INTEGER),
+                                  (datetime(2016, 1, 5, 9, 35), DATETIME), (date(2016, 1, 5), DATETIME),
+                                  (1.5, DECIMAL), ('11:00', STRING), ('clinic', STRING), ('30', STRING)]:
+            convert = Convert(value)
+            convert.to_string()
+            self.assertEqual(convert.value_type, value_type, msg=value)
+        convert = Convert('30', convert=False)
+        convert.to_string()
+        self.assertEqual(convert.value_type, STRING)
+
+    def test_to_value_with_value_type(self):
+        self.assertEqual(Convert('30', value_type=INTEGER).to_value(), 30)
+        self.assertEqual(Convert('30', value_type=STRING).to_value(), '30')
+        self.assertEqual(Convert('30.0', value_type=DECIMAL).to_value(), Decimal('30.0'))
+        self.assertEqual(Convert('False', value_type=BOOLEAN).to_value(), False)
+        self.assertEqual(Convert('2016-01-05', value_type=DATETIME).to_value(), localize(datetime(2016, 1, 5)))
+        # falls back to detecting the type if the value does not decode
+        self.assertEqual(Convert('clinic', value_type=INTEGER).to_value(), 'clinic')
+
+    def test_global_value_type(self):
+        obj = GlobalConfiguration.objects.create(category='test', attribute='attr', value=12345)
+        self.assertEqual(obj.value_type, INTEGER)
+        obj = GlobalConfiguration.objects.get(attribute='attr')
+        obj.save()
+        self.assertEqual(GlobalConfiguration.objects.get(attribute='attr').value_type, INTEGER)
+        obj.convert = False
+        obj.save(update_fields=['convert'])
+        self.assertEqual(GlobalConfiguration.objects.get(attribute='attr').value_type, STRING)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('attr'), '12345')
+        GlobalConfiguration.objects.set_attr('attr', datetime(2016, 1, 5, 9, 35))
+        obj = GlobalConfiguration.objects.get(attribute='attr')
+        self.assertEqual(obj.value_type, DATETIME)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('attr'), localize(datetime(2016, 1, 5, 9, 35)))
+
+    def test_set_attr_string(self):
+        """Assert a string is read back as a string whatever it looks like."""
+        GlobalConfiguration.objects.set_attr('allowed_iso_weekdays', 1234567)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays'), 1234567)
+        GlobalConfiguration.objects.set_attr('allowed_iso_weekdays', '1234567')
+        self.assertEqual(GlobalConfiguration.objects.get(attribute='allowed_iso_weekdays').value_type, STRING)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays'), '1234567')
+
+    def test_backfill_value_type(self):
+        """Assert the migration adding value_type detects the type of stored strings."""
+        migration = import_module('edc_configuration.migrations.0003_globalconfiguration_value_type')
+        for value, value_type in [('11:00', TIME), ('True', BOOLEAN), ('none', BOOLEAN), ('12345.0', DECIMAL),
+                                  ('12345', INTEGER), ('2016-01-05', DATETIME), ('05 Jan 2016', DATETIME),
+                                  ('2016-13-45', STRING), ('clinic', STRING)]:
+            self.assertEqual(migration.guess_value_type(value, True), value_type, msg=value)
+        self.assertEqual(migration.guess_value_type('12345', False), STRING)
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db import models
+from django.test.testcases import TestCase
+
+from edc_configuration.diff import CREATE, DELETE, NOOP, UPDATE, Changeset, diff
+from edc_configuration.models import GlobalConfiguration
+
+
+class Volume(models.Model):
+
+    name = models.CharField(max_length=10)
+
+    volume = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        app_label = 'edc_configuration'
+        managed = False
+
+
+class TestDiff(TestCase):
+
+    def setUp(self):
+        self.existing = dict(
+            ((attribute, ), GlobalConfiguration(category='test', attribute=attribute, value=value))
+            for attribute, value in [('attr_a', '1'), ('attr_b', '2'), ('attr_c', '3')])
+        self.items = dict(
+            ((item['attribute'], ), item) for item in [
+                dict(category='test', attribute='attr_a', value='1'),
+                dict(category='test', attribute='attr_b', value='20'),
+                dict(category='test', attribute='attr_d', value='4')])
+
+    def test_diff(self):
+        changeset = diff(GlobalConfiguration, ('attribute', ), ('value', ), self.items, self.existing)
+        changes = dict((change.key, change) for change in changeset.changes)
+        self.assertEqual(changes[('attr_a', )].action, NOOP)
+        self.assertEqual(changes[('attr_b', )].action, UPDATE)
+        self.assertEqual(changes[('attr_b', )].fields, {'value': ('2', '20')})
+        self.assertEqual(changes[('attr_d', )].action, CREATE)
+        self.assertEqual(changes[('attr_d', )].instance.value, '4')
+        self.assertNotIn(('attr_c', ), changes)
+        self.assertEqual(list(changeset.counts().values()), [1, 1, 0, 1])
+
+    def test_normalized(self):
+        items = {('attr_a', ): dict(category='test', attribute='attr_a', value=1)}
+        changeset = diff(GlobalConfiguration, ('attribute', ), ('value', ), items, self.existing)
+        self.assertEqual([change.action for change in changeset.changes], [NOOP])
+
+    def test_normalized_decimal(self):
+        """Assert a declared float equals the stored Decimal with the field's decimal places."""
+        existing = {('wb', ): Volume(name='wb', volume=Decimal('1.20'))}
+        for volume, action in [(1.2, NOOP), (Decimal('1.2'), NOOP), ('1.20', NOOP), (1.25, UPDATE)]:
+            changeset = diff(Volume, ('name', ), ('volume', ), {('wb', ): dict(name='wb', volume=volume)}, existing)
+            self.assertEqual([change.action for change in changeset.changes], [action], msg=volume)
+
+    def test_prune(self):
+        changeset = diff(GlobalConfiguration, ('attribute', ), ('value', ), self.items, self.existing, prune=True)
+        self.assertEqual([(change.key, change.fields) for change in changeset.deletes],
+                         [(('attr_c', ), {'value': ('3', None)})])
+
+    def test_empty(self):
+        self.assertFalse(Changeset(GlobalConfiguration))
+        items = dict((key, self.items[key]) for key in [('attr_a', )])
+        changeset = diff(GlobalConfiguration, ('attribute', ), ('value', ), items, self.existing)
+        self.assertFalse(changeset)
+        self.assertEqual(len(changeset.noops), 1)
+        self.assertTrue(diff(GlobalConfiguration, ('attribute', ), ('value', ), items, self.existing, prune=True))
+        self.assertEqual(
+            [change.action for change in diff(
+                GlobalConfiguration, ('attribute', ), ('value', ), {}, self.existing, prune=True).changes],
+            [DELETE] * 3)
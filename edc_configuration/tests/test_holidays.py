@@ -0,0 +1,52 @@
+from datetime import date, datetime
+
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from edc_appointment.models import Holiday
+
+from edc_configuration.holidays import HolidayCalendar, iso_weekdays
+
+
+class TestHolidays(TestCase):
+
+    def setUp(self):
+        # Friday 25 and Monday 28 December 2015
+        Holiday.objects.create(holiday_name='Christmas', holiday_date=date(2015, 12, 25))
+        Holiday.objects.create(holiday_name='Boxing day holiday', holiday_date=date(2015, 12, 28))
+        self.calendar = HolidayCalendar(model=Holiday)
+
+    def test_is_holiday(self):
+        self.assertTrue(self.calendar.is_holiday(date(2015, 12, 25)))
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(self.calendar.is_holiday(datetime(2015, 12, 28, 10, 30)))
+            self.assertFalse(self.calendar.is_holiday(date(2015, 12, 24)))
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_holidays_between(self):
+        self.assertEqual(
+            self.calendar.holidays_between(date(2015, 12, 25), date(2015, 12, 31)),
+            [date(2015, 12, 25), date(2015, 12, 28)])
+        self.assertEqual(self.calendar.holidays_between(date(2015, 12, 26), date(2015, 12, 27)), [])
+
+    def test_next_business_day(self):
+        self.assertEqual(self.calendar.next_business_day(date(2015, 12, 24)), date(2015, 12, 24))
+        self.assertEqual(self.calendar.next_business_day(date(2015, 12, 25)), date(2015, 12, 26))
+        self.assertEqual(self.calendar.next_business_day(date(2015, 12, 25), '12345'), date(2015, 12, 29))
+        self.assertEqual(
+            self.calendar.next_business_day(datetime(2015, 12, 25, 10, 30), [1, 2, 3, 4, 5]),
+            datetime(2015, 12, 29, 10, 30))
+
+    def test_invalidated_on_change(self):
+        self.assertFalse(self.calendar.is_holiday(date(2016, 1, 1)))
+        obj = Holiday.objects.create(holiday_name='New year', holiday_date=date(2016, 1, 1))
+        self.assertTrue(self.calendar.is_holiday(date(2016, 1, 1)))
+        obj.delete()
+        self.assertFalse(self.calendar.is_holiday(date(2016, 1, 1)))
+
+    def test_iso_weekdays(self):
+        self.assertEqual(iso_weekdays('135'), frozenset([1, 3, 5]))
+        self.assertEqual(iso_weekdays(), frozenset(range(1, 8)))
+        self.assertRaises(ValueError, iso_weekdays, '')
+        self.assertRaises(ValueError, iso_weekdays, '8')
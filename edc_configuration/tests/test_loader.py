@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+
+from datetime import date
+from unittest import skipUnless
+
+from django.test.testcases import TestCase
+
+from edc_configuration import loader
+from edc_configuration.exceptions import AppConfigurationError
+from edc_configuration.fingerprint import fingerprint
+from edc_configuration.loader import (
+    load_configuration, cache_path_for, LabelPrinterTuple, PanelTuple, ProfileItemTuple)
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+configuration = {
+    'global_configuration': {
+        'appointment': {
+            'allowed_iso_weekdays': ['2345', False],
+            'default_appt_type': 'clinic'}},
+    'holidays_setup': {'Christmas': '2015-12-25'},
+    'lab_setup': {'test': {
+        'panel': [{'name': 'Viral Load', 'panel_type': 'TEST', 'aliquot_type_alpha_code': 'WB'}],
+        'aliquot_type': [{'name': 'Whole Blood', 'alpha_code': 'WB', 'numeric_code': '02'}],
+        'profile_item': [{'profile_name': 'Viral Load', 'alpha_code': 'PL', 'volume': 1.0, 'count': 3}]}},
+    'labeling_setup': {
+        'label_printer': [{'cups_printer_name': 'Zebra', 'cups_server_hostname': 'localhost',
+                           'cups_server_ip': '127.0.0.1', 'default': True}]}}
+
+
+class TestLoader(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, filename='configuration.json'):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    def read_cache(self, path):
+        with open(cache_path_for(path), 'rb') as f:
+            return f.read()
+
+    def test_load_json(self):
+        sections = load_configuration(self.write(configuration))
+        self.assertEqual(
+            sections['global_configuration']['appointment']['allowed_iso_weekdays'], ('2345', False))
+        self.assertEqual(sections['holidays_setup'], {'Christmas': date(2015, 12, 25)})
+        self.assertEqual(sections['lab_setup']['test']['panel'], [PanelTuple('Viral Load', 'TEST', 'WB')])
+        self.assertEqual(sections['lab_setup']['test']['profile_item'], [ProfileItemTuple('Viral Load', 'PL', 1.0, 3)])
+        self.assertEqual(sections['lab_setup']['test']['destination'], [])
+        self.assertEqual(
+            sections['labeling_setup']['label_printer'], [LabelPrinterTuple('Zebra', 'localhost', '127.0.0.1', True)])
+
+    @skipUnless(yaml, 'PyYAML is not installed')
+    def test_load_yaml(self):
+        path = self.write(
+            'holidays_setup:\n'
+            '  Christmas: 2015-12-25\n'
+            'labeling_setup:\n'
+            '  label_printer:\n'
+            '    - cups_printer_name: Zebra\n'
+            '      cups_server_hostname: localhost\n'
+            '      cups_server_ip: 127.0.0.1\n'
+            '      default: true\n', 'configuration.yaml')
+        sections = load_configuration(path)
+        self.assertEqual(sections['holidays_setup'], {'Christmas': date(2015, 12, 25)})
+        self.assertEqual(
+            sections['labeling_setup']['label_printer'], [LabelPrinterTuple('Zebra', 'localhost', '127.0.0.1', True)])
+
+    def test_fingerprint_stable(self):
+        """Assert the fingerprint of a cached result equals that of a parsed one."""
+        path = self.write(configuration)
+        parsed = load_configuration(path, use_cache=False)
+        load_configuration(path)
+        self.assertEqual(fingerprint(load_configuration(path)), fingerprint(parsed))
+
+    def test_cache(self):
+        path = self.write(configuration)
+        load_configuration(path)
+        self.assertTrue(os.path.exists(cache_path_for(path)))
+        cached = self.read_cache(path)
+        os.utime(path, (0, 0))
+        load_configuration(path)
+        self.assertNotEqual(self.read_cache(path), cached)
+        original_validate = loader.validate
+        loader.validate = None
+        try:
+            # neither the mtime nor the contents changed so the file is not parsed
+            self.assertEqual(load_configuration(path)['holidays_setup'], {'Christmas': date(2015, 12, 25)})
+        finally:
+            loader.validate = original_validate
+
+    def test_cache_changed_file(self):
+        path = self.write(configuration)
+        load_configuration(path)
+        data = dict(configuration, holidays_setup={'Christmas': '2016-12-25'})
+        path = self.write(data)
+        os.utime(path, (0, 0))
+        self.assertEqual(load_configuration(path)['holidays_setup'], {'Christmas': date(2016, 12, 25)})
+
+    def test_invalid(self):
+        self.assertRaises(AppConfigurationError, load_configuration, self.write({'erik': {}}))
+        self.assertRaises(AppConfigurationError, load_configuration, self.write(
+            {'lab_setup': {'test': {'panel': [{'name': 'Viral Load', 'panel_type': 'TEST'}]}}}))
+        self.assertRaises(AppConfigurationError, load_configuration, self.write({'lab_setup': {'test': {
+            'aliquot_type': [{'name': 'Whole Blood', 'alpha_code': 'WB', 'numeric_code': 2}]}}}))
+        self.assertRaises(AppConfigurationError, load_configuration, self.write({'holidays_setup': {'Christmas': 'x'}}))
+        self.assertRaises(AppConfigurationError, load_configuration, self.write({}, 'configuration.ini'))
+
+    def test_invalid_message(self):
+        path = self.write({'lab_setup': {'test': {'panel': [{'name': 'Viral Load', 'panel_type': 'TEST'}]}}})
+        with self.assertRaises(AppConfigurationError) as context:
+            load_configuration(path)
+        self.assertIn('lab_setup.test.panel[0]', str(context.exception))
+        self.assertIn('aliquot_type_alpha_code', str(context.exception))
@@ -0,0 +1,72 @@
+import threading
+
+from django.db import connection
+from django.test.testcases import TestCase, TransactionTestCase
+
+from edc_configuration.base_app_configuration import APPLIED, SKIPPED, BaseAppConfiguration
+from edc_configuration.exceptions import ConfigurationLockError
+from edc_configuration.fingerprint import fingerprint
+from edc_configuration.lock import configuration_lock, lock_key
+from edc_configuration.models import ConfigurationFingerprint
+from edc_configuration.sections import Section, SectionRegistry
+
+
+def run_in_thread(target):
+    """Runs `target` on a thread with its own connection and returns (thread, results)."""
+    results = []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            results.append(e)
+        finally:
+            connection.close()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+class TestLock(TestCase):
+
+    def test_lock_key(self):
+        self.assertEqual(lock_key('edc_configuration.prepare'), lock_key('edc_configuration.prepare'))
+        self.assertNotEqual(lock_key('edc_configuration.prepare'), lock_key('edc_configuration.other'))
+        self.assertTrue(-(1 << 63) <= lock_key('edc_configuration.prepare') < (1 << 63))
+
+
+class TestConcurrentLock(TransactionTestCase):
+
+    def test_lock_excludes(self):
+        with configuration_lock():
+            thread, results = run_in_thread(lambda: configuration_lock(timeout=0.2).__enter__())
+            thread.join()
+        self.assertIsInstance(results[0], ConfigurationLockError)
+
+    def test_lock_released(self):
+        with configuration_lock():
+            pass
+        with configuration_lock(timeout=0.2):
+            pass
+
+    def test_waiting_prepare_skips(self):
+        """Assert a process waiting for the lock skips the sections applied by the process holding it."""
+        applied = []
+        registry = SectionRegistry()
+        registry.register(Section(
+            'visit_schedule',
+            configuration=lambda app_configuration: {'visits': 2},
+            apply=lambda app_configuration: applied.append(app_configuration)))
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+
+        with configuration_lock():
+            thread, results = run_in_thread(lambda: AppConfiguration().prepare())
+            thread.join(0.3)
+            self.assertTrue(thread.is_alive())
+            ConfigurationFingerprint.objects.create(section='visit_schedule', fingerprint=fingerprint({'visits': 2}))
+        thread.join()
+        self.assertEqual(results[0]['visit_schedule'].status, SKIPPED)
+        self.assertEqual(applied, [])
+        self.assertEqual(AppConfiguration().prepare(force=True)['visit_schedule'].status, APPLIED)
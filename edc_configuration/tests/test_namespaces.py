@@ -0,0 +1,153 @@
+from django.core.cache import caches
+from django.db import connection, IntegrityError
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from edc_configuration.base_app_configuration import BaseAppConfiguration
+from edc_configuration.cache import ConfigurationCache, configuration_cache
+from edc_configuration.changes import ChangeFeed
+from edc_configuration.config import Configuration
+from edc_configuration.models import ConfigurationFingerprint, GlobalConfiguration
+from edc_configuration.scheduling import scheduling_policy
+from edc_configuration.sections import Section, SectionRegistry
+from edc_configuration.snapshot import ConfigurationSnapshot
+
+registry = SectionRegistry()
+registry.register(Section('global', 'configurations', 'update_global'))
+
+
+class TestNamespaces(TestCase):
+
+    def setUp(self):
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.create(category='appointment', attribute='appointments_per_day_max', value=30)
+        GlobalConfiguration.objects.create(category='appointment', attribute='allowed_iso_weekdays', value='12345')
+        GlobalConfiguration.objects.create(
+            namespace='bcpp', category='appointment', attribute='appointments_per_day_max', value=40)
+
+    def test_unique_in_namespace(self):
+        self.assertRaises(
+            IntegrityError, GlobalConfiguration.objects.create,
+            namespace='bcpp', category='appointment', attribute='appointments_per_day_max', value=50)
+
+    def test_get_attr_value(self):
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max', namespace='bcpp'), 40)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays', namespace='bcpp'), '12345')
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('erik', namespace='bcpp'), '')
+        with CaptureQueriesContext(connection) as context:
+            GlobalConfiguration.objects.get_attr_value('appointments_per_day_max', namespace='bcpp')
+            GlobalConfiguration.objects.get_attr_value('allowed_iso_weekdays', namespace='bcpp')
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_config(self):
+        bcpp_config = Configuration(namespace='bcpp')
+        self.assertEqual(bcpp_config.appointment.appointments_per_day_max, 40)
+        self.assertEqual(bcpp_config.appointment.appointments_days_forward, 8)
+        self.assertEqual(Configuration().appointment.appointments_per_day_max, 30)
+
+    def test_set_attr(self):
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 50, namespace='mpepu')
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max', namespace='mpepu'), 50)
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max'), 30)
+
+    def test_change_keeps_other_namespaces(self):
+        cache = ConfigurationCache()
+        self.assertEqual(cache.get('appointments_per_day_max', namespace='bcpp'), 40)
+        self.assertEqual(cache.get('appointments_per_day_max', namespace='mpepu'), 30)
+        cache.invalidate(namespace='mpepu')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.get('appointments_per_day_max', namespace='bcpp'), 40)
+        self.assertEqual(len(context.captured_queries), 0)
+        cache.invalidate()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.get('appointments_per_day_max', namespace='bcpp'), 40)
+            self.assertEqual(cache.get('appointments_per_day_max'), 30)
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_refresh(self):
+        cache = ConfigurationCache(timeout=60)
+        self.assertEqual(cache.get('appointments_per_day_max', namespace='bcpp'), 40)
+        cache.refresh()
+        GlobalConfiguration.objects.filter(namespace='bcpp').get().delete()
+        GlobalConfiguration.objects.create(
+            namespace='mpepu', category='appointment', attribute='appointments_per_day_max', value=50)
+        cache.refresh()
+        self.assertEqual(cache.get('appointments_per_day_max', namespace='bcpp'), 30)
+        self.assertEqual(cache.snapshot('bcpp'), {})
+
+    def test_change_feed(self):
+        feed = ChangeFeed(namespace='bcpp')
+        feed.poll()
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 45, namespace='bcpp')
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 35)
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 50, namespace='bcpp')
+        self.assertEqual([change[4] for change in feed.poll()], ['45', '50'])
+        self.assertEqual(feed.gaps, {})
+        revision = GlobalConfiguration.objects.revision()
+        GlobalConfiguration.objects.set_attr('appointments_per_day_max', 55, namespace='bcpp')
+        self.assertEqual(GlobalConfiguration.objects.changes_since(revision, namespace=''), [])
+
+    def test_resolved(self):
+        cache = ConfigurationCache()
+        resolved = cache.resolved('bcpp')
+        self.assertEqual(dict(resolved), {'appointments_per_day_max': 40, 'allowed_iso_weekdays': '12345'})
+        self.assertIs(cache.resolved('bcpp'), resolved)
+        self.assertEqual(scheduling_policy(cache, namespace='bcpp').per_day_max, 40)
+        self.assertEqual(scheduling_policy(cache).per_day_max, 30)
+
+    def test_snapshot_merged(self):
+        snapshot = ConfigurationSnapshot({'a': 1, 'b': 2}, {'one': ['a', 'b']})
+        merged = snapshot.merged(ConfigurationSnapshot({'b': 3}, {'one': ['b']}))
+        self.assertEqual(dict(merged), {'a': 1, 'b': 3})
+        self.assertEqual(merged.category('one'), {'a': 1, 'b': 3})
+
+    def test_update_global(self):
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+            global_configuration = {'appointment': {'appointments_per_day_max': 20}}
+
+        class BcppAppConfiguration(AppConfiguration):
+            namespace = 'bcpp'
+
+        AppConfiguration().prepare()
+        report = BcppAppConfiguration().prepare()
+        self.assertEqual((report['global'].created, report['global'].updated), (0, 1))
+        self.assertEqual(
+            list(GlobalConfiguration.objects.filter(namespace='bcpp').values_list('attribute', 'value')),
+            [('appointments_per_day_max', '20')])
+        self.assertEqual(GlobalConfiguration.objects.get_attr_value('appointments_per_day_max', namespace='bcpp'), 20)
+        self.assertEqual(
+            sorted(ConfigurationFingerprint.objects.values_list('section', flat=True)), ['global', 'global.bcpp'])
+        self.assertEqual(BcppAppConfiguration().prepare()['global'].status, 'skipped')
+        self.assertIs(BcppAppConfiguration().configurations, BcppAppConfiguration().configurations)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'edc_configuration_tests'}},
+    EDC_CONFIGURATION_CACHE_ALIAS='default')
+class TestSharedNamespaces(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        GlobalConfiguration.objects.create(category='appointment', attribute='appointments_per_day_max', value=30)
+        GlobalConfiguration.objects.create(
+            namespace='bcpp', category='appointment', attribute='appointments_per_day_max', value=40)
+
+    def test_version_per_namespace(self):
+        process1, process2 = ConfigurationCache(), ConfigurationCache()
+        self.assertEqual(process2.get('appointments_per_day_max', namespace='bcpp'), 40)
+        self.assertEqual(process2.get('appointments_per_day_max', namespace='mpepu'), 30)
+        GlobalConfiguration.objects.filter(namespace='bcpp').update(value='45')
+        process1.invalidate(namespace='bcpp')
+        with CaptureQueriesContext(connection) as context:
+            process2.check_version()
+            self.assertEqual(process2.get('appointments_per_day_max', namespace='mpepu'), 30)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(process2.get('appointments_per_day_max', namespace='bcpp'), 45)
+        GlobalConfiguration.objects.update(value='50')
+        process1.invalidate()
+        process2.check_version()
+        self.assertEqual(process2.get('appointments_per_day_max', namespace='mpepu'), 50)
@@ -0,0 +1,94 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from django.test.testcases import TestCase
+
+from edc_configuration import arrays
+from edc_configuration.cache import ConfigurationCache
+from edc_configuration.models import GlobalConfiguration
+from edc_configuration.scheduling import SchedulingPolicy, scheduling_policy, weekday_mask
+
+# Friday 25 and Monday 28 December 2015
+HOLIDAYS = [date(2015, 12, 25), date(2015, 12, 28)]
+
+
+class TestScheduling(TestCase):
+
+    def setUp(self):
+        self.policy = SchedulingPolicy.from_configuration(
+            {'allowed_iso_weekdays': '12345', 'appointments_days_forward': 8})
+
+    def test_weekday_mask(self):
+        self.assertEqual(weekday_mask('12345'), 0b0011111)
+        self.assertEqual(weekday_mask('17'), 0b1000001)
+        self.assertEqual(weekday_mask(), 0b1111111)
+        self.assertRaises(ValueError, weekday_mask, '8')
+
+    def test_from_configuration(self):
+        self.assertEqual(self.policy, SchedulingPolicy(0b0011111, 8, 30, True))
+        self.assertEqual(self.policy.iso_weekdays, (1, 2, 3, 4, 5))
+        self.assertEqual(self.policy.weekmask, '1111100')
+
+    def test_allows(self):
+        self.assertTrue(self.policy.allows(date(2015, 12, 25)))
+        self.assertFalse(self.policy.allows(datetime(2015, 12, 26, 10, 30)))
+
+    def test_valid_dates(self):
+        self.assertEqual(self.policy.window(datetime(2015, 12, 24, 10, 30)), (date(2015, 12, 24), date(2016, 1, 1)))
+        self.assertEqual(
+            self.policy.valid_dates(date(2015, 12, 24)),
+            [date(2015, 12, 24), date(2015, 12, 25), date(2015, 12, 28), date(2015, 12, 29),
+             date(2015, 12, 30), date(2015, 12, 31), date(2016, 1, 1)])
+        self.assertEqual(self.policy.valid_dates(date(2015, 12, 24), date(2015, 12, 27)),
+                         [date(2015, 12, 24), date(2015, 12, 25)])
+
+    def test_scheduling_policy(self):
+        GlobalConfiguration.objects.create(category='appointment', attribute='allowed_iso_weekdays', value='135')
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=10)
+        cache = ConfigurationCache()
+        policy = scheduling_policy(cache)
+        self.assertEqual(policy, SchedulingPolicy(0b0010101, 8, 10, True))
+        self.assertIs(scheduling_policy(cache), policy)
+        cache.invalidate()
+        self.assertIsNot(scheduling_policy(cache), policy)
+
+
+class TestArrays(TestCase):
+
+    def setUp(self):
+        self.policy = SchedulingPolicy.from_configuration(
+            {'allowed_iso_weekdays': '12345', 'appointments_days_forward': 8})
+
+    def test_valid_dates(self):
+        self.assertEqual(
+            arrays.as_dates(arrays.valid_dates(self.policy, date(2015, 12, 24))),
+            self.policy.valid_dates(date(2015, 12, 24)))
+        self.assertEqual(
+            arrays.as_dates(arrays.valid_dates(self.policy, date(2015, 12, 24), holidays=HOLIDAYS)),
+            [date(2015, 12, 24), date(2015, 12, 29), date(2015, 12, 30), date(2015, 12, 31), date(2016, 1, 1)])
+
+    def test_valid_dates_strings(self):
+        self.assertEqual(
+            arrays.as_dates(arrays.valid_dates(self.policy, '2016-01-05')),
+            self.policy.valid_dates(date(2016, 1, 5)))
+        self.assertEqual(
+            arrays.as_dates(arrays.valid_dates(self.policy, '2015-12-24', '2015-12-29', holidays=HOLIDAYS)),
+            [date(2015, 12, 24), date(2015, 12, 29)])
+        self.assertEqual(
+            arrays.as_dates(arrays.valid_dates(self.policy, datetime(2016, 1, 5, 10, 30))),
+            self.policy.valid_dates(date(2016, 1, 5)))
+
+    def test_next_valid_dates(self):
+        values = [datetime(2015, 12, 24, 10, 30), date(2015, 12, 25), date(2015, 12, 26)]
+        self.assertEqual(
+            arrays.as_dates(arrays.next_valid_dates(self.policy, values, holidays=HOLIDAYS)),
+            [date(2015, 12, 24), date(2015, 12, 29), date(2015, 12, 29)])
+        self.assertEqual(
+            arrays.as_dates(arrays.next_valid_dates(self.policy, np.array(['2015-12-26'], dtype='datetime64[D]'))),
+            [date(2015, 12, 28)])
+
+    def test_window_ends(self):
+        self.assertEqual(
+            arrays.as_dates(arrays.window_ends(self.policy, [date(2015, 12, 24)])), [date(2016, 1, 1)])
@@ -0,0 +1,188 @@
+import threading
+import time
+
+from django.db import connection
+from django.test.testcases import TestCase
+
+from edc_configuration.base_app_configuration import APPLIED, FAILED, ROLLED_BACK, BaseAppConfiguration
+from edc_configuration.exceptions import AppConfigurationError, PrepareError
+from edc_configuration.models import ConfigurationFingerprint, GlobalConfiguration
+from edc_configuration.report import PrepareReport, SectionReport
+from edc_configuration.sections import Section, SectionRegistry, site_sections
+from edc_configuration.signals import section_prepared
+
+
+def registry_of(*sections):
+    registry = SectionRegistry()
+    for section in sections:
+        registry.register(section)
+    return registry
+
+
+def fail(app_configuration):
+    raise ValueError('erik')
+
+
+class TestSections(TestCase):
+
+    def test_default_sections(self):
+        self.assertEqual(
+            [section.name for section in site_sections.ordered()],
+            ['content_type_map', 'global', 'lab_clinic_api', 'lab', 'labeling', 'export_plan',
+             'notification_plan', 'holidays'])
+
+    def test_ordered(self):
+        registry = registry_of(
+            Section('panels', 'panel_setup', 'update_panels', depends_on=['aliquot_types']),
+            Section('aliquot_types', 'aliquot_type_setup', 'update_aliquot_types'),
+            Section('holidays', 'holidays_setup', 'update_holidays'))
+        self.assertEqual([section.name for section in registry.ordered()], ['aliquot_types', 'panels', 'holidays'])
+        self.assertEqual([section.name for section in registry.ordered(['panels'])], ['panels'])
+        self.assertRaises(AppConfigurationError, registry.ordered, ['erik'])
+
+    def test_register(self):
+        registry = registry_of(Section('holidays', 'holidays_setup', 'update_holidays'))
+        self.assertRaises(AppConfigurationError, registry.register, Section('holidays', 'a', 'b'))
+        registry.register(Section('holidays', 'a', 'b'), replace=True)
+        self.assertEqual(registry['holidays'].configuration, 'a')
+        registry.unregister('holidays')
+        self.assertNotIn('holidays', registry)
+
+    def test_unknown_dependency(self):
+        registry = registry_of(Section('panels', 'panel_setup', 'update_panels', depends_on=['erik']))
+        self.assertRaises(AppConfigurationError, registry.ordered)
+
+    def test_circular(self):
+        registry = registry_of(
+            Section('a', 'a', 'a', depends_on=['b']),
+            Section('b', 'b', 'b', depends_on=['a']))
+        self.assertRaises(AppConfigurationError, registry.ordered)
+
+    def test_registered_section(self):
+        """Assert a section registered by another app is applied without subclassing."""
+        applied = []
+        registry = registry_of(Section(
+            'visit_schedule',
+            configuration=lambda app_configuration: {'visits': 2},
+            apply=lambda app_configuration: applied.append(app_configuration)))
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+
+        app_configuration = AppConfiguration()
+        report = app_configuration.prepare()
+        self.assertEqual(report['visit_schedule'].status, APPLIED)
+        self.assertEqual(applied, [app_configuration])
+
+    def test_failed_section_rolls_back(self):
+        """Assert sections applied before a failing section are reported as rolled back and
+        section_prepared is only sent once the transaction has ended."""
+        registry = registry_of(
+            Section('first', lambda a: 1, lambda a: GlobalConfiguration.objects.set_attr('erik', 1)),
+            Section('second', lambda a: 1, fail, depends_on=['first']))
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+
+        sent = []
+
+        def receiver(sender, section_report, **kwargs):
+            sent.append((section_report.section, section_report.status))
+        section_prepared.connect(receiver)
+        try:
+            with self.assertRaises(PrepareError) as context:
+                AppConfiguration().prepare()
+        finally:
+            section_prepared.disconnect(receiver)
+        self.assertEqual(
+            [(name, section_report.status) for name, section_report in context.exception.report.items()],
+            [('first', ROLLED_BACK), ('second', FAILED)])
+        self.assertEqual(sent, [('first', ROLLED_BACK), ('second', FAILED)])
+        self.assertFalse(GlobalConfiguration.objects.filter(attribute='erik').exists())
+
+    def test_profile(self):
+        """Assert queries are only counted if profile is True."""
+        registry = registry_of(Section(
+            'fingerprints',
+            configuration=lambda app_configuration: 1,
+            apply=lambda app_configuration: list(ConfigurationFingerprint.objects.all())))
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry
+
+        report = AppConfiguration().prepare()
+        self.assertIsNone(report['fingerprints'].queries)
+        self.assertIsNone(report.queries)
+        self.assertEqual(len(report.as_table()), 3)
+        report = AppConfiguration().prepare(force=True, profile=True)
+        self.assertGreater(report['fingerprints'].queries, 0)
+        self.assertFalse(connection.force_debug_cursor)
+
+
+class TestConcurrentSections(TestCase):
+    """prepare_section() is replaced so the threads do not write to the database; threads
+    writing to a shared in-memory SQLite test database fail with "database table is locked"."""
+
+    def prepare(self, *sections, **kwargs):
+        events = []
+        lock = threading.Lock()
+
+        class AppConfiguration(BaseAppConfiguration):
+            section_registry = registry_of(*sections)
+
+            def prepare_section(self, section, report, fingerprints, force, keep_going=None):
+                name, _, apply = section
+                with lock:
+                    events.append(('start', name))
+                time.sleep(0.05)
+                try:
+                    apply()
+                    report[name].status = APPLIED
+                except ValueError as e:
+                    report[name].status = FAILED
+                    if not keep_going:
+                        raise PrepareError(str(e), section=name, report=report)
+                finally:
+                    with lock:
+                        events.append(('end', name))
+
+        app_configuration = AppConfiguration()
+        sections = app_configuration.sections
+        report = PrepareReport((section[0], SectionReport(section[0])) for section in sections)
+        try:
+            app_configuration.prepare_concurrently(sections, report, {}, True, workers=4, **kwargs)
+        finally:
+            self.events = events
+        return report
+
+    def test_prepare_concurrently(self):
+        """Assert sections run concurrently and each after the sections it depends on."""
+        report = self.prepare(
+            Section('aliquot_types', lambda a: 1, lambda a: None),
+            Section('panels', lambda a: 1, lambda a: None, depends_on=['aliquot_types']),
+            Section('holidays', lambda a: 1, lambda a: None),
+            Section('labeling', lambda a: 1, lambda a: None))
+        self.assertEqual(set(section_report.status for section_report in report.values()), set([APPLIED]))
+        self.assertLess(self.events.index(('end', 'aliquot_types')), self.events.index(('start', 'panels')))
+        self.assertEqual(
+            set(event[1] for event in self.events[:3]), set(['aliquot_types', 'holidays', 'labeling']))
+
+    def test_error_stops_dependent_sections(self):
+        """Assert a failing section raises after the running sections finish and its
+        dependent sections are not started."""
+        with self.assertRaises(PrepareError) as context:
+            self.prepare(
+                Section('aliquot_types', lambda a: 1, fail),
+                Section('panels', lambda a: 1, lambda a: None, depends_on=['aliquot_types']),
+                Section('holidays', lambda a: 1, lambda a: None))
+        self.assertEqual(context.exception.section, 'aliquot_types')
+        self.assertNotIn(('start', 'panels'), self.events)
+        self.assertIn(('end', 'holidays'), self.events)
+
+    def test_keep_going(self):
+        report = self.prepare(
+            Section('aliquot_types', lambda a: 1, fail),
+            Section('panels', lambda a: 1, lambda a: None, depends_on=['aliquot_types']),
+            keep_going=True)
+        self.assertEqual(report['aliquot_types'].status, FAILED)
+        self.assertEqual(report['panels'].status, APPLIED)
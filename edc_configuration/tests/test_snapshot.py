@@ -0,0 +1,51 @@
+import pickle
+
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from edc_configuration.cache import configuration_cache
+from edc_configuration.models import GlobalConfiguration
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        configuration_cache.invalidate()
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='appointments_per_day_max', value=30)
+        GlobalConfiguration.objects.create(
+            category='appointment', attribute='default_appt_type', value='clinic')
+        GlobalConfiguration.objects.create(
+            category='dashboard', attribute='allow_additional_requisitions', value=False)
+
+    def test_snapshot_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            snapshot = GlobalConfiguration.objects.snapshot()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(snapshot['appointments_per_day_max'], 30)
+        self.assertEqual(snapshot.default_appt_type, 'clinic')
+        self.assertEqual(snapshot.allow_additional_requisitions, False)
+        self.assertEqual(len(snapshot), 3)
+
+    def test_snapshot_category(self):
+        snapshot = GlobalConfiguration.objects.snapshot(category='appointment')
+        self.assertEqual(sorted(snapshot.keys()), ['appointments_per_day_max', 'default_appt_type'])
+        snapshot = GlobalConfiguration.objects.snapshot()
+        self.assertEqual(sorted(snapshot.categories), ['appointment', 'dashboard'])
+        self.assertEqual(
+            dict(snapshot.category('dashboard')), {'allow_additional_requisitions': False})
+
+    def test_snapshot_read_only(self):
+        snapshot = GlobalConfiguration.objects.snapshot()
+        self.assertRaises(AttributeError, setattr, snapshot, 'default_appt_type', 'default')
+        with self.assertRaises(TypeError):
+            snapshot['default_appt_type'] = 'default'
+        self.assertRaises(AttributeError, getattr, snapshot, 'erik')
+        self.assertRaises(KeyError, snapshot.__getitem__, 'erik')
+
+    def test_snapshot_pickles(self):
+        snapshot = GlobalConfiguration.objects.snapshot()
+        unpickled = pickle.loads(pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(dict(unpickled), dict(snapshot))
+        self.assertEqual(unpickled.categories, snapshot.categories)